@@ -1,14 +1,169 @@
-import requests
+import re
+import threading
+import time
 
+from instrumentation import instrumented, record_cache, record_time
+from quote_providers import ExchangeRateApiProvider
+
+# --- Exchange Rate API Lookup ---
+EXCHANGE_RATE_CACHE_SECONDS = 60
+_rate_cache = {}  # api key -> (expires_at, rate)
+
+
+@instrumented
 def get_response_from_agent(user_input, exchange_api_key):
     if "price" in user_input.lower() or "usd to inr" in user_input.lower():
-        url = f"https://v6.exchangerate-api.com/v6/{exchange_api_key}/pair/USD/INR"
-        response = requests.get(url)
-        data = response.json()
-        if response.status_code == 200 and data.get("conversion_rate"):
-            rate = data["conversion_rate"]
-            return f"📈 The current USD to INR rate is ₹{rate:.2f}"
-        else:
+        cached = _rate_cache.get(exchange_api_key)
+        hit = cached is not None and cached[0] > time.time()
+        record_cache("exchange_rate_api", hit)
+        if hit:
+            return f"📈 The current USD to INR rate is ₹{cached[1]:.2f}"
+        try:
+            rate = ExchangeRateApiProvider(exchange_api_key).get_quote("USD", "INR")
+        except (ConnectionError, ValueError):
             return "⚠️ Unable to fetch the latest exchange rate at the moment."
+        _rate_cache[exchange_api_key] = (time.time() + EXCHANGE_RATE_CACHE_SECONDS, rate)
+        return f"📈 The current USD to INR rate is ₹{rate:.2f}"
     else:
         return "🤖 I can help with USD to INR exchange rates. Try asking about the latest rate."
+
+
+# --- Fast-Path Intent Router ---
+# Questions about data the app already holds (rate, SMAs, signals, portfolio) are
+# answered locally from the context the caller passes in; only open-ended
+# questions fall through to the LLM. Patterns are checked in order, so
+# "should I buy at this price?" is a signal question, not a price question.
+LLM_ROUTE = "llm"
+INTENT_PATTERNS = (
+    # Only the user's own account: "what is a stop loss?" or "profit-taking strategy" go to the LLM.
+    ("portfolio", re.compile(
+        r"\b(my|our)\s+(virtual\s+)?(portfolio|balances?|holdings?|positions?|p\s*&\s*l|pnl|profits?|loss(es)?|net worth)\b"
+        r"|\bhow much (usd|inr|money|cash) do (i|we) (have|hold|own)\b"
+        r"|\bam i (up|down|in (profit|the red)|making money|losing money)\b", re.I)),
+    ("signal", re.compile(r"\b(signals?|crossover|should i (buy|sell)|buy or sell|bullish|bearish|trend)\b", re.I)),
+    ("sma", re.compile(r"\b(sma|moving averages?)\b", re.I)),
+    # Only the exchange rate: "RBI repo rate" or "interest rate outlook" go to the LLM.
+    ("price", re.compile(
+        r"\b(usd|dollars?)\s*(to|/|-|in|vs\.?|per)?\s*(the\s+|a\s+|one\s+)?(inr|rupees?)\b"
+        r"|\b(inr|rupees?)\s*(to|/|-|in|vs\.?|per)?\s*(the\s+|a\s+|one\s+)?(usd|dollars?)\b"
+        r"|\b(exchange|fx|forex|conversion) rate\b", re.I)),
+)
+# Anything longer than this, asking for an explanation or forecast, or asking what
+# a term means, is treated as open-ended even if a keyword matches.
+MAX_ROUTED_WORDS = 16
+OPEN_ENDED_PATTERN = re.compile(
+    r"^\s*(why|explain|how come|what (will|would|could)|predict|forecast|what(\s+is|'s)\s+an?\s|define\b)", re.I)
+
+_route_stats_lock = threading.Lock()
+_route_stats = {}  # route -> {"count", "total_seconds", "max_seconds"}
+
+
+def classify_intent(user_input):
+    """Returns the route name for a question: one of the INTENT_PATTERNS names or LLM_ROUTE."""
+    if len(user_input.split()) > MAX_ROUTED_WORDS or OPEN_ENDED_PATTERN.search(user_input):
+        return LLM_ROUTE
+    for route, pattern in INTENT_PATTERNS:
+        if pattern.search(user_input):
+            return route
+    return LLM_ROUTE
+
+
+def _answer_price(context):
+    rate = context.get("rate")
+    if rate is None:
+        return "⚠️ The live USD to INR rate isn't available right now. Please try again in a moment."
+    return f"📈 The current USD to INR rate is ₹{rate:.2f}"
+
+
+def _answer_sma(context):
+    sma = context.get("sma")
+    if not sma:
+        return "⚠️ SMA values aren't available yet. Open the chart section to load candle data."
+    return (
+        f"📊 On the {sma['interval']} chart, SMA {sma['short_window']} is ₹{sma['short']:.4f} "
+        f"and SMA {sma['long_window']} is ₹{sma['long']:.4f}."
+    )
+
+
+def _answer_signal(context):
+    sma = context.get("sma")
+    if not sma:
+        return "⚠️ No signal data yet. Open the chart section to load candle data."
+    if sma["short"] == sma["long"]:
+        answer = (f"🚦 SMA {sma['short_window']} equals SMA {sma['long_window']} on the {sma['interval']} chart: "
+                  "no bias until one crosses the other.")
+    else:
+        side = "above" if sma["short"] > sma["long"] else "below"
+        bias = "bullish (BUY bias)" if side == "above" else "bearish (SELL bias)"
+        answer = f"🚦 SMA {sma['short_window']} is {side} SMA {sma['long_window']} on the {sma['interval']} chart: {bias}."
+    if sma.get("last_signal"):
+        answer += f" The last crossover was a {sma['last_signal']} at {sma['last_signal_time']}."
+    return answer + " This is not financial advice."
+
+
+def _answer_portfolio(context):
+    portfolio = context.get("portfolio")
+    if not portfolio:
+        return "⚠️ Portfolio details aren't available right now."
+    answer = (
+        f"💰 You hold ₹{portfolio['inr_balance']:,.2f} and ${portfolio['usd_held']:,.2f}. "
+        f"Realized PnL is ₹{portfolio['realized_pnl_inr']:,.2f}"
+    )
+    if portfolio.get("total_value_inr") is not None:
+        answer += (
+            f", unrealized PnL is ₹{portfolio['unrealized_pnl_inr']:,.2f} and the total value is "
+            f"₹{portfolio['total_value_inr']:,.2f}"
+        )
+    return answer + "."
+
+
+_HANDLERS = {
+    "price": _answer_price,
+    "sma": _answer_sma,
+    "signal": _answer_signal,
+    "portfolio": _answer_portfolio,
+}
+
+
+def record_route(route, seconds):
+    """Adds one request and its latency to a route's counters."""
+    with _route_stats_lock:
+        stats = _route_stats.setdefault(route, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        stats["count"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+    record_time("chat_route_seconds", seconds, route=route)
+
+
+def route_query(user_input, context):
+    """
+    Answers a chat question locally when possible.
+    Args:
+        user_input (str): The user's question.
+        context (dict): Data the app already has: 'rate' (float or None), 'sma'
+            (dict with 'interval', 'short_window', 'long_window', 'short', 'long' and
+            optionally 'last_signal'/'last_signal_time') and 'portfolio' (a ledger valuation).
+    Returns:
+        tuple: (route, response). The response is None for LLM_ROUTE; the caller
+        should ask the LLM and report its latency with record_route.
+    """
+    start = time.perf_counter()
+    route = classify_intent(user_input)
+    if route == LLM_ROUTE:
+        return route, None
+    response = _HANDLERS[route](context)
+    record_route(route, time.perf_counter() - start)
+    return route, response
+
+
+def get_route_stats():
+    """Returns per-route request counts with mean and max latency in milliseconds."""
+    with _route_stats_lock:
+        return {
+            route: {
+                "count": s["count"],
+                "mean_ms": 1000 * s["total_seconds"] / s["count"],
+                "max_ms": 1000 * s["max_seconds"],
+            }
+            for route, s in _route_stats.items()
+        }
@@ -0,0 +1,128 @@
+# av_parser.py
+
+import json
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library decoder works, just slower
+    orjson = None
+
+# --- Alpha Vantage Time-Series Parser ---
+# Builds NumPy columns straight from the decoded response instead of going
+# through a dict-of-dicts DataFrame. The body is decoded in one call (orjson when
+# available), which is faster than scanning it while it streams in. Fields are
+# mapped by name ("1. open" -> Open), never by position, and timestamps use a
+# fixed-format vectorized parser.
+COLUMN_NAMES = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+OHLCV_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def _column_name(key):
+    """Maps an Alpha Vantage field key ("4. close") to its column name, or None."""
+    return COLUMN_NAMES.get(key.split(".", 1)[-1].strip().lower())
+
+
+def decode(raw):
+    """Decodes a JSON response body (bytes or str)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def parse_timestamps(stamps):
+    """
+    Parses "YYYY-MM-DD", "YYYY-MM-DD HH:MM" or "YYYY-MM-DD HH:MM:SS" strings
+    into int64 nanoseconds by slicing digits out of one byte buffer.
+    Args:
+        stamps (list): bytes or str timestamps, all in the same format.
+    """
+    if not stamps:
+        return np.empty(0, dtype=np.int64)
+    stamps = [s.encode() if isinstance(s, str) else s for s in stamps]
+    width = len(stamps[0])
+    if width not in (10, 16, 19) or any(len(s) != width for s in stamps):
+        # Mixed or unexpected formats: let NumPy's general ISO parser handle it.
+        return np.array([s.decode() for s in stamps], dtype="datetime64[ns]").view(np.int64)
+    d = np.frombuffer(b"".join(stamps), dtype=np.uint8).reshape(-1, width).astype(np.int64) - ord("0")
+    year = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+    month = d[:, 5] * 10 + d[:, 6]
+    day = d[:, 8] * 10 + d[:, 9]
+    days = ((year - 1970) * 12 + (month - 1)).astype("datetime64[M]").astype("datetime64[D]").view(np.int64)
+    seconds = (days + day - 1) * 86400
+    if width >= 16:
+        seconds += (d[:, 11] * 10 + d[:, 12]) * 3600 + (d[:, 14] * 10 + d[:, 15]) * 60
+    if width == 19:
+        seconds += d[:, 17] * 10 + d[:, 18]
+    return seconds * 1_000_000_000
+
+
+def _empty_column(name, n):
+    # A bar missing a price is a gap (NaN); FX series simply have no volume (0).
+    return np.zeros(n) if name == "Volume" else np.full(n, np.nan)
+
+
+def _chronological(timestamps, columns):
+    """Orders bars oldest first. Alpha Vantage sends newest first, which only needs a reversal."""
+    if len(timestamps) < 2 or (timestamps[1:] > timestamps[:-1]).all():
+        return timestamps, columns
+    if (timestamps[1:] < timestamps[:-1]).all():
+        order = slice(None, None, -1)
+    else:
+        order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], {name: values[order] for name, values in columns.items()}
+
+
+def parse_series(data, series_key):
+    """
+    Parses a decoded time series into NumPy columns.
+    Returns:
+        tuple: (timestamps, columns). `timestamps` are sorted int64 nanoseconds and
+        `columns` maps 'Open'/'High'/'Low'/'Close'/'Volume' to float64 arrays
+        (Volume is zeros when the series has none).
+    """
+    series = data[series_key]
+    n = len(series)
+    if not n:
+        return np.empty(0, dtype=np.int64), {name: np.empty(0) for name in OHLCV_COLUMNS}
+    keys = list(next(iter(series.values())))
+    names = [_column_name(key) for key in keys]
+    try:
+        # Every bar has the sample bar's fields (in any order): convert all values in one pass.
+        if any(len(row) != len(keys) for row in series.values()):
+            raise KeyError
+        flat = [row[key] for row in series.values() for key in keys]
+        values = np.fromiter(map(float, flat), dtype=float, count=len(flat)).reshape(n, len(keys))
+        columns = {name: values[:, j] for j, name in enumerate(names) if name is not None}
+    except KeyError:
+        # Bars with differing fields: map each one by name.
+        columns = {}
+        for i, row in enumerate(series.values()):
+            for key, value in row.items():
+                name = _column_name(key)
+                if name is not None:
+                    columns.setdefault(name, _empty_column(name, n))[i] = float(value)
+    columns = {name: columns.get(name, np.zeros(n)) for name in OHLCV_COLUMNS}
+    return _chronological(parse_timestamps(list(series)), columns)
+
+
+def latest_close(data, series_key):
+    """
+    Returns the close of the newest bar without parsing the rest. Timestamps are
+    ISO formatted, so the newest is the lexicographic maximum regardless of key order.
+    """
+    series = data[series_key]
+    if not series:
+        raise ValueError("The time series is empty.")
+    latest = max(series)
+    for key, value in series[latest].items():
+        if _column_name(key) == "Close":
+            return float(value)
+    raise ValueError(f"No close price in the latest bar ({latest}).")
+
+
+def to_frame(timestamps, columns):
+    """Wraps parsed arrays in the DataFrame shape get_alpha_vantage_candlestick_data returns."""
+    index = pd.DatetimeIndex(np.asarray(timestamps, dtype=np.int64).view("datetime64[ns]"), name="Datetime")
+    return pd.DataFrame({name: columns[name] for name in OHLCV_COLUMNS}, index=index)
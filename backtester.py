@@ -0,0 +1,159 @@
+# backtester.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from data_fetcher import get_candles
+from trading_logic import prefix_sums
+
+# --- Sweep Configuration ---
+# FX trades roughly 24 hours a day, 5 days a week.
+TRADING_MINUTES_PER_YEAR = 260 * 24 * 60
+INTERVAL_MINUTES = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60}
+# The grid is evaluated in blocks of (pair, bar) cells, walking the bars in order and
+# carrying each pair's position, equity, peak and return statistics from one block
+# to the next. A block holds a handful of float64 temporaries of BLOCK_CELLS each
+# (~8 MB), whatever the history length or grid size.
+BLOCK_CELLS = 1_000_000
+BLOCK_BARS = 4096
+PARALLEL_MIN_CELLS = 20_000_000    # below this the thread pool costs more than it saves
+METRICS = ("pnl", "max_drawdown", "trades", "sharpe")
+
+
+def sma_matrix(close, windows, csum=None, start=0, stop=None):
+    """
+    Computes SMAs for many windows at once from a single prefix sum.
+    Args:
+        start, stop (int): Range of bars to compute, defaulting to all of them.
+    Returns:
+        np.ndarray: Shape (len(windows), stop - start); entries before a window fills are NaN.
+    """
+    close = np.asarray(close, dtype=float)
+    windows = np.asarray(windows, dtype=np.int64)
+    csum = prefix_sums(close) if csum is None else csum
+    end = np.arange(start + 1, (len(close) if stop is None else stop) + 1)
+    first = end[None, :] - windows[:, None]
+    sums = csum[end][None, :] - csum[np.clip(first, 0, None)]
+    return np.where(first >= 0, sums / windows[:, None], np.nan)
+
+
+def _evaluate_pairs(close, short_windows, long_windows, bars_per_year, cost):
+    """
+    Backtests the (short_windows[i], long_windows[i]) pairs. The strategy mirrors the
+    chart signals long-only: hold USD while the short SMA is above the long SMA,
+    otherwise hold INR. A position taken at a bar's close earns the next bar's return.
+    Returns:
+        dict: One array per metric in METRICS, aligned with the pairs.
+    """
+    n_pairs, n_bars = len(short_windows), len(close)
+    csum = prefix_sums(close)
+    returns = close[1:] / close[:-1] - 1.0
+    windows, inverse = np.unique(np.r_[short_windows, long_windows], return_inverse=True)
+    short_rows, long_rows = inverse[:n_pairs], inverse[n_pairs:]
+    bars = max(1, min(BLOCK_BARS, n_bars, BLOCK_CELLS // max(n_pairs, 1)))
+    pairs = max(1, BLOCK_CELLS // bars)
+
+    position = np.zeros(n_pairs, dtype=np.int8)   # state carried across bar blocks
+    equity = np.ones(n_pairs)
+    peak = np.ones(n_pairs)
+    max_drawdown = np.zeros(n_pairs)
+    trades = np.zeros(n_pairs)
+    count, mean, m2 = 0, np.zeros(n_pairs), np.zeros(n_pairs)   # strategy return moments (Chan et al.)
+
+    for b0 in range(0, n_bars, bars):
+        b1 = min(b0 + bars, n_bars)
+        k = max(0, min(b1, n_bars - 1) - b0)    # bars in this block that have a next-bar return
+        smas = sma_matrix(close, windows, csum, b0, b1)
+        block_mean, block_m2 = np.zeros(n_pairs), np.zeros(n_pairs)
+        for p0 in range(0, n_pairs, pairs):
+            rows = slice(p0, p0 + pairs)
+            pos = (smas[short_rows[rows]] > smas[long_rows[rows]]).astype(np.int8)
+            changes = np.abs(np.diff(pos, axis=-1, prepend=position[rows, None]))
+            trades[rows] += changes.sum(axis=-1)
+            position[rows] = pos[:, -1]
+            if k == 0:
+                continue
+            strategy = pos[:, :k] * returns[b0:b0 + k] - cost * changes[:, :k]
+            curve = equity[rows, None] * np.cumprod(1.0 + strategy, axis=-1)
+            running_peak = np.maximum.accumulate(np.maximum(curve, peak[rows, None]), axis=-1)
+            max_drawdown[rows] = np.maximum(max_drawdown[rows], ((running_peak - curve) / running_peak).max(axis=-1))
+            equity[rows], peak[rows] = curve[:, -1], running_peak[:, -1]
+            block_mean[rows] = strategy.mean(axis=-1)
+            block_m2[rows] = ((strategy - block_mean[rows, None]) ** 2).sum(axis=-1)
+        if k:
+            total = count + k
+            delta = block_mean - mean
+            mean = mean + delta * k / total
+            m2 = m2 + block_m2 + delta * delta * count * k / total
+            count = total
+
+    std = np.sqrt(m2 / count) if count else np.zeros(n_pairs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(bars_per_year), np.nan)
+    return {"pnl": equity - 1.0, "max_drawdown": max_drawdown, "trades": trades, "sharpe": sharpe}
+
+
+def sweep_sma_grid(close, short_windows, long_windows, interval="5min", cost_bps=0.0, workers=None):
+    """
+    Evaluates the SMA crossover strategy over a whole (short, long) grid.
+    Args:
+        close (array-like): Close prices, oldest first.
+        short_windows, long_windows (array-like): Candidate SMA periods.
+        interval (str): Candle interval, used to annualize the Sharpe ratio.
+        cost_bps (float): Cost per position change, in basis points.
+        workers (int): Threads for large grids; 1 disables the pool. The block kernels
+            are NumPy calls that release the GIL, so no processes are forked.
+    Returns:
+        dict: 'short_windows', 'long_windows' and one (short x long) array per metric
+        in METRICS. Pairs with short >= long are NaN.
+    """
+    close = np.asarray(close, dtype=float)
+    short_windows = np.asarray(short_windows, dtype=np.int64)
+    long_windows = np.asarray(long_windows, dtype=np.int64)
+    if len(close) < 2:
+        raise ValueError("At least two candles are needed to backtest.")
+    bars_per_year = TRADING_MINUTES_PER_YEAR / INTERVAL_MINUTES.get(interval, 1)
+    cost = cost_bps / 10_000.0
+
+    # Only valid pairs (short < long) are evaluated.
+    short_idx, long_idx = np.nonzero(short_windows[:, None] < long_windows[None, :])
+    workers = 1 if len(short_idx) * len(close) < PARALLEL_MIN_CELLS else (workers or os.cpu_count() or 1)
+    groups = [group for group in np.array_split(np.arange(len(short_idx)), max(1, min(workers, len(short_idx))))
+              if len(group)]
+    args = [(close, short_windows[short_idx[g]], long_windows[long_idx[g]], bars_per_year, cost) for g in groups]
+    if len(args) > 1:
+        with ThreadPoolExecutor(max_workers=len(args), thread_name_prefix="sma-sweep") as pool:
+            parts = list(pool.map(lambda a: _evaluate_pairs(*a), args))
+    else:
+        parts = [_evaluate_pairs(*a) for a in args]
+
+    results = {}
+    for metric in METRICS:
+        grid = np.full((len(short_windows), len(long_windows)), np.nan)
+        if parts:
+            grid[short_idx, long_idx] = np.concatenate([part[metric] for part in parts])
+        results[metric] = grid
+    results["short_windows"] = short_windows
+    results["long_windows"] = long_windows
+    return results
+
+
+def sweep_to_frame(results):
+    """Flattens sweep results into one row per valid (short, long) pair."""
+    short, long = np.meshgrid(results["short_windows"], results["long_windows"], indexing="ij")
+    frame = pd.DataFrame({
+        "short": short.ravel(),
+        "long": long.ravel(),
+        **{metric: results[metric].ravel() for metric in METRICS},
+    })
+    return frame.dropna(subset=["pnl"]).reset_index(drop=True)
+
+
+def run_sweep(symbol="USD", to_symbol="INR", interval="5min", short_windows=range(5, 51),
+              long_windows=range(20, 201, 5), cost_bps=0.0, workers=None):
+    """Runs sweep_sma_grid over the full stored history of a pair/interval."""
+    candles = get_candles(symbol=symbol, to_symbol=to_symbol, interval=interval)
+    return sweep_sma_grid(candles["Close"].to_numpy(), list(short_windows), list(long_windows),
+                          interval=interval, cost_bps=cost_bps, workers=workers)
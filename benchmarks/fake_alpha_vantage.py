@@ -0,0 +1,234 @@
+# benchmarks/fake_alpha_vantage.py
+
+import argparse
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import requests
+
+# --- Local Alpha Vantage Stand-In ---
+# Serves FX_DAILY / FX_INTRADAY responses in Alpha Vantage's JSON format without
+# spending API quota. Recorded payloads in PAYLOAD_DIR (see record_payloads) are
+# replayed byte for byte; anything not recorded is synthesized deterministically.
+# Point the app at it with ALPHA_VANTAGE_BASE_URL=http://127.0.0.1:<port>/query.
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+COMPACT_POINTS = 100
+FULL_POINTS = {"FX_DAILY": 5000, "FX_INTRADAY": 20000}
+INTERVAL_MINUTES = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60}
+SYNTHETIC_END = np.datetime64("2024-06-28T16:00:00")
+SYNTHETIC_START_PRICE = 83.0
+
+
+def payload_filename(function, from_symbol, to_symbol, interval=None, outputsize="compact"):
+    return f"{function}_{from_symbol}_{to_symbol}_{interval or 'daily'}_{outputsize}.json"
+
+
+def synthesize_payload(function, from_symbol, to_symbol, interval=None, outputsize="compact", seed=7,
+                       end=SYNTHETIC_END):
+    """
+    Builds a deterministic random-walk response shaped like Alpha Vantage's
+    (string fields "1. open" ... "4. close", newest bar first, no volume),
+    ending at `end`.
+    """
+    n = COMPACT_POINTS if outputsize == "compact" else FULL_POINTS[function]
+    if function == "FX_DAILY":
+        step = np.timedelta64(1, "D")
+        series_key = "Time Series FX (Daily)"
+        end = np.datetime64(end).astype("datetime64[D]")
+        fmt_len = 10
+    else:
+        step = np.timedelta64(INTERVAL_MINUTES[interval], "m")
+        series_key = f"Time Series FX ({interval})"
+        end = np.datetime64(end).astype("datetime64[m]")
+        fmt_len = 19
+    rng = np.random.default_rng(zlib.crc32(f"{function}/{from_symbol}/{to_symbol}/{interval}".encode()) + seed)
+    close = SYNTHETIC_START_PRICE * np.exp(np.cumsum(rng.normal(0, 2e-4, n)))
+    open_ = np.r_[SYNTHETIC_START_PRICE, close[:-1]]
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 5e-3, n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 5e-3, n))
+    timestamps = end - step * np.arange(n - 1, -1, -1)
+
+    series = {}
+    for i in range(n - 1, -1, -1):
+        ts = str(timestamps[i].astype("datetime64[s]")).replace("T", " ")[:fmt_len]
+        series[ts] = {
+            "1. open": f"{open_[i]:.5f}",
+            "2. high": f"{high[i]:.5f}",
+            "3. low": f"{low[i]:.5f}",
+            "4. close": f"{close[i]:.5f}",
+        }
+    meta = {
+        "1. Information": "Synthetic payload (benchmarks/fake_alpha_vantage.py)",
+        "2. From Symbol": from_symbol,
+        "3. To Symbol": to_symbol,
+        "4. Last Refreshed": next(iter(series)),
+    }
+    if interval:
+        meta["5. Interval"] = interval
+    meta["6. Output Size"] = "Compact" if outputsize == "compact" else "Full size"
+    return {"Meta Data": meta, series_key: series}
+
+
+class FakeAlphaVantageServer:
+    """
+    Threaded HTTP server answering Alpha Vantage queries locally.
+    Args:
+        port (int): 0 picks a free port.
+        payload_dir (str): Directory of recorded payloads to replay.
+        rate_limit_per_minute (int): If set, answer with Alpha Vantage's rate-limit
+            "Note" once more requests than this arrive within 60 seconds.
+        latency_seconds (float): Artificial delay added to every response.
+    Synthetic series end at SYNTHETIC_END until advance() moves the clock on.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, payload_dir=PAYLOAD_DIR, rate_limit_per_minute=None,
+                 latency_seconds=0.0):
+        self.payload_dir = payload_dir
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.latency_seconds = latency_seconds
+        self.end = SYNTHETIC_END
+        self.request_count = 0
+        self._payloads = {}
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/query"
+
+    def payload_bytes(self, function, from_symbol, to_symbol, interval=None, outputsize="compact"):
+        key = (function, from_symbol, to_symbol, interval, outputsize)
+        with self._lock:
+            if key not in self._payloads:
+                path = os.path.join(self.payload_dir, payload_filename(*key))
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        self._payloads[key] = f.read()
+                else:
+                    self._payloads[key] = json.dumps(synthesize_payload(*key, end=self.end)).encode()
+            return self._payloads[key]
+
+    def advance(self, minutes):
+        """Moves the synthetic clock on, so every series gains `minutes` worth of newer bars."""
+        with self._lock:
+            self.end = self.end + np.timedelta64(minutes, "m")
+            self._payloads.clear()
+
+    def _throttled(self):
+        if self.rate_limit_per_minute is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            self._recent.append(now)
+            return len(self._recent) > self.rate_limit_per_minute
+
+    def _respond(self, query):
+        function = query.get("function")
+        if function not in FULL_POINTS:
+            return {"Error Message": f"Invalid API call. Unsupported function: {function}"}
+        if self._throttled():
+            return {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is "
+                            "5 calls per minute and 500 calls per day."}
+        return self.payload_bytes(
+            function,
+            query.get("from_symbol", "USD"),
+            query.get("to_symbol", "INR"),
+            query.get("interval") if function == "FX_INTRADAY" else None,
+            query.get("outputsize", "compact"),
+        )
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                if server.latency_seconds:
+                    time.sleep(server.latency_seconds)
+                body = server._respond(query)
+                if isinstance(body, dict):
+                    body = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-alpha-vantage", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def record_payloads(api_key, payload_dir=PAYLOAD_DIR, from_symbol="USD", to_symbol="INR",
+                    intervals=("1min", "5min"), base_url="https://www.alphavantage.co/query"):
+    """
+    Downloads real responses once so the fake server replays them. Spends
+    2 + 2 * len(intervals) API calls, paced to stay under the free-tier limit.
+    """
+    os.makedirs(payload_dir, exist_ok=True)
+    jobs = [("FX_DAILY", None, size) for size in ("compact", "full")]
+    jobs += [("FX_INTRADAY", interval, size) for interval in intervals for size in ("compact", "full")]
+    for i, (function, interval, outputsize) in enumerate(jobs):
+        if i:
+            time.sleep(13)  # 5 requests/minute
+        params = {"function": function, "from_symbol": from_symbol, "to_symbol": to_symbol,
+                  "outputsize": outputsize, "apikey": api_key}
+        if interval:
+            params["interval"] = interval
+        response = requests.get(base_url, params=params, timeout=60)
+        response.raise_for_status()
+        path = os.path.join(payload_dir, payload_filename(function, from_symbol, to_symbol, interval, outputsize))
+        with open(path, "wb") as f:
+            f.write(response.content)
+        print(f"Recorded {path} ({len(response.content):,} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Alpha Vantage stand-in.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    serve = subcommands.add_parser("serve", help="Serve recorded or synthetic payloads.")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--rate-limit", type=int, default=None, help="Requests per minute before answering with a Note.")
+    record = subcommands.add_parser("record", help="Record real payloads (needs ALPHA_VANTAGE_API_KEY).")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = FakeAlphaVantageServer(port=args.port, rate_limit_per_minute=args.rate_limit).start()
+        print(f"Fake Alpha Vantage listening on {server.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.stop()
+    else:
+        record_payloads(os.environ["ALPHA_VANTAGE_API_KEY"])
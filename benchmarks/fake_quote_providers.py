@@ -0,0 +1,150 @@
+# benchmarks/fake_quote_providers.py
+
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_alpha_vantage import INTERVAL_MINUTES, synthesize_payload
+
+# --- Local Stand-Ins for the Other Quote Providers ---
+# Alpha Vantage is covered by fake_alpha_vantage.FakeAlphaVantageServer. These
+# cover exchangerate-api (an HTTP server) and yfinance (a client object passed
+# to YFinanceProvider), with adjustable latency and throttling so hedging and
+# circuit breaking can be exercised offline:
+#
+#     from quote_providers import ExchangeRateApiProvider, YFinanceProvider
+#     with FakeExchangeRateApiServer(latency_seconds=3) as server:
+#         slow = ExchangeRateApiProvider("test", server.base_url)
+#         backup = YFinanceProvider(FakeYFinanceClient())
+FAKE_RATE = 83.25
+YF_INTERVALS_TO_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "30m": 30, "60m": 60}
+
+
+class FakeExchangeRateApiServer:
+    """
+    Threaded HTTP server answering exchangerate-api's /<key>/pair/<from>/<to> endpoint.
+    Args:
+        rate (float): The conversion_rate returned for every pair.
+        latency_seconds (float): Artificial delay added to every response.
+        quota (int): If set, answer "quota-reached" once this many requests were served.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, rate=FAKE_RATE, latency_seconds=0.0, quota=None):
+        self.rate = rate
+        self.latency_seconds = latency_seconds
+        self.quota = quota
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v6"
+
+    def _respond(self, path):
+        parts = path.strip("/").split("/")
+        with self._lock:
+            self.request_count += 1
+            over_quota = self.quota is not None and self.request_count > self.quota
+        if len(parts) != 5 or parts[2] != "pair":
+            return 404, {"result": "error", "error-type": "unsupported-code"}
+        if over_quota:
+            return 429, {"result": "error", "error-type": "quota-reached"}
+        return 200, {"result": "success", "base_code": parts[3], "target_code": parts[4],
+                     "conversion_rate": self.rate, "time_last_update_unix": int(time.time())}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency_seconds:
+                    time.sleep(server.latency_seconds)
+                status, payload = server._respond(self.path)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name="fake-exchangerate-api", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeYFinanceClient:
+    """
+    Stand-in for the yfinance module: Ticker("USDINR=X").history(period, interval)
+    returns synthetic bars in yfinance's shape (tz-aware index, Volume of 0).
+    Args:
+        latency_seconds (float): Delay added to every history call.
+        throttle (bool): Raise a rate-limit error instead of answering.
+    """
+
+    def __init__(self, latency_seconds=0.0, throttle=False):
+        self.latency_seconds = latency_seconds
+        self.throttle = throttle
+        self.request_count = 0
+
+    def Ticker(self, ticker):
+        return _FakeTicker(self, ticker)
+
+
+class YFRateLimitError(Exception):
+    """Same name as the error yfinance raises when Yahoo throttles."""
+
+
+@functools.lru_cache(maxsize=16)
+def _synthetic_bars(from_symbol, to_symbol, minutes):
+    """Oldest-first timestamps and OHLC rows, reusing the Alpha Vantage stand-in's random walk."""
+    interval = next(name for name, m in INTERVAL_MINUTES.items() if m == minutes)
+    bars = synthesize_payload("FX_INTRADAY", from_symbol, to_symbol, interval, "full")[f"Time Series FX ({interval})"]
+    stamps = list(bars)[::-1]
+    values = np.array([[float(bars[ts][key]) for key in ("1. open", "2. high", "3. low", "4. close")]
+                       for ts in stamps])
+    return stamps, values
+
+
+class _FakeTicker:
+    def __init__(self, client, ticker):
+        self.client = client
+        self.from_symbol, self.to_symbol = ticker[:3], ticker[3:6]
+
+    def history(self, period="1d", interval="1m"):
+        self.client.request_count += 1
+        if self.client.latency_seconds:
+            time.sleep(self.client.latency_seconds)
+        if self.client.throttle:
+            raise YFRateLimitError("Too Many Requests. Rate limited. Try after a while.")
+        minutes = YF_INTERVALS_TO_MINUTES[interval]
+        stamps, values = _synthetic_bars(self.from_symbol, self.to_symbol, minutes)
+        bars_per_period = int(period.rstrip("d")) * 24 * 60 // minutes
+        index = pd.DatetimeIndex(stamps[-bars_per_period:]).tz_localize("UTC").tz_convert("Europe/London")
+        df = pd.DataFrame(values[-bars_per_period:], index=index, columns=["Open", "High", "Low", "Close"])
+        df["Volume"] = 0
+        df["Dividends"] = 0.0
+        df["Stock Splits"] = 0.0
+        return df
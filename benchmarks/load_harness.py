@@ -0,0 +1,259 @@
+# benchmarks/load_harness.py
+#
+# Simulates N concurrent Streamlit sessions of streamlit_app.py in one process,
+# offline (local Alpha Vantage stand-in, LLM_BACKEND=fake), and reports resident
+# memory per session and rerun latency as N grows:
+#
+#     python -m benchmarks.load_harness --sessions 1,2,4,8,16 --reruns 12
+#
+# Every session is a Streamlit AppTest driven from its own thread, so sessions
+# rerun concurrently and share process-wide caches and resources exactly as they
+# do in a real server process. AppTest normally installs a fresh mock runtime
+# for each script run and removes it afterwards, which would pull it out from
+# under overlapping runs; share_runtime installs one for the whole process
+# (and one compiled script) instead, as a real server has. This measures how memory and
+# rerun latency, contention included, grow with the number of live sessions.
+#
+# share_runtime patches private AppTest internals, so it is only trusted on the
+# Streamlit releases in TESTED_STREAMLIT_VERSIONS: on any other release, or if
+# one of the patched names is gone, the harness refuses to run rather than
+# measure something else. It still runs the script without a real server's
+# websocket and forward-message path; compare against `streamlit run` before
+# reading the absolute latencies as production numbers.
+
+import argparse
+import gc
+import json
+import random
+import resource
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from benchmarks.fake_alpha_vantage import FakeAlphaVantageServer
+from benchmarks.run_benchmarks import APP_PATH, configure_environment, git_commit
+
+APP_TIMEOUT_SECONDS = 120
+# Alternates questions the router answers locally with ones that go to the (fake) LLM.
+QUESTIONS = (
+    "What is the USD to INR price?",
+    "Why has the rupee been weak this month?",
+    "Should I buy now?",
+    "Explain what the SMA crossover means for next week.",
+    "How is my portfolio doing?",
+)
+INTERVAL_LABELS = ("1 Minute", "5 Minutes", "15 Minutes", "1 Hour")
+TESTED_STREAMLIT_VERSIONS = ("1.65",)
+
+
+def rss_bytes():
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def latency_stats(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"runs": 0}
+    return {
+        "runs": len(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        "max_ms": samples[-1],
+    }
+
+
+def check_streamlit_internals():
+    """Raises RuntimeError unless this Streamlit is one share_runtime was checked against."""
+    import inspect
+
+    import streamlit
+    import streamlit.testing.v1.app_test as app_test
+    import streamlit.testing.v1.local_script_runner as local_script_runner
+    from streamlit import config
+    from streamlit.runtime import Runtime
+
+    release = ".".join(streamlit.__version__.split(".")[:2])
+    if release not in TESTED_STREAMLIT_VERSIONS:
+        raise RuntimeError(
+            f"The load harness patches AppTest internals and was checked against Streamlit "
+            f"{', '.join(TESTED_STREAMLIT_VERSIONS)}, not {streamlit.__version__}. Re-check share_runtime "
+            f"against this release, then add it to TESTED_STREAMLIT_VERSIONS."
+        )
+    expected = {
+        "app_test.Runtime": hasattr(app_test, "Runtime"),
+        "app_test.ScriptCache": hasattr(app_test, "ScriptCache"),
+        "local_script_runner.ScriptCache": hasattr(local_script_runner, "ScriptCache"),
+        "Runtime._instance": hasattr(Runtime, "_instance"),
+        "AppTest._run installs Runtime._instance": "Runtime._instance = " in inspect.getsource(app_test.AppTest._run),
+        "global.appTest option": "global.appTest" in config._config_options_template,
+    }
+    missing = [name for name, present in expected.items() if not present]
+    if missing:
+        raise RuntimeError(f"Streamlit {streamlit.__version__} lacks what share_runtime patches: {', '.join(missing)}")
+
+
+def share_runtime():
+    """
+    Installs one mock Streamlit runtime for every AppTest run, so runs can overlap.
+    Returns:
+        The installed runtime, which must still be installed after the runs (see run_level).
+    """
+    check_streamlit_internals()
+    import streamlit.testing.v1.app_test as app_test
+    import streamlit.testing.v1.local_script_runner as local_script_runner
+    from streamlit import config
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    runtime.bidi_component_registry = BidiComponentManager()
+    runtime.bidi_component_registry.discover_and_register_components(start_file_watching=False)
+    Runtime._instance = runtime
+    # AppTest's per-run install and removal of its own mock land on this stand-in instead.
+    app_test.Runtime = types.SimpleNamespace()
+    # One compiled script for every run, as in a server; Python 3.11 also cannot compile concurrently.
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    # Set for good, so overlapping runs restoring it on exit cannot unset it for each other.
+    config.set_option("global.appTest", True)
+    return runtime
+
+
+class SimulatedSession:
+    """One browser session: a first render, then a mix of chart and chat interactions."""
+
+    def __init__(self, seed):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT_SECONDS)
+        self.random = random.Random(seed)
+        self.rerun_ms = []
+        self.first_render_ms = None
+
+    def _run(self, action=None):
+        start = time.perf_counter()
+        (action() if action is not None else self.app).run()
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.app.exception:
+            raise RuntimeError(f"streamlit_app.py raised: {self.app.exception[0].message}")
+        return elapsed
+
+    def first_render(self):
+        self.first_render_ms = self._run()
+
+    def interact(self):
+        if self.random.random() < 0.3:
+            interval = next(box for box in self.app.selectbox if box.label == "Select Candlestick Interval:")
+            action = lambda: interval.select(self.random.choice(INTERVAL_LABELS))
+        else:
+            action = self._question(self.random.choice(QUESTIONS))
+        self.rerun_ms.append(self._run(action))
+
+    def _question(self, question):
+        self.app.text_input(key="user_question_input").input(question)
+        return next(button for button in self.app.button if button.label == "Send").click
+
+    def ask(self, question):
+        self._run(self._question(question))
+
+
+def run_level(n_sessions, reruns, baseline_rss):
+    """Runs `n_sessions` live sessions, each from its own thread, and measures memory while they are all alive."""
+    sessions = [SimulatedSession(seed=i) for i in range(n_sessions)]
+
+    def drive(session):
+        session.first_render()
+        for _ in range(reruns):
+            session.interact()
+
+    with ThreadPoolExecutor(max_workers=n_sessions, thread_name_prefix="session") as pool:
+        list(pool.map(drive, sessions))
+    gc.collect()
+    rss = rss_bytes()
+    result = {
+        "sessions": n_sessions,
+        "rss_mb": rss / 2**20,
+        "rss_per_session_mb": (rss - baseline_rss) / 2**20 / n_sessions,
+        "first_render": latency_stats([s.first_render_ms for s in sessions]),
+        "rerun": latency_stats([ms for s in sessions for ms in s.rerun_ms]),
+    }
+    del sessions
+    gc.collect()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load harness for streamlit_app.py.")
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="Comma-separated concurrent session counts.")
+    parser.add_argument("--reruns", type=int, default=12, help="Interactions per session after the first render.")
+    parser.add_argument("--output", default="load_results.json", help="Where to write the JSON results.")
+    args = parser.parse_args()
+
+    with FakeAlphaVantageServer() as server, tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(server.url, work_dir)
+        from instrumentation import metrics_snapshot, reset_metrics
+
+        from streamlit.runtime import Runtime
+
+        runtime = share_runtime()
+
+        # Warm the shared caches and the lazily imported modules (the LLM client loads on the
+        # first open-ended question), so the baseline only excludes per-session state.
+        warm_up = SimulatedSession(seed=-1)
+        warm_up.first_render()
+        warm_up.ask(QUESTIONS[1])
+        del warm_up
+        gc.collect()
+        baseline_rss = rss_bytes()
+
+        levels = []
+        for n in (int(part) for part in args.sessions.split(",")):
+            reset_metrics()
+            level = run_level(n, args.reruns, baseline_rss)
+            if Runtime._instance is not runtime:
+                raise RuntimeError("AppTest replaced the shared runtime; share_runtime no longer matches Streamlit.")
+            server_side = {t["labels"] or t["name"]: t for t in metrics_snapshot()["timers"]
+                           if t["name"] in ("rerun_seconds", "section_seconds")}
+            level["server_rerun_ms"] = {name: {k: t[k] for k in ("count", "p50_ms", "p99_ms")}
+                                        for name, t in server_side.items()}
+            levels.append(level)
+            print(
+                f"{n:3d} sessions  RSS {level['rss_mb']:8.1f} MB ({level['rss_per_session_mb']:6.2f} MB/session)  "
+                f"rerun p50 {level['rerun']['p50_ms']:8.1f} ms  p95 {level['rerun']['p95_ms']:8.1f} ms"
+            )
+        upstream_requests = server.request_count
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": git_commit(),
+            "reruns_per_session": args.reruns,
+            "baseline_rss_mb": baseline_rss / 2**20,
+            "fake_server_requests": upstream_requests,
+        },
+        "levels": levels,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
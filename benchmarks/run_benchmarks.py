@@ -0,0 +1,260 @@
+# benchmarks/run_benchmarks.py
+#
+# Times the app's hot paths offline against the local Alpha Vantage stand-in and
+# writes the results as JSON, so runs from different versions can be diffed:
+#
+#     python -m benchmarks.run_benchmarks --output bench_results.json
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_alpha_vantage import FakeAlphaVantageServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "streamlit_app.py")
+BENCH_INTERVAL = "5min"
+BENCH_SHORT_SMA, BENCH_LONG_SMA = 20, 50
+
+
+def time_call(fn, repeat):
+    """Runs `fn` `repeat` times and returns latency statistics in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    """Latency statistics for a list of millisecond samples."""
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": samples[0],
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        "max_ms": samples[-1],
+    }
+
+
+def configure_environment(server_url, work_dir):
+    """Points every module at the fake server and throwaway storage. Must run before importing them."""
+    os.environ["ALPHA_VANTAGE_BASE_URL"] = server_url
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+    os.environ.setdefault("HF_TOKEN", "benchmark")
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["OHLCV_STORE_DIR"] = os.path.join(work_dir, "ohlcv")
+    os.environ["PORTFOLIO_LEDGER_PATH"] = os.path.join(work_dir, "ledger.sqlite3")
+    os.environ["CHAT_ARCHIVE_PATH"] = os.path.join(work_dir, "chat_archive.sqlite3")
+    os.environ["LAST_RATE_PATH"] = os.path.join(work_dir, "last_rate.json")
+    os.environ["QUOTE_PROVIDERS"] = "alpha_vantage"
+    sys.path.insert(0, REPO_ROOT)
+
+
+def bench_fetch_and_parse(server, repeat):
+    """JSON decode and time-series parsing, alone and end to end through HTTP."""
+    import av_parser
+    import data_fetcher
+
+    # Benchmarks must not be throttled by the free-tier limiter.
+    data_fetcher._rate_limiter = data_fetcher._TokenBucket(10**9, 10**9)
+    series_key = f"Time Series FX ({BENCH_INTERVAL})"
+    results = {}
+    for outputsize in ("compact", "full"):
+        raw = server.payload_bytes("FX_INTRADAY", "USD", "INR", BENCH_INTERVAL, outputsize)
+        results[f"decode_json_{outputsize}"] = {**time_call(lambda: av_parser.decode(raw), repeat), "bytes": len(raw)}
+        data = av_parser.decode(raw)
+        results[f"parse_series_decoded_{outputsize}"] = time_call(
+            lambda: av_parser.parse_series(data, series_key), repeat)
+        # What the fetch layer does with a body: decode, parse and wrap in a DataFrame.
+        results[f"parse_candles_{outputsize}"] = {
+            **time_call(lambda: av_parser.to_frame(*av_parser.parse_series(av_parser.decode(raw), series_key)),
+                        repeat),
+            "rows": len(av_parser.parse_series(data, series_key)[0]),
+        }
+
+        def fetch_uncached():
+            data_fetcher.clear_fetch_cache()
+            data_fetcher.get_alpha_vantage_candlestick_data("USD", "INR", BENCH_INTERVAL, outputsize)
+        results[f"fetch_candles_uncached_{outputsize}"] = time_call(fetch_uncached, repeat)
+
+    daily = av_parser.decode(server.payload_bytes("FX_DAILY", "USD", "INR", None, "compact"))
+    results["latest_daily_close"] = time_call(
+        lambda: av_parser.latest_close(daily, data_fetcher.DAILY_SERIES_KEY), repeat)
+    return results
+
+
+def bench_indicators(candles, repeat):
+    import trading_logic
+
+    close = candles["Close"].to_numpy()
+    csum = trading_logic.prefix_sums(close)
+    return {
+        "sma_signals": {
+            **time_call(lambda: trading_logic.compute_sma_signals(close, BENCH_SHORT_SMA, BENCH_LONG_SMA), repeat),
+            "rows": len(close),
+        },
+        "sma_signals_cached_prefix_sums": time_call(
+            lambda: trading_logic.compute_sma_signals(close, BENCH_SHORT_SMA, BENCH_LONG_SMA, csum=csum), repeat),
+        "rsi_macd_bollinger": time_call(
+            lambda: (trading_logic.rsi(close), trading_logic.macd(close), trading_logic.bollinger_bands(close)),
+            repeat),
+        "incremental_engine_per_bar": time_call(
+            lambda: trading_logic.IndicatorEngine.from_history(close[-1000:]), max(1, repeat // 5)),
+    }
+
+
+def bench_figure(candles, repeat):
+    import trading_logic
+    import streamlit as st
+    from chart_builder import build_candlestick_figure, cached_figure
+
+    signals = trading_logic.compute_sma_signals(candles["Close"].to_numpy(), BENCH_SHORT_SMA, BENCH_LONG_SMA)
+
+    def build(**kwargs):
+        return build_candlestick_figure(candles, signals, BENCH_SHORT_SMA, BENCH_LONG_SMA, "benchmark", **kwargs)
+
+    def build_full():
+        return build(max_candles=len(candles), max_line_points=len(candles))
+    figure_json = build().to_json()
+    full_json = build_full().to_json()
+    figure = cached_figure(("benchmark",), build)
+    # st.plotly_chart outside a script run does all of its work (validation and
+    # serialization into the element) but logs a missing-context warning per call.
+    logging.disable(logging.WARNING)
+    try:
+        render_cached = time_call(lambda: st.plotly_chart(cached_figure(("benchmark",), build), width="stretch"),
+                                  repeat)
+        render_parsed_json = time_call(lambda: st.plotly_chart(json.loads(figure_json), width="stretch"), repeat)
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        "figure_build": {**time_call(build, repeat), "rows": len(candles), "traces": len(figure.data)},
+        "figure_build_undownsampled": time_call(build_full, repeat),
+        "figure_build_and_serialize": {**time_call(lambda: build().to_json(), repeat), "bytes": len(figure_json)},
+        "figure_build_and_serialize_undownsampled": {
+            **time_call(lambda: build_full().to_json(), repeat),
+            "bytes": len(full_json),
+        },
+        "plotly_chart_cached_figure": render_cached,
+        "plotly_chart_parsed_json": render_parsed_json,
+    }
+
+
+def bench_app_run(repeat):
+    """Full streamlit_app.py script runs through Streamlit's AppTest harness."""
+    from streamlit.testing.v1 import AppTest
+
+    def run():
+        app = AppTest.from_file(APP_PATH, default_timeout=120)
+        app.run()
+        if app.exception:
+            raise RuntimeError(f"streamlit_app.py raised: {app.exception[0].message}")
+    cold = time_call(run, 1)
+    return {"app_run_cold": cold, "app_run_warm": time_call(run, repeat)}
+
+
+# Runs in a fresh interpreter per sample, so nothing is imported or cached yet.
+COLD_START_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file({app!r}, default_timeout=120)
+app.run()
+first = time.perf_counter()
+if app.exception:
+    raise SystemExit("streamlit_app.py raised: " + app.exception[0].message)
+AppTest.from_file({app!r}, default_timeout=120).run()
+second = time.perf_counter()
+print(json.dumps({{
+    "streamlit_import_ms": (imported - started) * 1000,
+    "first_render_ms": (first - imported) * 1000,
+    "second_render_ms": (second - first) * 1000,
+    "heavy_modules_after_first_render": sorted(
+        name for name in ("langchain_community", "plotly", "backtester") if name in sys.modules),
+}}))
+"""
+
+
+def bench_cold_start(repeat):
+    """
+    Time to first render in a new process: importing Streamlit, then the first
+    AppTest run (which imports the app's modules and warm-starts its caches),
+    compared with a second run in the same process.
+    """
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-c", COLD_START_SCRIPT.format(root=REPO_ROOT, app=APP_PATH)],
+            env=os.environ, text=True, stderr=subprocess.DEVNULL,
+        )
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "cold_streamlit_import": summarize([s["streamlit_import_ms"] for s in samples]),
+        "cold_first_render": {
+            **summarize([s["first_render_ms"] for s in samples]),
+            "heavy_modules_loaded": samples[-1]["heavy_modules_after_first_render"],
+        },
+        "cold_second_render": summarize([s["second_render_ms"] for s in samples]),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the USD/INR trading bot.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per benchmark.")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--skip-app", action="store_true", help="Skip the full AppTest script runs.")
+    args = parser.parse_args()
+
+    with FakeAlphaVantageServer() as server, tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(server.url, work_dir)
+        import data_fetcher
+
+        results = bench_fetch_and_parse(server, args.repeat)
+        candles = data_fetcher.get_alpha_vantage_candlestick_data("USD", "INR", BENCH_INTERVAL, "full")
+        results.update(bench_indicators(candles, args.repeat))
+        results.update(bench_figure(candles, args.repeat))
+        if not args.skip_app:
+            results.update(bench_app_run(max(1, args.repeat // 4)))
+            results.update(bench_cold_start(max(1, args.repeat // 10)))
+        upstream_requests = server.request_count
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "fake_server_requests": upstream_requests,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, stats in results.items():
+        print(f"{name:40s} median {stats['median_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms")
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# chart_builder.py
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import plotly.graph_objects as go
+
+from instrumentation import record_cache, timed
+
+# --- Payload Budget ---
+# However long the history, the browser receives at most MAX_CANDLES candles,
+# MAX_LINE_POINTS points per SMA line and MAX_MARKERS signal markers for the
+# visible range. Candles are merged in OHLC-preserving buckets and lines keep
+# each bucket's lowest and highest point, so the visual shape survives: highs,
+# lows and turning points are never averaged away.
+MAX_CANDLES = 1500
+MAX_LINE_POINTS = 2000
+MAX_MARKERS = 500
+FIGURE_CACHE_SIZE = 32
+
+
+def visible_slice(timestamps, start=None, end=None):
+    """Returns the slice of sorted datetime64 `timestamps` falling in [start, end]."""
+    lo = 0 if start is None else np.searchsorted(timestamps, np.datetime64(start, "ns"), side="left")
+    hi = len(timestamps) if end is None else np.searchsorted(timestamps, np.datetime64(end, "ns"), side="right")
+    return slice(int(lo), int(hi))
+
+
+def bucket_ohlc(timestamps, open_, high, low, close, max_buckets=MAX_CANDLES):
+    """
+    Merges consecutive candles into at most `max_buckets` equal-count buckets:
+    first open, highest high, lowest low, last close, stamped at the first candle.
+    Counting bars rather than time keeps weekend gaps from producing empty buckets.
+    Returns:
+        tuple: (timestamps, open, high, low, close) of the buckets.
+    """
+    n = len(timestamps)
+    if n <= max_buckets:
+        return timestamps, open_, high, low, close
+    size = -(-n // max_buckets)
+    starts = np.arange(0, n, size)
+    ends = np.r_[starts[1:], n] - 1
+    return (
+        timestamps[starts],
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends],
+    )
+
+
+def minmax_indices(y, threshold=MAX_LINE_POINTS):
+    """
+    Picks at most `threshold` points of a line: the lowest and highest point of
+    each of threshold // 2 equal-count buckets, plus both end points.
+    NaN points (e.g. an SMA's warm-up) are dropped first.
+    Args:
+        y (np.ndarray): Line values.
+    Returns:
+        np.ndarray: Indices into y of the points to keep, ascending.
+    """
+    finite = np.flatnonzero(np.isfinite(y))
+    n = len(finite)
+    if n <= threshold or threshold < 4:
+        return finite
+    size = -(-n // ((threshold - 2) // 2))
+    buckets = -(-n // size)
+    # Pad to whole buckets with NaN so one reshape gives a row per bucket; the last
+    # row always keeps at least one real value.
+    rows = np.full(buckets * size, np.nan)
+    rows[:n] = y[finite]
+    rows = rows.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    picks = np.sort(np.c_[offsets + np.nanargmin(rows, axis=1), offsets + np.nanargmax(rows, axis=1)], axis=1)
+    picks = np.unique(np.r_[0, picks.ravel(), n - 1])
+    return finite[picks]
+
+
+def build_candlestick_figure(candlestick_df, signals, short_sma, long_sma, title, start=None, end=None,
+                             max_candles=MAX_CANDLES, max_line_points=MAX_LINE_POINTS):
+    """
+    Builds the candlestick chart with both SMAs and buy/sell markers, limited to
+    the visible range and downsampled to the payload budget.
+    Args:
+        candlestick_df (pd.DataFrame): OHLC candles with a Datetime index.
+        signals (dict): Output of trading_logic.compute_sma_signals for the candles' closes
+            (computed over the full history, so the SMAs are warm at the range start).
+        short_sma, long_sma (int): SMA periods, used for the legend.
+        title (str): Chart title.
+        start, end: Optional visible range bounds (anything np.datetime64 accepts).
+    Returns:
+        go.Figure: The Plotly figure.
+    """
+    timestamps = candlestick_df.index.values.astype("datetime64[ns]")
+    visible = visible_slice(timestamps, start, end)
+    timestamps = timestamps[visible]
+    close = candlestick_df['Close'].to_numpy()
+
+    bucket_ts, bucket_open, bucket_high, bucket_low, bucket_close = bucket_ohlc(
+        timestamps,
+        candlestick_df['Open'].to_numpy()[visible],
+        candlestick_df['High'].to_numpy()[visible],
+        candlestick_df['Low'].to_numpy()[visible],
+        close[visible],
+        max_candles,
+    )
+    fig = go.Figure(data=[go.Candlestick(
+        x=bucket_ts,
+        open=bucket_open,
+        high=bucket_high,
+        low=bucket_low,
+        close=bucket_close,
+        name='Candlesticks'
+    )])
+
+    # Lines and markers use WebGL traces; Plotly has no WebGL candlestick.
+    for values, period, color in ((signals['sma_short'], short_sma, 'blue'), (signals['sma_long'], long_sma, 'orange')):
+        line = np.asarray(values)[visible]
+        keep = minmax_indices(line, max_line_points)
+        fig.add_trace(go.Scattergl(
+            x=timestamps[keep],
+            y=line[keep],
+            mode='lines',
+            name=f'SMA {period}',
+            line=dict(color=color, width=1)
+        ))
+
+    for idx, symbol, color, name in ((signals['buy_idx'], 'triangle-up', 'green', 'Buy Signal'),
+                                     (signals['sell_idx'], 'triangle-down', 'red', 'Sell Signal')):
+        idx = np.asarray(idx)
+        idx = idx[(idx >= visible.start) & (idx < visible.stop)][-MAX_MARKERS:]
+        fig.add_trace(go.Scattergl(
+            x=candlestick_df.index.values[idx],
+            y=close[idx],
+            mode='markers',
+            marker=dict(symbol=symbol, size=10, color=color),
+            name=name
+        ))
+
+    if len(bucket_ts) < len(timestamps):
+        title = f"{title}<br><sup>{len(timestamps):,} candles shown as {len(bucket_ts):,} buckets</sup>"
+
+    fig.update_layout(
+        title=title,
+        xaxis_title='Time',
+        yaxis_title='Price (INR)',
+        xaxis_rangeslider_visible=False,
+        hovermode="x unified"
+    )
+    return fig
+
+
+_figure_cache = OrderedDict()  # cache key -> go.Figure, least recently used first
+_figure_cache_lock = threading.Lock()
+
+
+def cached_figure(key, build):
+    """
+    Returns the figure for `key`, calling `build()` only on a miss. The figure is
+    kept as a go.Figure because st.plotly_chart re-validates anything else (a
+    dict or parsed JSON) through Plotly's object model on every call; callers
+    must not modify it.
+    Args:
+        key (tuple): Must identify the data version and every figure parameter.
+        build (callable): Returns the go.Figure.
+    Returns:
+        go.Figure: The cached figure.
+    """
+    with _figure_cache_lock:
+        if key in _figure_cache:
+            _figure_cache.move_to_end(key)
+            record_cache("figure", True)
+            return _figure_cache[key]
+    record_cache("figure", False)
+    with timed("figure_build_seconds"):
+        figure = build()
+    with _figure_cache_lock:
+        _figure_cache[key] = figure
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return figure
@@ -0,0 +1,138 @@
+# chat_archive.py
+
+import os
+import sqlite3
+import threading
+import time
+
+# --- Chat Archive Configuration ---
+# Sessions keep only their newest chat messages in memory; older ones are
+# spilled here (SQLite in WAL mode, like the portfolio ledger) and paged back in
+# on demand, so a session's footprint stays flat however long it chats.
+# Sessions never say goodbye, so the archive is pruned instead: on open and at
+# most once per PRUNE_INTERVAL_SECONDS while spilling, messages older than
+# CHAT_ARCHIVE_TTL_SECONDS are dropped, then the oldest beyond
+# CHAT_ARCHIVE_MAX_MESSAGES.
+CHAT_ARCHIVE_PATH = os.getenv(
+    "CHAT_ARCHIVE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "chat_archive.sqlite3"),
+)
+CHAT_ARCHIVE_TTL_SECONDS = float(os.getenv("CHAT_ARCHIVE_TTL_SECONDS", 7 * 24 * 3600))
+CHAT_ARCHIVE_MAX_MESSAGES = int(os.getenv("CHAT_ARCHIVE_MAX_MESSAGES", 100_000))
+PRUNE_INTERVAL_SECONDS = 3600
+COUNT_CACHE_SECONDS = 30  # counts are re-read at least this often, and after every write from this process
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_session ON messages (session_id, message_id);
+CREATE INDEX IF NOT EXISTS messages_by_time ON messages (ts);
+"""
+
+MESSAGE_FIELDS = ("message_id", "ts", "role", "content")
+
+
+class ChatArchive:
+    """Store of chat messages spilled out of session state, pruned by age and size."""
+
+    def __init__(self, path=CHAT_ARCHIVE_PATH, ttl_seconds=CHAT_ARCHIVE_TTL_SECONDS,
+                 max_messages=CHAT_ARCHIVE_MAX_MESSAGES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self._local = threading.local()
+        self._next_prune = 0.0
+        self._counts = {}  # session_id -> (expires_at, message count)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+        self.prune()
+
+    def _connection(self):
+        # sqlite3 connections may not be shared across threads; Streamlit runs each session in its own.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    def append(self, session_id, messages):
+        """Archives messages (dicts with 'role' and 'content'), oldest first."""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO messages (session_id, ts, role, content) VALUES (?, ?, ?, ?)",
+                [(session_id, now, m["role"], m["content"]) for m in messages],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._counts.pop(session_id, None)
+        if now >= self._next_prune:
+            self.prune()
+
+    def count(self, session_id):
+        """Returns how many of a session's messages are archived (pruning included), cached briefly."""
+        cached = self._counts.get(session_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        count = self._connection().execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+        self._counts[session_id] = (time.monotonic() + COUNT_CACHE_SECONDS, count)
+        return count
+
+    def get_messages(self, session_id, limit=20, offset=0):
+        """Returns one page of archived messages, newest first, as a list of dicts (see MESSAGE_FIELDS)."""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(MESSAGE_FIELDS)} FROM messages WHERE session_id = ? "
+            "ORDER BY message_id DESC LIMIT ? OFFSET ?",
+            (session_id, limit, offset),
+        ).fetchall()
+        return [dict(zip(MESSAGE_FIELDS, row)) for row in rows]
+
+    def delete(self, session_id):
+        self._connection().execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        self._counts.pop(session_id, None)
+
+    def prune(self):
+        """
+        Drops messages older than ttl_seconds, then the oldest beyond max_messages.
+        Returns:
+            int: Number of messages deleted.
+        """
+        self._next_prune = time.time() + PRUNE_INTERVAL_SECONDS
+        conn = self._connection()
+        deleted = conn.execute("DELETE FROM messages WHERE ts < ?", (time.time() - self.ttl_seconds,)).rowcount
+        deleted += conn.execute(
+            "DELETE FROM messages WHERE message_id <= "
+            "(SELECT message_id FROM messages ORDER BY message_id DESC LIMIT 1 OFFSET ?)",
+            (self.max_messages,),
+        ).rowcount
+        if deleted:
+            self._counts.clear()
+        return deleted
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_chat_archive():
+    """Returns the process-wide chat archive."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = ChatArchive()
+        return _archive
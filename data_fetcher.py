@@ -1,69 +1,491 @@
 # data_fetcher.py
 
 import requests
-import pandas as pd
 import datetime
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from requests.adapters import HTTPAdapter
+
+import av_parser
+from instrumentation import instrumented, increment, observe, record_cache, record_time, register_collector
+from ohlcv_store import get_store
 
 # --- Alpha Vantage API Configuration ---
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
-ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
+ALPHA_VANTAGE_BASE_URL = os.getenv("ALPHA_VANTAGE_BASE_URL", "https://www.alphavantage.co/query")
+REQUEST_TIMEOUT_SECONDS = 10
 
 # Check if API key is set
 if not ALPHA_VANTAGE_API_KEY:
     print("WARNING: ALPHA_VANTAGE_API_KEY environment variable is not set. Data fetching will fail.")
 
 
+# --- Shared Fetch Layer (process-wide) ---
+# Streamlit imports this module once per process, so everything below is shared
+# by all user sessions: one token bucket, one response cache and one set of
+# in-flight requests. N sessions asking for the same data cost one upstream call.
+AV_REQUESTS_PER_MINUTE = 5    # Free tier limits
+AV_REQUESTS_PER_DAY = 500
+AV_MAX_QUEUE_SECONDS = 15     # Longest a caller waits for a token when nothing is cached
+DAILY_MAX_TTL_SECONDS = 300   # The current day's FX_DAILY close keeps moving intraday
+CANDLE_BOUNDARY_GRACE_SECONDS = 5  # Give Alpha Vantage a moment to publish the new candle
+
+INTERVAL_SECONDS = {
+    "1min": 60,
+    "5min": 5 * 60,
+    "15min": 15 * 60,
+    "30min": 30 * 60,
+    "60min": 60 * 60,
+}
+
+
+class RateLimitError(ConnectionError):
+    """Raised when Alpha Vantage throttles us or the local quota is exhausted."""
+
+
+class StaleDataError(RateLimitError):
+    """
+    Raised instead of silently serving an expired cache entry when the caller
+    passes allow_stale=False; the entry is attached as `stale_value`.
+    """
+
+    def __init__(self, message, stale_value):
+        super().__init__(message)
+        self.stale_value = stale_value
+
+
+class _TokenBucket:
+    """
+    Token bucket enforcing the per-minute and per-day Alpha Vantage quotas.
+    The per-day counter resets at UTC midnight.
+    """
+
+    def __init__(self, per_minute, per_day):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.per_day = per_day
+        self.day = datetime.datetime.utcnow().date()
+        self.used_today = 0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+        today = datetime.datetime.utcnow().date()
+        if today != self.day:
+            self.day = today
+            self.used_today = 0
+
+    def acquire(self, max_wait):
+        """
+        Takes one token, sleeping up to `max_wait` seconds for it to become available.
+        Raises RateLimitError if the daily quota is used up or the wait would be too long.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.used_today >= self.per_day:
+                    raise RateLimitError(f"Daily Alpha Vantage quota of {self.per_day} requests exhausted.")
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    self.used_today += 1
+                    return
+                wait = (1.0 - self.tokens) / self.refill_per_second
+            if now + wait > deadline:
+                raise RateLimitError(
+                    f"Alpha Vantage rate limit reached ({AV_REQUESTS_PER_MINUTE}/min). Retry in {wait:.0f}s."
+                )
+            time.sleep(wait)
+
+    def remaining_today(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            return self.per_day - self.used_today
+
+
+class _InFlightRequest:
+    """A pending upstream call that identical concurrent requests wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.stale_reason = None   # set when `result` is an expired entry served because of throttling
+        self.error = None
+
+
+_rate_limiter = _TokenBucket(AV_REQUESTS_PER_MINUTE, AV_REQUESTS_PER_DAY)
+_state_lock = threading.Lock()
+_cache = {}      # cache key -> (expires_at, parsed result); expired entries are kept as stale fallbacks
+_inflight = {}   # cache key -> _InFlightRequest
+_stats = {
+    "hits": 0,            # served from a fresh cache entry
+    "misses": 0,          # led an upstream call
+    "coalesced": 0,       # waited on another session's identical in-flight call
+    "throttled": 0,       # local token bucket or Alpha Vantage refused the call
+    "stale_served": 0,    # throttled, but an expired cache entry was returned instead
+    "upstream_calls": 0,  # HTTP requests actually sent
+    "errors": 0,          # upstream calls that failed for any other reason
+}
+
+
+# One pooled HTTP session keeps connections to each upstream alive between
+# calls, so repeated and concurrent requests skip the TCP and TLS handshakes.
+# It is shared by every thread (sessions' script threads, the pair-fetch pool,
+# the streamer and the quote providers), which is safe because it is only ever
+# used through Session.get with per-call params and timeouts: its headers,
+# adapters and other settings are fixed here, under the lock, and never changed
+# afterwards, and urllib3's connection pool is thread-safe. Per-thread sessions
+# would lose the shared keep-alive connections to the short-lived pool threads.
+HTTP_POOL_SIZE = 10
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Returns the process-wide pooled requests.Session shared by all upstream calls."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def _cache_key(params):
+    return (
+        params.get("function"),
+        params.get("from_symbol"),
+        params.get("to_symbol"),
+        params.get("interval"),
+        params.get("outputsize"),
+    )
+
+
+def _cache_expiry(params, now):
+    """
+    Returns the wall-clock time at which a response for `params` goes stale.
+    Intraday data expires just after the next candle boundary, since nothing new
+    can be published before then. Daily data is capped at DAILY_MAX_TTL_SECONDS.
+    """
+    step = INTERVAL_SECONDS.get(params.get("interval"))
+    if step is None:
+        step = 24 * 60 * 60
+        next_boundary = (now // step + 1) * step
+        return min(next_boundary, now + DAILY_MAX_TTL_SECONDS)
+    next_boundary = (now // step + 1) * step
+    return next_boundary + CANDLE_BOUNDARY_GRACE_SECONDS
+
+
+def _record(stat):
+    with _state_lock:
+        _stats[stat] += 1
+
+
+def _cached_alpha_vantage_call(params, parse, allow_stale=True):
+    """
+    Performs an Alpha Vantage request through the shared fetch layer.
+    Args:
+        params (dict): Query parameters, without the API key.
+        parse (callable): Turns the requests.Response into the value to cache.
+            Raises RateLimitError on a rate-limit notice and ValueError on bad data.
+        allow_stale (bool): When throttled, return an expired cache entry if there is
+            one. False raises StaleDataError (carrying that entry) instead, so callers
+            that can go elsewhere (the quote router) see the throttle.
+    Returns:
+        The parsed value, from cache when fresh. Identical concurrent calls share one request.
+    """
+    value, stale_reason = _fetch_through_cache(params, parse)
+    if stale_reason is not None and not allow_stale:
+        raise StaleDataError(f"{stale_reason} (only an expired cached value is available)", value)
+    return value
+
+
+def _fetch_through_cache(params, parse):
+    """Returns (value, stale_reason); stale_reason is the throttle message when an expired entry was served."""
+    key = _cache_key(params)
+    now = time.time()
+    with _state_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] > now:
+            _stats["hits"] += 1
+            record_cache("alpha_vantage", True)
+            return entry[1], None
+        inflight = _inflight.get(key)
+        is_leader = inflight is None
+        if is_leader:
+            inflight = _InFlightRequest()
+            _inflight[key] = inflight
+            _stats["misses"] += 1
+        else:
+            _stats["coalesced"] += 1
+    # A waiter got no cached value, but costs no upstream call either, so it is
+    # counted on its own rather than as a hit or a miss.
+    if is_leader:
+        record_cache("alpha_vantage", False)
+    else:
+        increment("cache_coalesced_total", cache="alpha_vantage")
+
+    if not is_leader:
+        if not inflight.done.wait(AV_MAX_QUEUE_SECONDS + REQUEST_TIMEOUT_SECONDS):
+            raise ConnectionError("Timed out waiting for an in-flight Alpha Vantage request.")
+        if inflight.error is not None:
+            raise inflight.error
+        return inflight.result, inflight.stale_reason
+
+    try:
+        try:
+            # With a stale copy on hand, never queue behind the rate limit.
+            _rate_limiter.acquire(0 if entry is not None else AV_MAX_QUEUE_SECONDS)
+            _record("upstream_calls")
+            increment("upstream_requests_total", provider="alpha_vantage", function=params["function"])
+            started = time.perf_counter()
+            with get_http_session().get(
+                ALPHA_VANTAGE_BASE_URL,
+                params={**params, "apikey": ALPHA_VANTAGE_API_KEY},
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+                result = parse(response)
+                observe("upstream_payload_bytes", response.raw.tell(), function=params["function"])
+            record_time("upstream_seconds", time.perf_counter() - started, provider="alpha_vantage")
+        except RateLimitError as e:
+            _record("throttled")
+            if entry is None:
+                raise
+            _record("stale_served")
+            inflight.result, inflight.stale_reason = entry[1], str(e)
+            return entry[1], str(e)
+
+        with _state_lock:
+            _cache[key] = (_cache_expiry(params, time.time()), result)
+        inflight.result = result
+        return result, None
+    except BaseException as e:
+        if not isinstance(e, RateLimitError):
+            _record("errors")
+        inflight.error = e
+        raise
+    finally:
+        with _state_lock:
+            _inflight.pop(key, None)
+        inflight.done.set()
+
+
+# --- Pluggable Data Source ---
+# Normally quotes and candles come from Alpha Vantage. An installed source (e.g.
+# replay_feed.ReplayFeed) answers get_fx_rate, get_alpha_vantage_candlestick_data
+# and get_candles instead, so the app and strategies run unchanged on replayed data.
+_data_source = None
+
+
+def set_data_source(source):
+    """
+    Routes quote and candle requests to `source`, or back to Alpha Vantage when None.
+    Args:
+        source: Object with get_quote(symbol, to_symbol) and
+            get_candles(symbol, to_symbol, interval, outputsize, start=None, end=None).
+    """
+    global _data_source
+    _data_source = source
+
+
+def get_data_source():
+    """Returns the installed data source, or None when Alpha Vantage is used."""
+    return _data_source
+
+
+def get_fetch_stats():
+    """
+    Returns a snapshot of the shared fetch layer's counters, plus the cache size,
+    the hit ratio and the remaining daily Alpha Vantage quota.
+    """
+    with _state_lock:
+        stats = dict(_stats)
+        stats["cached_entries"] = len(_cache)
+    served = stats["hits"] + stats["coalesced"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / served if served else 0.0
+    stats["quota_remaining_today"] = _rate_limiter.remaining_today()
+    return stats
+
+
+register_collector(lambda: {
+    f"fetch_{name}": value for name, value in get_fetch_stats().items() if name != "hit_ratio"
+})
+
+
+def clear_fetch_cache():
+    """Drops every cached Alpha Vantage response."""
+    with _state_lock:
+        _cache.clear()
+
+
+# --- Daily Quota Budget ---
+# The token bucket only spreads calls within a minute; steady background polling
+# has to fit the daily quota too, or it drains it hours before UTC midnight and
+# every session goes without data. Pollers claim the requests per day they spend
+# on quotes and register the stores they keep current; those stores share what
+# is left after AV_RESERVED_REQUESTS_PER_DAY, kept free for on-demand calls
+# (seeding a new store, pairs nobody streams).
+SECONDS_PER_DAY = 24 * 60 * 60
+AV_RESERVED_REQUESTS_PER_DAY = 50
+_polling_claims = {}   # claimant -> Alpha Vantage requests per day
+_kept_current = set()  # (symbol, to_symbol) whose BASE_INTERVAL store a background poller syncs
+
+
+def claim_polling_budget(claimant, requests_per_day):
+    """Records that `claimant` spends `requests_per_day` on periodic calls (0 releases the claim)."""
+    with _state_lock:
+        if requests_per_day:
+            _polling_claims[claimant] = requests_per_day
+        else:
+            _polling_claims.pop(claimant, None)
+
+
+def keep_store_current(symbol, to_symbol, kept=True):
+    """
+    Registers a pair whose base store a background poller keeps current. get_candles
+    then serves it without syncing, and min_store_sync_seconds shares the budget with it.
+    """
+    with _state_lock:
+        if kept:
+            _kept_current.add((symbol, to_symbol))
+        else:
+            _kept_current.discard((symbol, to_symbol))
+
+
+def min_store_sync_seconds():
+    """
+    Shortest period at which each kept-current store may be synced without the
+    polling claims and store syncs together exceeding the daily quota.
+    """
+    with _state_lock:
+        claimed = sum(_polling_claims.values())
+        stores = max(len(_kept_current), 1)
+    available = AV_REQUESTS_PER_DAY - AV_RESERVED_REQUESTS_PER_DAY - claimed
+    if available < stores:
+        return SECONDS_PER_DAY
+    return stores * SECONDS_PER_DAY / available
+
+
+# --- Response Parsing ---
+# Parsing is done by av_parser, which maps fields by name ("4. close"), never by
+# position, and fills the Volume that FX series lack with 0. A body without the
+# expected series is checked for a notice or error message.
+DAILY_SERIES_KEY = "Time Series FX (Daily)"
+
+
+# "Note" and "Information" bodies are also used for premium-endpoint and invalid-call
+# notices, which would never succeed on retry; only this wording means throttling.
+RATE_LIMIT_NOTICE = re.compile(r"rate limit|call frequency|(?:calls|requests) per (?:minute|day)", re.IGNORECASE)
+
+
+def _check_notice(data):
+    """Raises RateLimitError for Alpha Vantage's rate-limit notices and ValueError for any other notice or error."""
+    notice = data.get("Note") or data.get("Information")
+    if notice:
+        if RATE_LIMIT_NOTICE.search(notice):
+            raise RateLimitError(f"Alpha Vantage API Note: {notice}")
+        raise ValueError(f"Alpha Vantage API Notice: {notice}")
+    if "Error Message" in data:
+        raise ValueError(f"Alpha Vantage API Error: {data['Error Message']}")
+
+
+def _parse_daily_close(response):
+    data = av_parser.decode(response.content)
+    _check_notice(data)
+    if DAILY_SERIES_KEY in data:
+        # Only the newest bar is converted; the rest of the series is never touched.
+        return av_parser.latest_close(data, DAILY_SERIES_KEY)
+    raise ValueError(f"Unexpected response from Alpha Vantage API for current rate: {data}")
+
+
+def _parse_intraday_candles(response, interval):
+    data = av_parser.decode(response.content)
+    _check_notice(data)
+    series_key = f"Time Series FX ({interval})"
+    if series_key not in data:
+        raise ValueError(f"Unexpected response from Alpha Vantage API for klines: {data}")
+    return av_parser.to_frame(*av_parser.parse_series(data, series_key))
+
+
+@instrumented
 def get_usd_inr_rate():
     """
     Fetches the current USD to INR exchange rate from Alpha Vantage.
     Uses FX_DAILY for a recent close price, as real-time tick data is paid.
     """
+    return get_fx_rate("USD", "INR")
+
+
+@instrumented
+def get_fx_rate(symbol="USD", to_symbol="INR", allow_stale=True):
+    """
+    Fetches the latest FX_DAILY close for a currency pair from Alpha Vantage.
+    Args:
+        symbol (str): Base currency (e.g., "USD").
+        to_symbol (str): Target currency (e.g., "INR").
+        allow_stale (bool): False raises StaleDataError rather than returning an
+            expired cached close while throttled.
+    Returns:
+        float: The newest daily close.
+    """
+    if _data_source is not None:
+        return _data_source.get_quote(symbol, to_symbol)
     if not ALPHA_VANTAGE_API_KEY:
         raise ValueError("ALPHA_VANTAGE_API_KEY is not set.")
 
     params = {
         "function": "FX_DAILY",
-        "from_symbol": "USD",
-        "to_symbol": "INR",
-        "apikey": ALPHA_VANTAGE_API_KEY
+        "from_symbol": symbol,
+        "to_symbol": to_symbol,
+        "outputsize": "compact",  # only the newest close is needed
     }
 
     try:
-        response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params)
-        response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
-        data = response.json()
-
-        if "Time Series FX (Daily)" in data:
-            # Get the most recent day's data
-            latest_day = list(data["Time Series FX (Daily)"].keys())[0]
-            current_rate = float(data["Time Series FX (Daily)"][latest_day]["4. close"])
-            return current_rate
-        elif "Error Message" in data:
-            raise ValueError(f"Alpha Vantage API Error: {data['Error Message']}")
-        else:
-            raise ValueError(f"Unexpected response from Alpha Vantage API for current rate: {data}")
+        return _cached_alpha_vantage_call(params, _parse_daily_close, allow_stale)
 
     except requests.exceptions.RequestException as e:
         raise ConnectionError(f"Could not connect to Alpha Vantage API for current price: {e}")
+    except ConnectionError:
+        raise
     except ValueError as e:
         raise ValueError(f"Error parsing Alpha Vantage API response for current price: {e}")
     except Exception as e:
         raise Exception(f"An unexpected error occurred while fetching current price: {e}")
 
 
-def get_alpha_vantage_candlestick_data(symbol="USD", to_symbol="INR", interval="60min", outputsize="compact"):
+@instrumented
+def get_alpha_vantage_candlestick_data(symbol="USD", to_symbol="INR", interval="60min", outputsize="compact",
+                                       allow_stale=True):
     """
     Fetches intraday candlestick data (OHLCV) for a given forex pair from Alpha Vantage.
-    Free tier limits apply: 5 requests/minute, 500 requests/day.
+    Free tier limits apply: 5 requests/minute, 500 requests/day. Responses are shared
+    across sessions and cached until the next candle boundary.
     Args:
         symbol (str): Base currency (e.g., "USD").
         to_symbol (str): Target currency (e.g., "INR").
         interval (str): Time interval (e.g., "1min", "5min", "15min", "30min", "60min").
         outputsize (str): "compact" (last 100 points) or "full" (all available data).
+        allow_stale (bool): False raises StaleDataError rather than returning expired
+            cached candles while throttled.
     Returns:
         pd.DataFrame: DataFrame with 'Open', 'High', 'Low', 'Close', 'Volume' columns and Datetime index.
     """
+    if _data_source is not None:
+        return _data_source.get_candles(symbol, to_symbol, interval, outputsize)
     if not ALPHA_VANTAGE_API_KEY:
         raise ValueError("ALPHA_VANTAGE_API_KEY is not set.")
 
@@ -73,39 +495,298 @@ def get_alpha_vantage_candlestick_data(symbol="USD", to_symbol="INR", interval="
         "to_symbol": to_symbol,
         "interval": interval,
         "outputsize": outputsize,
-        "apikey": ALPHA_VANTAGE_API_KEY
     }
 
     try:
-        response = requests.get(ALPHA_VANTAGE_BASE_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        time_series_key = f"Time Series FX ({interval})"
-        if time_series_key in data:
-            raw_data = data[time_series_key]
-            df = pd.DataFrame.from_dict(raw_data, orient='index', dtype=float)
-            df.index = pd.to_datetime(df.index)
-            df = df.sort_index() # Ensure chronological order
-
-            df.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-            df.index.name = 'Datetime'
-            return df[['Open', 'High', 'Low', 'Close', 'Volume']]
-        elif "Error Message" in data:
-            raise ValueError(f"Alpha Vantage API Error: {data['Error Message']}")
-        elif "Note" in data:
-            # This often means rate limit hit
-            raise ConnectionError(f"Alpha Vantage API Note: {data['Note']}. Likely rate limit hit.")
-        else:
-            raise ValueError(f"Unexpected response from Alpha Vantage API for klines: {data}")
+        # Callers add indicator columns, so never hand out the cached frame itself
+        return _cached_alpha_vantage_call(
+            params, lambda response: _parse_intraday_candles(response, interval), allow_stale
+        ).copy()
 
     except requests.exceptions.RequestException as e:
         raise ConnectionError(f"Could not connect to Alpha Vantage API for klines: {e}")
+    except ConnectionError:
+        raise
     except ValueError as e:
         raise ValueError(f"Error parsing Alpha Vantage API response for klines: {e}")
     except Exception as e:
         raise Exception(f"An unexpected error occurred while fetching klines: {e}")
 
+
+# --- Incremental OHLCV Store Sync ---
+# The on-disk store is seeded once with outputsize="full" and then kept current
+# with compact deltas. Only the newest stored bar is rewritten (it may still have
+# been forming when first saved); everything else is append-only.
+_next_store_sync = {}  # (symbol, to_symbol, interval) -> time.time() before which the store is current
+
+
+def _frame_to_columns(df):
+    timestamps = df.index.values.astype("datetime64[ns]").view(np.int64)
+    return timestamps, {name: df[name].to_numpy(dtype=float) for name in df.columns}
+
+
+@instrumented
+def sync_candle_store(symbol="USD", to_symbol="INR", interval="60min"):
+    """
+    Brings the local store for a pair/interval up to date with Alpha Vantage.
+    Returns:
+        int: Number of bars written (including a refreshed final bar).
+    """
+    key = (symbol, to_symbol, interval)
+    if time.time() < _next_store_sync.get(key, 0):
+        return 0
+
+    store = get_store(symbol, to_symbol, interval)
+    with store.lock:
+        last = store.last_timestamp()
+        outputsize = "full" if last is None else "compact"
+        df = get_alpha_vantage_candlestick_data(symbol, to_symbol, interval, outputsize)
+        if last is not None and not df.empty:
+            step_ns = INTERVAL_SECONDS[interval] * 1_000_000_000
+            if df.index[0].value > last + step_ns:
+                # The compact window no longer reaches back to our newest bar; backfill the gap.
+                df = get_alpha_vantage_candlestick_data(symbol, to_symbol, interval, "full")
+        timestamps, columns = _frame_to_columns(df)
+        if last is not None and len(timestamps) and timestamps[0] <= last:
+            store.truncate_from(last)
+        written = store.append(timestamps, columns)
+    _next_store_sync[key] = _cache_expiry({"interval": interval}, time.time())
+    return written
+
+
+# --- Local Resampling ---
+# Only BASE_INTERVAL is fetched from Alpha Vantage; coarser candles are built
+# locally from it and kept in their own stores, updated from the last
+# (possibly still open) bucket onwards whenever the base store is written,
+# including an in-place rewrite of its still-forming bar. The trade-off: every
+# interval depends on the 1-minute feed, and coarse history reaches back only as
+# far as the stored 1-minute bars. Syncing costs one call per candle of the
+# finest interval being viewed, not per minute (see market_stream), since one
+# compact 1-minute response covers 100 minutes.
+BASE_INTERVAL = "1min"
+_resampled_versions = {}  # (symbol, to_symbol, interval) -> base store version() (with its write generation)
+
+
+@instrumented
+def resample_ohlcv(timestamps, columns, step_seconds):
+    """
+    Aggregates sorted OHLCV bars into `step_seconds` buckets aligned to the epoch.
+    Args:
+        timestamps (np.ndarray): Sorted int64 nanosecond timestamps.
+        columns (dict): 'Open', 'High', 'Low', 'Close', 'Volume' arrays aligned with `timestamps`.
+        step_seconds (int): Bucket width.
+    Returns:
+        tuple: (bucket start timestamps, dict of aggregated columns).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) == 0:
+        return timestamps, {name: np.empty(0) for name in ("Open", "High", "Low", "Close", "Volume")}
+    step_ns = step_seconds * 1_000_000_000
+    buckets = timestamps // step_ns
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    aggregated = {
+        "Open": np.asarray(columns["Open"])[starts],
+        "High": np.maximum.reduceat(columns["High"], starts),
+        "Low": np.minimum.reduceat(columns["Low"], starts),
+        "Close": np.asarray(columns["Close"])[ends],
+        "Volume": np.add.reduceat(columns["Volume"], starts),
+    }
+    return buckets[starts] * step_ns, aggregated
+
+
+@instrumented
+def update_resampled_store(symbol="USD", to_symbol="INR", interval="5min"):
+    """
+    Rebuilds the tail of the locally resampled store for `interval` from the base store.
+    Returns:
+        OHLCVStore: The resampled store.
+    """
+    key = (symbol, to_symbol, interval)
+    base = get_store(symbol, to_symbol, BASE_INTERVAL)
+    derived = get_store(symbol, to_symbol, f"resampled_{interval}")
+    version = base.version()
+    if _resampled_versions.get(key) == version:
+        return derived
+
+    with derived.lock:
+        last = derived.last_timestamp()
+        view = base.read(start=last)
+        timestamps = view.pop("Datetime").view(np.int64)
+        bucket_ts, columns = resample_ohlcv(timestamps, view, INTERVAL_SECONDS[interval])
+        if last is not None:
+            derived.truncate_from(last)
+        derived.append(bucket_ts, columns)
+    _resampled_versions[key] = version
+    return derived
+
+
+@instrumented
+def get_candles(symbol="USD", to_symbol="INR", interval="60min", start=None, end=None, sync=True):
+    """
+    Returns stored OHLCV history for a pair/interval, syncing the store first.
+    Intervals coarser than BASE_INTERVAL are resampled locally and cost no API quota.
+    If the sync fails (e.g. rate limit) but history exists locally, the stored
+    bars are returned as they are.
+    Args:
+        start, end: Optional bounds of the time range to read (anything pd.Timestamp accepts).
+        sync (bool): False serves stored bars without waiting on Alpha Vantage. Pairs a
+            background poller keeps current (see keep_store_current) are never synced
+            here, so callers spend no quota on them. An empty store is still synced.
+    Returns:
+        pd.DataFrame: Same shape as get_alpha_vantage_candlestick_data's result.
+    """
+    if _data_source is not None:
+        return _data_source.get_candles(symbol, to_symbol, interval, "full", start, end)
+    base = get_store(symbol, to_symbol, BASE_INTERVAL)
+    try:
+        if (sync and (symbol, to_symbol) not in _kept_current) or len(base) == 0:
+            sync_candle_store(symbol, to_symbol, BASE_INTERVAL)
+    except (ConnectionError, ValueError):
+        if len(base) == 0:
+            raise
+    if interval == BASE_INTERVAL:
+        return base.to_frame(start, end)
+    return update_resampled_store(symbol, to_symbol, interval).to_frame(start, end)
+
+
+def read_stored_candles(symbol="USD", to_symbol="INR", interval="60min", start=None, end=None):
+    """
+    Returns stored OHLCV history without fetching or writing anything, for a process
+    that only reads the stores another process keeps current (e.g. `main.py serve`).
+    Intervals coarser than BASE_INTERVAL are resampled in memory from the base store.
+    Raises:
+        ValueError: If the writer rewrote the stored bars during the read.
+    Returns:
+        pd.DataFrame: Same shape as get_candles' result.
+    """
+    if _data_source is not None:
+        return _data_source.get_candles(symbol, to_symbol, interval, "full", start, end)
+    base = get_store(symbol, to_symbol, BASE_INTERVAL, read_only=True)
+    if interval == BASE_INTERVAL:
+        return base.to_frame(start, end)
+    step_ns = INTERVAL_SECONDS[interval] * 1_000_000_000
+    # From the start of the bucket holding `start`, so the first candle is complete.
+    first = None if start is None else pd.Timestamp(start).value // step_ns * step_ns
+    view = base.read(first, end)
+    bucket_ts, columns = resample_ohlcv(view.pop("Datetime").view(np.int64), view, INTERVAL_SECONDS[interval])
+    index = pd.DatetimeIndex(bucket_ts.view("datetime64[ns]"), name="Datetime")
+    return pd.DataFrame(columns, index=index, columns=list(columns))
+
+
+# --- Multi-Pair Candles and Cross Rates ---
+# Only pairs against the quote currency (USD) are fetched, and always in market
+# convention (EUR/USD, GBP/USD, USD/INR, USD/JPY), so each currency has exactly
+# one stored leg whichever way round it is asked for. Every other pair is derived
+# locally as a cross, e.g. EUR/INR = EUR/USD * USD/INR, and inverses as 1/x, so
+# a cross or an inverse costs no API quota. The legs are read concurrently through
+# get_candles (and so through the shared token bucket and pooled session), then
+# aligned on their common timestamps into one frame with a column per pair.
+CROSS_VIA = "USD"
+USD_QUOTED_CURRENCIES = ("EUR", "GBP", "AUD", "NZD")  # quoted as X/USD; every other currency as USD/X
+TRACKED_PAIRS = ("USD/INR", "EUR/INR", "GBP/INR", "USD/JPY")
+CROSS_FIELDS = ("Open", "Close")  # products of the legs' High/Low are not the cross's High/Low
+
+
+def _parse_pair(pair):
+    if isinstance(pair, str):
+        base, _, quote = pair.upper().partition("/")
+    else:
+        base, quote = (part.upper() for part in pair)
+    if not base or not quote or base == quote:
+        raise ValueError(f"Invalid currency pair {pair!r}; use e.g. 'EUR/INR' or ('EUR', 'INR').")
+    return base, quote
+
+
+def _usd_leg(currency):
+    """The market-convention pair of `currency` against CROSS_VIA, e.g. ("EUR", "USD") or ("USD", "INR")."""
+    return (currency, CROSS_VIA) if currency in USD_QUOTED_CURRENCIES else (CROSS_VIA, currency)
+
+
+def plan_pair_legs(pairs):
+    """
+    Works out which pairs must be fetched to serve `pairs`.
+    Args:
+        pairs (list): Pairs as "EUR/INR" strings or (base, quote) tuples.
+    Returns:
+        tuple: (legs, recipes). `legs` is the sorted list of market-convention USD pairs
+        to fetch; `recipes` maps each requested "BASE/QUOTE" to a list of (leg, exponent)
+        factors whose product is that pair's price.
+    """
+    legs, recipes = set(), {}
+    for base, quote in (_parse_pair(pair) for pair in pairs):
+        path = [(base, quote)] if CROSS_VIA in (base, quote) else [(base, CROSS_VIA), (CROSS_VIA, quote)]
+        factors = []
+        for wanted in path:
+            leg = _usd_leg(wanted[1] if wanted[0] == CROSS_VIA else wanted[0])
+            legs.add(leg)
+            factors.append((leg, 1 if leg == wanted else -1))
+        recipes[f"{base}/{quote}"] = factors
+    return sorted(legs), recipes
+
+
+@instrumented
+def get_multi_pair_candles(pairs=TRACKED_PAIRS, interval="60min", field="Close", start=None, end=None, sync=True):
+    """
+    Returns one price column per pair, aligned on a shared time index.
+    Legs are fetched concurrently within the Alpha Vantage rate budget; crosses are
+    derived locally. Pairs whose legs could not be fetched are left out with a warning.
+    Args:
+        pairs (list): Pairs as "EUR/INR" strings or (base, quote) tuples.
+        interval (str): Candle interval, as for get_candles.
+        field (str): "Close" or "Open", the prices that multiply exactly into crosses.
+        start, end: As for get_candles.
+        sync (bool): As for get_candles. Legs a background poller keeps current (see
+            keep_store_current) are never synced here; every other leg is synced through
+            the token bucket at most once per candle, since the result only reaches as
+            far as the stalest leg.
+    Returns:
+        pd.DataFrame: Datetime index of the bars every needed leg has, one column per
+        pair in request order. `.to_numpy()` gives the (bars x pairs) array.
+    """
+    if field not in CROSS_FIELDS:
+        raise ValueError(f"Unsupported field {field!r}; use one of {', '.join(CROSS_FIELDS)}.")
+    legs, recipes = plan_pair_legs(pairs)
+
+    def fetch(leg):
+        return get_candles(symbol=leg[0], to_symbol=leg[1], interval=interval, start=start, end=end, sync=sync)
+
+    frames, failed = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(legs), AV_REQUESTS_PER_MINUTE)),
+                            thread_name_prefix="pair-fetch") as pool:
+        futures = {leg: pool.submit(fetch, leg) for leg in legs}
+        for leg, future in futures.items():
+            try:
+                frames[leg] = future.result()
+            except (ConnectionError, ValueError) as e:
+                failed[leg] = e
+
+    available = {name: factors for name, factors in recipes.items() if all(leg in frames for leg, _ in factors)}
+    for name in recipes.keys() - available.keys():
+        errors = "; ".join(f"{'/'.join(leg)}: {failed[leg]}" for leg, _ in recipes[name] if leg in failed)
+        print(f"WARNING: Could not build {name} candles: {errors}")
+    if not available:
+        errors = "; ".join(f"{'/'.join(leg)}: {e}" for leg, e in failed.items())
+        raise ConnectionError(f"No pair could be fetched: {errors}")
+
+    used = sorted({leg for factors in available.values() for leg, _ in factors})
+    leg_times = {leg: frames[leg].index.values.astype("datetime64[ns]").view(np.int64) for leg in used}
+    common = leg_times[used[0]]
+    for leg in used[1:]:
+        common = np.intersect1d(common, leg_times[leg], assume_unique=True)
+    leg_prices = {
+        leg: frames[leg][field].to_numpy(dtype=float)[np.searchsorted(leg_times[leg], common)] for leg in used
+    }
+
+    prices = np.empty((len(common), len(available)))
+    for j, factors in enumerate(available.values()):
+        column = np.ones(len(common))
+        for leg, exponent in factors:
+            column = column * leg_prices[leg] if exponent > 0 else column / leg_prices[leg]
+        prices[:, j] = column
+    index = pd.DatetimeIndex(common.view("datetime64[ns]"), name="Datetime")
+    return pd.DataFrame(prices, index=index, columns=list(available))
+
 # Example of how to test this function (optional, for local debugging)
 if __name__ == "__main__":
     # For local testing, set the environment variable temporarily:
@@ -118,6 +799,6 @@ if __name__ == "__main__":
         candlesticks = get_alpha_vantage_candlestick_data(interval="5min", outputsize="compact")
         print("\nLast 100 5-Minute USD/INR Candlesticks (Alpha Vantage):")
         print(candlesticks.head())
+        print(f"\nFetch stats: {get_fetch_stats()}")
     except Exception as e:
         print(f"Error: {e}")
-
@@ -0,0 +1,266 @@
+# instrumentation.py
+
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from latency import LatencyHistogram
+
+# --- Metrics Configuration ---
+# Process-wide timers, counters and value summaries, shared by every Streamlit
+# session like the fetch layer is. Each metric is keyed by name plus labels (as
+# in Prometheus), timers keep constant-memory latency histograms, and recording
+# costs a lock and a bisect, so the hooks can stay on in production. Set
+# METRICS_PORT to serve everything in Prometheus text format on
+# http://METRICS_HOST:METRICS_PORT/metrics.
+METRIC_PREFIX = "usdinr_"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT")
+EXPORTED_QUANTILES = (0.5, 0.9, 0.99)
+
+IMPORTED_AT = time.perf_counter()   # the app imports this module before its other modules
+
+_lock = threading.Lock()
+_first_render_recorded = False
+_timers = {}      # (name, labels) -> LatencyHistogram of seconds
+_counters = {}    # (name, labels) -> float
+_summaries = {}   # (name, labels) -> [count, total, max], e.g. payload sizes in bytes
+_collectors = []  # callables returning {name: value}, exported as gauges
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def record_time(name, seconds, **labels):
+    key = _key(name, labels)
+    histogram = _timers.get(key)
+    if histogram is None:
+        with _lock:
+            histogram = _timers.setdefault(key, LatencyHistogram(name))
+    histogram.record(seconds)
+
+
+@contextmanager
+def timed(name, **labels):
+    """Records how long the `with` block took, e.g. `with timed("section_seconds", section="chart"):`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(name, time.perf_counter() - start, **labels)
+
+
+def instrumented(function):
+    """
+    Decorator timing every call of `function` as function_seconds{function="module.name"}
+    and counting the calls that raised as function_errors_total.
+    """
+    label = f"{function.__module__}.{function.__name__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            increment("function_errors_total", function=label)
+            raise
+        finally:
+            record_time("function_seconds", time.perf_counter() - start, function=label)
+
+    return wrapper
+
+
+def record_first_render():
+    """Records first_render_seconds, from this module's import to the first completed render, once per process."""
+    global _first_render_recorded
+    with _lock:
+        if _first_render_recorded:
+            return
+        _first_render_recorded = True
+    record_time("first_render_seconds", time.perf_counter() - IMPORTED_AT)
+
+
+def increment(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Adds one value (e.g. a payload size in bytes) to a count/sum/max summary."""
+    key = _key(name, labels)
+    with _lock:
+        summary = _summaries.setdefault(key, [0, 0.0, 0.0])
+        summary[0] += 1
+        summary[1] += value
+        summary[2] = max(summary[2], value)
+
+
+def record_cache(cache, hit):
+    """Counts one lookup in a named cache as a hit or a miss."""
+    increment("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def register_collector(collect):
+    """Adds a callable whose {name: number} result is exported as gauges on every scrape."""
+    with _lock:
+        _collectors.append(collect)
+
+
+def reset_metrics():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _summaries.clear()
+
+
+# --- Snapshots ---
+
+def _label_text(labels):
+    return ",".join(f"{k}={v}" for k, v in labels)
+
+
+def metrics_snapshot():
+    """
+    Returns the current metrics as plain dicts for display.
+    Returns:
+        dict: 'timers' and 'summaries' (lists of dicts with name, labels and statistics),
+        'counters' ({"name{labels}": value}) and 'cache_hit_ratios' ({cache: ratio}).
+    """
+    with _lock:
+        timers = list(_timers.items())
+        counters = dict(_counters)
+        summaries = {key: list(value) for key, value in _summaries.items()}
+    cache_totals = {}
+    for (name, labels), value in counters.items():
+        if name == "cache_requests_total":
+            labels = dict(labels)
+            hits, total = cache_totals.get(labels["cache"], (0, 0))
+            cache_totals[labels["cache"]] = (hits + (value if labels["result"] == "hit" else 0), total + value)
+    return {
+        "timers": [
+            {"name": name, "labels": _label_text(labels), **histogram.snapshot()}
+            for (name, labels), histogram in sorted(timers, key=lambda item: item[0])
+        ],
+        "counters": {
+            f"{name}{{{_label_text(labels)}}}" if labels else name: value
+            for (name, labels), value in sorted(counters.items())
+        },
+        "summaries": [
+            {"name": name, "labels": _label_text(labels), "count": count, "mean": total / count, "max": peak}
+            for (name, labels), (count, total, peak) in sorted(summaries.items())
+        ],
+        "cache_hit_ratios": {cache: hits / total for cache, (hits, total) in sorted(cache_totals.items()) if total},
+    }
+
+
+def _prometheus_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def prometheus_text():
+    """Renders every metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        timers = sorted(_timers.items(), key=lambda item: item[0])
+        counters = sorted(_counters.items())
+        summaries = sorted((key, list(value)) for key, value in _summaries.items())
+        collectors = list(_collectors)
+
+    lines = []
+    declared = set()
+
+    def declare(name, kind):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), histogram in timers:
+        metric = METRIC_PREFIX + name
+        declare(metric, "summary")
+        for q in EXPORTED_QUANTILES:
+            value = histogram.percentile(q * 100)
+            lines.append(f"{metric}{_prometheus_labels(labels, [('quantile', q)])} {value or 0.0:.9g}")
+        lines.append(f"{metric}_sum{_prometheus_labels(labels)} {histogram.total:.9g}")
+        lines.append(f"{metric}_count{_prometheus_labels(labels)} {histogram.count}")
+    for (name, labels), value in counters:
+        metric = METRIC_PREFIX + name
+        declare(metric, "counter")
+        lines.append(f"{metric}{_prometheus_labels(labels)} {value:.9g}")
+    for (name, labels), (count, total, peak) in summaries:
+        metric = METRIC_PREFIX + name
+        declare(metric, "summary")
+        lines.append(f"{metric}_sum{_prometheus_labels(labels)} {total:.9g}")
+        lines.append(f"{metric}_count{_prometheus_labels(labels)} {count}")
+    # Each metric family must be one contiguous group, so the maxima come after all summaries.
+    for (name, labels), (count, total, peak) in summaries:
+        metric = METRIC_PREFIX + name + "_max"
+        declare(metric, "gauge")
+        lines.append(f"{metric}{_prometheus_labels(labels)} {peak:.9g}")
+    for collect in collectors:
+        try:
+            gauges = collect()
+        except Exception as e:
+            print(f"WARNING: Metrics collector {collect!r} failed: {e}")
+            continue
+        for name, value in sorted(gauges.items()):
+            metric = METRIC_PREFIX + name
+            declare(metric, "gauge")
+            lines.append(f"{metric} {float(value):.9g}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Metrics Endpoint ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=METRICS_HOST):
+    """
+    Starts the process-wide /metrics endpoint in a daemon thread (once).
+    Args:
+        port (int): Port to listen on (0 picks a free one); defaults to METRICS_PORT. Nothing
+            is started when neither is set.
+    Returns:
+        str: The endpoint URL, or None if no server is running.
+    """
+    global _server
+    port = port if port is not None else METRICS_PORT
+    with _server_lock:
+        if _server is None and port not in (None, ""):
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                print(f"WARNING: Could not start the metrics endpoint on {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        if _server is None:
+            return None
+        bound_host, bound_port = _server.server_address[:2]
+        return f"http://{bound_host}:{bound_port}/metrics"
@@ -0,0 +1,145 @@
+# langchain_agent.py
+
+import os
+import re
+
+# --- LLM Configuration ---
+LLM_REPO_ID = "HuggingFaceTB/SmolLM3-3B"
+LLM_TEMPERATURE = 0.7
+LLM_MAX_NEW_TOKENS = 256
+# "fake" swaps in a local canned-response LLM so benchmarks and load tests run offline.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "huggingface")
+FAKE_LLM_RESPONSE = "USD/INR has been range-bound recently; watch the SMA crossover for a breakout."
+
+# --- Memory Budget ---
+# Prompt size must not grow with the conversation. Recent turns are kept verbatim
+# up to HISTORY_TOKEN_BUDGET; older turns are folded into an extractive summary
+# (each question with the first sentence of its answer) capped at
+# SUMMARY_TOKEN_BUDGET. Tokens are estimated at ~4 characters each, which is
+# close enough for budgeting without loading a tokenizer.
+HISTORY_TOKEN_BUDGET = 768
+SUMMARY_TOKEN_BUDGET = 128
+SUMMARY_QUESTION_CHARS = 80   # evicted questions are shortened to this
+SUMMARY_ANSWER_CHARS = 120    # and the first sentence of their answers to this
+CHARS_PER_TOKEN = 4
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+PROMPT_TEMPLATE = """You are a helpful AI assistant specialized in USD to INR exchange rates and general forex trends.
+You can analyze the provided chart data (candlesticks and SMAs) to give insights.
+If the user asks for the current USD to INR price, you should provide it.
+Keep your responses concise and to the point.
+{summary}
+Current conversation:
+{history}
+Human: {input}
+AI:"""
+STOP_SEQUENCES = ["\nHuman:"]
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _shorten(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def get_llm(hf_token):
+    """
+    Creates a streaming Hugging Face LLM client for a token. Callers cache it (the
+    app keeps one per process with st.cache_resource).
+    HuggingFaceEndpoint is used rather than HuggingFaceHub because it can stream tokens.
+    LangChain is imported here rather than at module level: it is the slowest
+    import in the app and only the chat needs it.
+    """
+    if LLM_BACKEND == "fake":
+        from langchain_community.llms.fake import FakeStreamingListLLM
+        return FakeStreamingListLLM(responses=[FAKE_LLM_RESPONSE])
+    from langchain_community.llms import HuggingFaceEndpoint
+    return HuggingFaceEndpoint(
+        repo_id=LLM_REPO_ID,
+        huggingfacehub_api_token=hf_token,
+        temperature=LLM_TEMPERATURE,
+        max_new_tokens=LLM_MAX_NEW_TOKENS,
+        streaming=True,
+    )
+
+
+class TokenBudgetMemory:
+    """
+    Sliding-window conversation memory with an extractive summary of evicted turns.
+    Holds only plain strings, so it is cheap to keep in session state.
+    """
+
+    def __init__(self, history_budget=HISTORY_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET):
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.turns = []          # (human, ai) pairs, oldest first
+        self.turn_tokens = []    # estimated tokens per turn
+        self.summary_points = []  # (shortened question, first sentence of the answer), oldest first
+
+    def add_turn(self, human, ai):
+        self.turns.append((human, ai))
+        self.turn_tokens.append(estimate_tokens(human) + estimate_tokens(ai))
+        while len(self.turns) > 1 and sum(self.turn_tokens) > self.history_budget:
+            self._evict_oldest()
+        if self.turn_tokens[-1] > self.history_budget:
+            self._truncate_newest()
+
+    def _truncate_newest(self):
+        # A single turn larger than the whole budget cannot be evicted into place, so
+        # cut it down: the question keeps up to a quarter of the room, the answer the rest.
+        human, ai = self.turns[-1]
+        room = max(self.history_budget - 2, 0) * CHARS_PER_TOKEN
+        human = _shorten(human, max(min(len(human), room // 4), 1))
+        ai = _shorten(ai, max(room - len(human), 1))
+        self.turns[-1] = (human, ai)
+        self.turn_tokens[-1] = estimate_tokens(human) + estimate_tokens(ai)
+
+    def _evict_oldest(self):
+        human, ai = self.turns.pop(0)
+        self.turn_tokens.pop(0)
+        first_sentence = _SENTENCE_END.split(ai.strip(), maxsplit=1)[0] if ai.strip() else ""
+        self.summary_points.append(
+            (_shorten(human, SUMMARY_QUESTION_CHARS), _shorten(first_sentence, SUMMARY_ANSWER_CHARS))
+        )
+        while self.summary_points and estimate_tokens(self.summary()) > self.summary_budget:
+            question, answer = self.summary_points[0]
+            if answer:
+                self.summary_points[0] = (question, "")   # the oldest answers go first
+            else:
+                self.summary_points.pop(0)
+
+    def summary(self):
+        """The evicted turns as one line: each question, with its answer's gist while the budget allows."""
+        if not self.summary_points:
+            return ""
+        points = "; ".join(f"{q} (you said: {a})" if a else q for q, a in self.summary_points)
+        return f"Earlier the user asked: {points}\n"
+
+    def clear(self):
+        self.turns, self.turn_tokens, self.summary_points = [], [], []
+
+    def build_prompt(self, user_input):
+        history = "\n".join(f"Human: {human}\nAI: {ai}" for human, ai in self.turns)
+        return PROMPT_TEMPLATE.format(summary=self.summary(), history=history, input=user_input)
+
+
+def stream_response(llm, memory, user_input, context=""):
+    """
+    Streams the LLM's answer chunk by chunk and records the finished turn in `memory`.
+    Args:
+        llm: A LangChain LLM (see get_llm).
+        memory (TokenBudgetMemory): The session's conversation memory.
+        user_input (str): The user's question, as stored in memory.
+        context (str): Fresh market context prepended to this turn's question only.
+    Yields:
+        str: Response text chunks.
+    """
+    prompt = memory.build_prompt(f"{context}{user_input}")
+    chunks = []
+    for chunk in llm.stream(prompt, stop=STOP_SEQUENCES):
+        chunks.append(chunk)
+        yield chunk
+    memory.add_turn(user_input, "".join(chunks).strip())
@@ -0,0 +1,74 @@
+# latency.py
+
+import bisect
+import math
+import threading
+
+# --- Latency Histograms ---
+# Fixed log-spaced buckets from 1 µs to ~100 s (BUCKETS_PER_DECADE per factor of
+# ten), so recording is O(log buckets), memory is constant however many samples
+# arrive, and any percentile is accurate to within one bucket (~12%).
+MIN_SECONDS = 1e-6
+DECADES = 8
+BUCKETS_PER_DECADE = 20
+_BOUNDS = [MIN_SECONDS * 10 ** (i / BUCKETS_PER_DECADE) for i in range(DECADES * BUCKETS_PER_DECADE + 1)]
+
+
+class LatencyHistogram:
+    """Thread-safe histogram of durations in seconds."""
+
+    def __init__(self, name=""):
+        self.name = name
+        self.counts = [0] * (len(_BOUNDS) + 1)   # counts[i] holds samples <= _BOUNDS[i]; the last is overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        seconds = max(seconds, 0.0)
+        i = bisect.bisect_left(_BOUNDS, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Returns the upper bound of the bucket holding the p-th percentile (0-100), in seconds."""
+        with self.lock:
+            if not self.count:
+                return None
+            rank = max(1, math.ceil(self.count * p / 100.0))
+            seen = 0
+            for i, n in enumerate(self.counts):
+                seen += n
+                if seen >= rank:
+                    return min(_BOUNDS[i] if i < len(_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * (len(_BOUNDS) + 1)
+            self.count, self.total, self.max = 0, 0.0, 0.0
+
+    def snapshot(self):
+        """Returns the sample count with mean, p50, p90, p99 and max in milliseconds (None when empty)."""
+        if not self.count:
+            return {"count": 0, "mean_ms": None, "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count,
+            "p50_ms": 1000 * self.percentile(50),
+            "p90_ms": 1000 * self.percentile(90),
+            "p99_ms": 1000 * self.percentile(99),
+            "max_ms": 1000 * self.max,
+        }
+
+    def summary(self):
+        """One-line description for logs and reports."""
+        s = self.snapshot()
+        if not s["count"]:
+            return f"{self.name}: no samples"
+        return (f"{self.name}: n={s['count']} p50 {s['p50_ms']:.3f} ms, p90 {s['p90_ms']:.3f} ms, "
+                f"p99 {s['p99_ms']:.3f} ms, max {s['max_ms']:.3f} ms")
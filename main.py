@@ -0,0 +1,146 @@
+# main.py
+#
+# Command-line entry point for running the bot without the Streamlit UI:
+#
+#     python main.py paper --source replay --intervals 1min,5min,15min
+#     python main.py paper --source replay --speed 60 --start 2024-06-01
+#     python main.py serve --port 8000
+#     python main.py paper --source live --shorts 5:50:5 --longs 20:200:10
+
+import argparse
+import time
+
+import numpy as np
+
+REPORT_EVERY_SECONDS = 60
+REPLAY_WARMUP_BARS = 0
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+
+
+def parse_windows(text):
+    """Parses "5:50:5" as range(5, 51, 5) and "10,20,30" as a list of windows."""
+    if ":" in text:
+        start, stop, step = (int(part) for part in text.split(":"))
+        return list(range(start, stop + 1, step))
+    return [int(part) for part in text.split(",")]
+
+
+def print_report(bank, top):
+    stats = bank.latency_stats()
+    if stats["p50_ms"] is None:
+        print(f"{stats['bars']} bars processed")
+    else:
+        print(
+            f"{stats['bars']} bars · {len(bank.configs)} strategies · per-bar step "
+            f"p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms, max {stats['max_ms']:.3f} ms"
+        )
+    for rank, row in enumerate(bank.leaderboard(top), 1):
+        print(
+            f"  {rank:2d}. {row['interval']:>5s} SMA {row['short']:3d}/{row['long']:<3d} "
+            f"₹{row['total_value_inr']:,.2f}  realized ₹{row['realized_pnl_inr']:,.2f}  "
+            f"{row['trades']} trades"
+        )
+
+
+def print_latencies(bank):
+    for histogram in bank.latency_histograms():
+        print(f"  {histogram.summary()}")
+
+
+def run_paper(args):
+    from paper_trader import StrategyBank, strategy_grid, LiveBarFeeder
+    from portfolio_ledger import get_ledger
+
+    configs = strategy_grid(parse_windows(args.shorts), parse_windows(args.longs), args.intervals.split(","))
+    bank = StrategyBank(configs, order_usd=args.order_usd, ledger=get_ledger() if args.ledger else None)
+    print(f"Paper trading {len(configs)} strategies on {args.symbol}/{args.to_symbol} ({args.source} data)")
+
+    def log_fills(ts, fills):
+        if args.verbose:
+            for (interval, short, long), side, amount_usd, price in fills:
+                print(f"{np.datetime64(ts, 'ns')} {interval} SMA {short}/{long}: {side} ${amount_usd:,.2f} @ ₹{price:.4f}")
+
+    if args.source == "replay":
+        from data_fetcher import set_data_source
+        from replay_feed import ReplayFeed
+
+        feed = ReplayFeed(args.symbol, args.to_symbol, speed=args.speed, start=args.start, end=args.end,
+                          warmup_bars=args.warmup_bars)
+        set_data_source(feed)
+        feeder = LiveBarFeeder(feed, bank, on_fills=log_fills)
+        started = time.perf_counter()
+        try:
+            feed.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            feeder.unsubscribe()
+            set_data_source(None)
+        elapsed = time.perf_counter() - started
+        print_report(bank, args.top)
+        print(f"Replayed {feed.position} bars in {elapsed:.2f} s ({feed.position / max(elapsed, 1e-9):,.0f} bars/s)")
+        print_latencies(bank)
+        return
+
+    from market_stream import get_streamer
+
+    feeder = LiveBarFeeder(get_streamer(args.symbol, args.to_symbol), bank, on_fills=log_fills)
+    try:
+        while True:
+            time.sleep(args.report_every)
+            print_report(bank, args.top)
+    except KeyboardInterrupt:
+        feeder.unsubscribe()
+        print_report(bank, args.top)
+        print_latencies(bank)
+
+
+def run_serve(args):
+    import uvicorn
+    from market_api import create_app
+
+    # A separate process has its own fetch cache, token bucket and daily count, so it
+    # must not call Alpha Vantage: it only reads what the dashboard keeps current.
+    uvicorn.run(create_app(read_only=True), host=args.host, port=args.port, log_level="warning")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="USD/INR trading bot command-line tools.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    paper = subcommands.add_parser("paper", help="Run many SMA crossover strategies as paper trades.")
+    paper.add_argument("--source", choices=("live", "replay"), default="replay",
+                       help="Live 1-minute bars from the market streamer, or stored history.")
+    paper.add_argument("--symbol", default="USD")
+    paper.add_argument("--to-symbol", default="INR")
+    paper.add_argument("--shorts", default="5:50:5", help="Short SMA windows, as start:stop:step or a list.")
+    paper.add_argument("--longs", default="20:200:10", help="Long SMA windows, as start:stop:step or a list.")
+    paper.add_argument("--intervals", default="1min,5min,15min,30min,60min", help="Comma-separated candle intervals.")
+    paper.add_argument("--order-usd", type=float, default=1000.0, help="USD bought on each BUY crossover.")
+    paper.add_argument("--ledger", action="store_true", help="Record fills in the portfolio ledger.")
+    paper.add_argument("--start", default=None, help="Replay start time (e.g. 2024-06-01).")
+    paper.add_argument("--end", default=None, help="Replay end time.")
+    paper.add_argument("--speed", type=float, default=0,
+                       help="Replay speed as a multiple of real time (0 = as fast as possible).")
+    paper.add_argument("--warmup-bars", type=int, default=REPLAY_WARMUP_BARS,
+                       help="Replayed bars used only to warm up the SMAs.")
+    paper.add_argument("--top", type=int, default=10, help="Strategies shown in each report.")
+    paper.add_argument("--report-every", type=float, default=REPORT_EVERY_SECONDS,
+                       help="Seconds between live reports.")
+    paper.add_argument("--verbose", action="store_true", help="Print every fill.")
+
+    serve = subcommands.add_parser(
+        "serve", help="Serve the stored rates, candles and signals over a read-only HTTP API, without fetching.")
+    serve.add_argument("--host", default=API_HOST)
+    serve.add_argument("--port", type=int, default=API_PORT)
+
+    args = parser.parse_args()
+    if args.command == "paper":
+        run_paper(args)
+    elif args.command == "serve":
+        run_serve(args)
+
+
+if __name__ == "__main__":
+    main()
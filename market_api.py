@@ -0,0 +1,256 @@
+# market_api.py
+#
+# Read-only HTTP API over the same data the dashboard uses. With API_PORT set,
+# the Streamlit process serves it from a daemon thread (like the /metrics
+# endpoint), so API clients share the dashboard's streamer, fetch cache, token
+# bucket and daily quota and cost no Alpha Vantage calls of their own:
+#
+#     API_PORT=8000 streamlit run streamlit_app.py
+#     curl 'http://127.0.0.1:8000/candles?interval=5min&since=1717200000000'
+#
+# `python main.py serve` runs it as a separate process instead. That process is
+# strictly read-only: it starts no streamer, never calls Alpha Vantage, and
+# serves the on-disk stores and the last saved rate that a running dashboard
+# (or paper trader) keeps current.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from data_fetcher import INTERVAL_SECONDS, get_candles, read_stored_candles
+from instrumentation import increment, prometheus_text, timed
+from market_stream import find_streamer, load_last_rate
+from trading_logic import compute_sma_signals
+
+# --- Conditional Responses ---
+# Every response carries an ETag derived from a cheap version token (the newest
+# bar, the bar count, the quote time), computed before anything is serialized.
+# A poller that sends it back as If-None-Match gets an empty 304 while nothing
+# changed, and `since=` limits candle and signal payloads to what is new, so
+# polling costs neither upstream quota nor bytes. Bars are returned from `since`
+# inclusive: the newest bar may still be forming, so pollers pass the timestamp
+# of the last bar they hold and receive it again, updated, with anything newer.
+CACHE_CONTROL = "no-cache"   # clients may store responses but must revalidate
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = os.getenv("API_PORT")
+API_START_TIMEOUT_SECONDS = 10
+
+
+def _etag(*parts):
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest() + '"'
+
+
+def _not_modified(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _respond(request, endpoint, etag, build):
+    """Returns a 304 if the client's ETag still matches, otherwise the JSON built by `build()`."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, etag):
+        increment("api_responses_total", endpoint=endpoint, status="304")
+        return Response(status_code=304, headers=headers)
+    body = json.dumps(build(), separators=(",", ":"))
+    increment("api_responses_total", endpoint=endpoint, status="200")
+    increment("api_response_bytes_total", len(body), endpoint=endpoint)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def parse_since(since):
+    """Parses epoch milliseconds ("1717200000000") or anything pd.Timestamp accepts into a UTC-naive Timestamp."""
+    if since is None:
+        return None
+    try:
+        timestamp = pd.Timestamp(int(since), unit="ms") if since.isdigit() else pd.Timestamp(since)
+    except ValueError:
+        raise HTTPException(400, f"Invalid since={since!r}; use epoch milliseconds or an ISO timestamp.")
+    return timestamp.tz_convert(None) if timestamp.tzinfo is not None else timestamp
+
+
+def _epoch_ms(index):
+    return (np.asarray(index, dtype="datetime64[ns]").view(np.int64) // 1_000_000).tolist()
+
+
+def _load_candles(symbol, to_symbol, interval, read_only):
+    if interval not in INTERVAL_SECONDS:
+        raise HTTPException(400, f"Unsupported interval {interval!r}; use one of {', '.join(INTERVAL_SECONDS)}.")
+    try:
+        if read_only:
+            return read_stored_candles(symbol=symbol, to_symbol=to_symbol, interval=interval)
+        # Pollers count as viewers: the pair's streamer keeps this interval current while they ask.
+        streamer = find_streamer(symbol, to_symbol)
+        if streamer is not None:
+            streamer.request_interval(interval)
+        return get_candles(symbol=symbol, to_symbol=to_symbol, interval=interval, sync=False)
+    except (ConnectionError, ValueError) as e:
+        raise HTTPException(503, f"Candles are unavailable: {e}")
+
+
+def _latest_rate(symbol, to_symbol, read_only):
+    """The running streamer's quote, else the last one saved to disk; never fetched here."""
+    streamer = None if read_only else find_streamer(symbol, to_symbol)
+    if streamer is not None:
+        snapshot = streamer.snapshot()
+        if snapshot["rate"] is not None:
+            return snapshot["rate"], snapshot["rate_time"], snapshot["rate_provider"]
+    last = load_last_rate(symbol, to_symbol)
+    if last is None:
+        error = streamer.snapshot()["last_error"] if streamer is not None else None
+        raise HTTPException(503, f"No {symbol}/{to_symbol} rate yet: {error or 'none has been fetched'}")
+    return last["rate"], last["time"], last["provider"]
+
+
+def _data_version(df):
+    # Changes whenever a bar is added or the still-forming last bar is updated.
+    if df.empty:
+        return None
+    return len(df), int(df.index[-1].value), float(df["Close"].iloc[-1])
+
+
+# --- Endpoints ---
+
+def create_app(read_only=False):
+    """
+    Builds the FastAPI application. Handlers are sync, so FastAPI runs them in its thread pool.
+    Args:
+        read_only (bool): Serve only what is on disk, without writing the stores (for a
+            process separate from the one keeping them current). Otherwise candles come
+            through this process's fetch layer and the quote from its running streamer.
+    """
+    app = FastAPI(title="USD/INR Market Data", description="Quotes, candles and SMA signals from the trading bot's cache.")
+
+    @app.get("/rate")
+    def rate(request: Request, symbol: str = "USD", to_symbol: str = "INR"):
+        """The latest quote kept current by the background market streamer."""
+        with timed("api_seconds", endpoint="rate"):
+            value, updated_at, provider = _latest_rate(symbol, to_symbol, read_only)
+            return _respond(request, "rate", _etag(symbol, to_symbol, value, updated_at), lambda: {
+                "symbol": symbol,
+                "to_symbol": to_symbol,
+                "rate": value,
+                "updated_at": updated_at,
+                "provider": provider,
+            })
+
+    @app.get("/candles")
+    def candles(request: Request, symbol: str = "USD", to_symbol: str = "INR", interval: str = "60min",
+                since: str = None, limit: int = None):
+        """
+        Stored OHLCV bars as columns of equal length, timestamps in epoch milliseconds.
+        `since` returns bars at or after that time; `limit` keeps only the newest bars.
+        """
+        with timed("api_seconds", endpoint="candles"):
+            df = _load_candles(symbol, to_symbol, interval, read_only)
+            start = parse_since(since)
+            etag = _etag(symbol, to_symbol, interval, _data_version(df), since, limit)
+
+            def build():
+                rows = df.loc[start:] if start is not None else df
+                if limit is not None:
+                    rows = rows.tail(max(limit, 0))
+                return {
+                    "symbol": symbol,
+                    "to_symbol": to_symbol,
+                    "interval": interval,
+                    "time": _epoch_ms(rows.index),
+                    **{name.lower(): rows[name].tolist() for name in ("Open", "High", "Low", "Close", "Volume")},
+                }
+
+            return _respond(request, "candles", etag, build)
+
+    @app.get("/signals")
+    def signals(request: Request, symbol: str = "USD", to_symbol: str = "INR", interval: str = "60min",
+                short: int = 20, long: int = 50, since: str = None):
+        """
+        Latest SMA values and bias over the full stored history, plus the crossovers
+        (at or after `since`, else all of them) as epoch-millisecond times.
+        """
+        if not 0 < short < long:
+            raise HTTPException(400, "Require 0 < short < long.")
+        with timed("api_seconds", endpoint="signals"):
+            df = _load_candles(symbol, to_symbol, interval, read_only)
+            start = parse_since(since)
+            etag = _etag(symbol, to_symbol, interval, _data_version(df), short, long, since)
+
+            def build():
+                result = compute_sma_signals(df["Close"].to_numpy(), short, long)
+                times = _epoch_ms(df.index)
+                crossovers = sorted(
+                    [(i, "BUY") for i in result["buy_idx"].tolist()] + [(i, "SELL") for i in result["sell_idx"].tolist()]
+                )
+                first = None if start is None else int(df.index.searchsorted(start, side="left"))
+                last_short = result["sma_short"][-1] if len(df) else np.nan
+                last_long = result["sma_long"][-1] if len(df) else np.nan
+                ready = not (np.isnan(last_short) or np.isnan(last_long))
+                return {
+                    "symbol": symbol,
+                    "to_symbol": to_symbol,
+                    "interval": interval,
+                    "short": short,
+                    "long": long,
+                    "time": times[-1] if times else None,
+                    "sma_short": float(last_short) if ready else None,
+                    "sma_long": float(last_long) if ready else None,
+                    "bias": ("BUY" if last_short > last_long else "SELL" if last_short < last_long else None)
+                    if ready else None,
+                    "crossovers": [
+                        {"time": times[i], "side": side} for i, side in crossovers if first is None or i >= first
+                    ],
+                }
+
+            return _respond(request, "signals", etag, build)
+
+    @app.get("/metrics")
+    def metrics():
+        """The process's instrumentation in Prometheus text format."""
+        return Response(prometheus_text(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return app
+
+
+# --- In-Process Server ---
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_api_server(port=None, host=API_HOST):
+    """
+    Starts the process-wide API in a daemon thread (once), sharing this process's data.
+    Args:
+        port (int): Port to listen on (0 picks a free one); defaults to API_PORT. Nothing
+            is started when neither is set.
+    Returns:
+        str: The API's base URL, or None if no server is running.
+    """
+    global _server
+    import uvicorn
+
+    port = port if port is not None else API_PORT
+    with _server_lock:
+        if _server is None and port not in (None, ""):
+            server = uvicorn.Server(uvicorn.Config(create_app(), host=host, port=int(port), log_level="warning"))
+            thread = threading.Thread(target=server.run, name="market-api", daemon=True)
+            thread.start()
+            deadline = time.monotonic() + API_START_TIMEOUT_SECONDS
+            while not server.started and thread.is_alive() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            if not server.started:
+                print(f"WARNING: Could not start the market API on {host}:{port}.")
+                server.should_exit = True
+                return None
+            _server = server
+        if _server is None:
+            return None
+        bound_host, bound_port = _server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{bound_host}:{bound_port}"
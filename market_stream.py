@@ -0,0 +1,382 @@
+# market_stream.py
+
+import json
+import math
+import os
+import threading
+import time
+import numpy as np
+
+from data_fetcher import (
+    BASE_INTERVAL,
+    INTERVAL_SECONDS,
+    CANDLE_BOUNDARY_GRACE_SECONDS,
+    SECONDS_PER_DAY,
+    claim_polling_budget,
+    get_data_source,
+    keep_store_current,
+    min_store_sync_seconds,
+    sync_candle_store,
+)
+from ohlcv_store import get_store, PRICE_COLUMNS
+from quote_providers import get_quote_router
+from trading_logic import IndicatorEngine
+
+# --- Streaming Configuration ---
+# One poller per pair refreshes the quote every RATE_POLL_SECONDS (through the
+# hedged provider router, quote_providers.py) and syncs the pair's 1-minute store
+# just after a candle of the finest interval anyone currently needs has closed.
+# Viewers declare what they need with request_interval (renewed while they watch)
+# or by subscribing with an interval. Each sync costs one Alpha Vantage call, so
+# the sync period is also never shorter than what the daily quota leaves once the
+# quote polls are counted (data_fetcher.min_store_sync_seconds): on the free tier
+# 1-minute bars arrive in batches about every 9 minutes rather than every minute.
+RING_CAPACITY = 2048          # 1-minute bars kept in memory (~34 hours)
+RATE_POLL_SECONDS = 300       # matches the FX_DAILY cache TTL
+ERROR_BACKOFF_SECONDS = 30
+DEMAND_TTL_SECONDS = 120      # a requested interval stays needed this long after its last request
+IDLE_INTERVAL = "60min"       # synced this often while nobody needs anything finer
+
+# --- Warm Start ---
+# A new process starts from what the last one knew: the ring buffer is filled
+# from the OHLCV store and the quote from the last rate saved here, so the first
+# render has data while the first poll refreshes it in the background.
+LAST_RATE_PATH = os.getenv(
+    "LAST_RATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "last_rate.json"),
+)
+LAST_KNOWN_PROVIDER = "last known"
+_last_rate_lock = threading.Lock()
+
+
+def load_last_rate(symbol, to_symbol):
+    """Returns the last saved quote for a pair as a dict with 'rate', 'time' and 'provider', or None."""
+    try:
+        with open(LAST_RATE_PATH) as f:
+            return json.load(f).get(f"{symbol}/{to_symbol}")
+    except (OSError, ValueError):
+        return None
+
+
+def save_last_rate(symbol, to_symbol, rate, rate_time, provider):
+    """Records a pair's latest quote for the next process's warm start."""
+    with _last_rate_lock:
+        try:
+            with open(LAST_RATE_PATH) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        saved[f"{symbol}/{to_symbol}"] = {"rate": rate, "time": rate_time, "provider": provider}
+        os.makedirs(os.path.dirname(os.path.abspath(LAST_RATE_PATH)), exist_ok=True)
+        tmp_path = f"{LAST_RATE_PATH}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, LAST_RATE_PATH)
+
+
+class RingBuffer:
+    """
+    Fixed-size, array-backed buffer of the most recent OHLCV bars.
+    A bar whose timestamp equals the newest one replaces it (the candle was still forming).
+    """
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(PRICE_COLUMNS)))
+        self.count = 0
+        self.head = 0     # next slot to write
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def push(self, timestamps, values):
+        """
+        Adds bars oldest-first.
+        Args:
+            timestamps (np.ndarray): int64 nanosecond timestamps.
+            values (np.ndarray): Shape (n, 5) array of Open, High, Low, Close, Volume.
+        """
+        with self.lock:
+            for ts, row in zip(timestamps, values):
+                newest = (self.head - 1) % self.capacity
+                if self.count and self.timestamps[newest] == ts:
+                    self.values[newest] = row
+                else:
+                    self.timestamps[self.head] = ts
+                    self.values[self.head] = row
+                    self.head = (self.head + 1) % self.capacity
+                    self.count += 1
+            self.version += 1
+
+    def latest_timestamp(self):
+        with self.lock:
+            return int(self.timestamps[(self.head - 1) % self.capacity]) if self.count else None
+
+    def snapshot(self):
+        """Returns (timestamps, values) copies in chronological order."""
+        with self.lock:
+            n = len(self)
+            order = (np.arange(self.head - n, self.head)) % self.capacity
+            return self.timestamps[order].view("datetime64[ns]"), self.values[order]
+
+
+class MarketDataStreamer:
+    """
+    Background thread that keeps a RingBuffer and the latest quote current and
+    notifies subscribers. Subscribers are called from the poller thread as
+    callback(event, payload) with event "bars" (payload: timestamps, values of the
+    new or updated bars) or "rate" (payload: the new rate).
+    """
+
+    def __init__(self, symbol="USD", to_symbol="INR", capacity=RING_CAPACITY):
+        self.symbol = symbol
+        self.to_symbol = to_symbol
+        self.buffer = RingBuffer(capacity)
+        self.rate = None
+        self.rate_time = None
+        self.rate_provider = None
+        self.published_at = None  # time.perf_counter() of the latest "bars" event, for latency tracking
+        self.last_error = None
+        self._subscribers = []
+        self._subscriber_intervals = {}   # callback -> interval it needs
+        self._demand = {}                 # interval -> time.time() of its latest request
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._next_rate_poll = 0.0
+        self._last_bar_sync = 0.0
+        self._preload()
+
+    def _preload(self):
+        """
+        Fills the ring buffer from the local store and the quote from the last saved
+        rate, so snapshots have data immediately. The warm-start quote's provider is
+        LAST_KNOWN_PROVIDER until the first poll replaces it.
+        """
+        view = get_store(self.symbol, self.to_symbol, BASE_INTERVAL).read()
+        timestamps = view["Datetime"][-self.buffer.capacity:].view(np.int64)
+        values = np.column_stack([view[name][-self.buffer.capacity:] for name in PRICE_COLUMNS])
+        if len(timestamps):
+            self.buffer.push(timestamps, values)
+        last = load_last_rate(self.symbol, self.to_symbol)
+        if last is not None:
+            self.rate, self.rate_time, self.rate_provider = last["rate"], last["time"], LAST_KNOWN_PROVIDER
+
+    def subscribe(self, callback, interval=None):
+        """
+        Registers a callback and returns a function that unregisters it.
+        Args:
+            interval (str): Candle interval the subscriber needs kept current while it is
+                subscribed (e.g. BASE_INTERVAL for a strategy on 1-minute bars), if any.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            if interval is not None:
+                self._subscriber_intervals[callback] = interval
+        if interval is not None:
+            self._wake.set()
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+                self._subscriber_intervals.pop(callback, None)
+        return unsubscribe
+
+    def request_interval(self, interval):
+        """Marks `interval` as needed by a viewer for the next DEMAND_TTL_SECONDS."""
+        with self._lock:
+            finer = INTERVAL_SECONDS[interval] < INTERVAL_SECONDS[self.needed_interval(locked=True)]
+            self._demand[interval] = time.time()
+        if finer:
+            self._wake.set()
+
+    def needed_interval(self, locked=False):
+        """The finest interval currently requested or subscribed to, else IDLE_INTERVAL."""
+        if not locked:
+            with self._lock:
+                return self.needed_interval(locked=True)
+        cutoff = time.time() - DEMAND_TTL_SECONDS
+        needed = [interval for interval, at in self._demand.items() if at >= cutoff]
+        needed += self._subscriber_intervals.values()
+        return min(needed + [IDLE_INTERVAL], key=INTERVAL_SECONDS.get)
+
+    def bar_sync_seconds(self):
+        """
+        Seconds between store syncs: a whole number of the needed interval's candles,
+        and no fewer than the daily quota allows.
+        """
+        step = INTERVAL_SECONDS[self.needed_interval()]
+        return step * max(1, math.ceil(min_store_sync_seconds() / step))
+
+    def _notify(self, event, payload):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(f"WARNING: market data subscriber failed on '{event}': {e}")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="market-data-streamer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _poll_bars(self):
+        sync_candle_store(self.symbol, self.to_symbol, BASE_INTERVAL)
+        latest = self.buffer.latest_timestamp()
+        view = get_store(self.symbol, self.to_symbol, BASE_INTERVAL).read(start=latest)
+        timestamps = view["Datetime"].view(np.int64)
+        if len(timestamps) == 0:
+            return
+        values = np.column_stack([view[name] for name in PRICE_COLUMNS])
+        self.buffer.push(timestamps, values)
+        self.published_at = time.perf_counter()
+        self._notify("bars", (timestamps.view("datetime64[ns]"), values))
+
+    def _poll_rate(self):
+        # Hedged across providers, so one throttled or slow vendor does not stall the quote.
+        rate, self.rate_provider = get_quote_router().get_quote(self.symbol, self.to_symbol)
+        self.rate_time = time.time()
+        if rate != self.rate:
+            self.rate = rate
+            # Only a new rate is worth rewriting the warm-start file for.
+            try:
+                save_last_rate(self.symbol, self.to_symbol, rate, self.rate_time, self.rate_provider)
+            except OSError as e:
+                print(f"WARNING: Could not save the last {self.symbol}/{self.to_symbol} rate: {e}")
+            self._notify("rate", rate)
+
+    def _next_bar_sync(self):
+        # Just after the first sync-period boundary since the last sync, so syncs land
+        # right after the needed interval's candles close.
+        period = self.bar_sync_seconds()
+        return (self._last_bar_sync // period + 1) * period + CANDLE_BOUNDARY_GRACE_SECONDS
+
+    def poll_once(self):
+        """Runs the polls that are due; errors are kept in `last_error` instead of raised."""
+        try:
+            if time.time() >= self._next_rate_poll:
+                self._poll_rate()
+                self._next_rate_poll = time.time() + RATE_POLL_SECONDS
+            if time.time() >= self._next_bar_sync():
+                self._poll_bars()
+                self._last_bar_sync = time.time()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+
+    def _run(self):
+        claimant = f"{self.symbol}/{self.to_symbol} quote"
+        claim_polling_budget(claimant, SECONDS_PER_DAY / RATE_POLL_SECONDS)
+        keep_store_current(self.symbol, self.to_symbol)
+        try:
+            while not self._stop.is_set():
+                self.poll_once()
+                if self.last_error:
+                    wait = ERROR_BACKOFF_SECONDS
+                else:
+                    wait = min(self._next_rate_poll, self._next_bar_sync()) - time.time()
+                # Woken early when a viewer starts needing a finer interval.
+                self._wake.wait(max(wait, 0))
+                self._wake.clear()
+        finally:
+            claim_polling_budget(claimant, 0)
+            keep_store_current(self.symbol, self.to_symbol, kept=False)
+
+    def snapshot(self):
+        """
+        Returns the latest state without blocking on the network.
+        Returns:
+            dict: 'rate', 'rate_time', 'rate_provider', 'timestamps', 'values', 'version'
+            and 'last_error'.
+        """
+        timestamps, values = self.buffer.snapshot()
+        return {
+            "rate": self.rate,
+            "rate_time": self.rate_time,
+            "rate_provider": self.rate_provider,
+            "timestamps": timestamps,
+            "values": values,
+            "version": self.buffer.version,
+            "last_error": self.last_error,
+        }
+
+
+_streamers = {}
+_streamers_lock = threading.Lock()
+
+
+def get_streamer(symbol="USD", to_symbol="INR"):
+    """
+    Returns the process-wide, already started streamer for a pair. When a replay
+    feed is installed as the data source (see data_fetcher.set_data_source), that
+    feed is returned instead.
+    """
+    source = get_data_source()
+    if isinstance(source, MarketDataStreamer):
+        return source.start()
+    key = (symbol, to_symbol)
+    with _streamers_lock:
+        if key not in _streamers:
+            _streamers[key] = MarketDataStreamer(symbol, to_symbol).start()
+        return _streamers[key]
+
+
+def find_streamer(symbol="USD", to_symbol="INR"):
+    """
+    Returns the streamer get_streamer already started for a pair in this process
+    (or the installed replay feed), or None. Never starts one, so callers that
+    only read spend no quote polls.
+    """
+    source = get_data_source()
+    if isinstance(source, MarketDataStreamer):
+        return source
+    with _streamers_lock:
+        return _streamers.get((symbol, to_symbol))
+
+
+class LiveSignalSubscriber:
+    """
+    Subscriber that feeds each closed bar into an IndicatorEngine and keeps the
+    latest indicator values and crossover signal. The newest bar is still forming,
+    so it is only fed once a later bar arrives.
+    """
+
+    def __init__(self, streamer, short_window=20, long_window=50):
+        timestamps, values = streamer.buffer.snapshot()
+        closed = slice(0, max(len(timestamps) - 1, 0))
+        self.engine = IndicatorEngine.from_history(values[closed, 3], short_window=short_window,
+                                                   long_window=long_window)
+        self.last_fed = int(timestamps[closed][-1].astype(np.int64)) if len(timestamps) > 1 else None
+        self.latest = None
+        self.last_signal = None
+        self.last_signal_time = None
+        self.unsubscribe = streamer.subscribe(self)
+
+    def __call__(self, event, payload):
+        if event != "bars":
+            return
+        timestamps, values = payload
+        timestamps = timestamps.view(np.int64)
+        for ts, close in zip(timestamps[:-1], values[:-1, 3]):
+            if self.last_fed is not None and ts <= self.last_fed:
+                continue
+            self.latest = self.engine.update(float(close))
+            self.last_fed = int(ts)
+            if self.latest["signal"]:
+                self.last_signal = self.latest["signal"]
+                self.last_signal_time = np.datetime64(int(ts), "ns")
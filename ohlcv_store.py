@@ -0,0 +1,167 @@
+# ohlcv_store.py
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# --- Store Configuration ---
+# Each pair/interval gets its own directory holding one raw little-endian binary
+# file per column. Files are append-only (apart from rewriting the newest bars)
+# and read back through np.memmap: a time-range read maps the file and copies
+# just the requested slice, under the store lock. A process that only reads
+# stores another process writes opens them read-only: nothing is repaired or
+# created, and columns are read with plain file reads, since a mapping touched
+# after the writer truncates the file would crash the reader.
+OHLCV_STORE_DIR = os.getenv(
+    "OHLCV_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ohlcv"),
+)
+
+TIMESTAMP_COLUMN = "Datetime"
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+_COLUMN_DTYPES = {TIMESTAMP_COLUMN: np.dtype("<i8"), **{name: np.dtype("<f8") for name in PRICE_COLUMNS}}
+
+
+class OHLCVStore:
+    """
+    Persistent columnar OHLCV history for one currency pair and interval.
+    Timestamps are stored as int64 nanoseconds and must be strictly increasing.
+    """
+
+    def __init__(self, symbol, to_symbol, interval, root=None, read_only=False):
+        self.symbol = symbol
+        self.to_symbol = to_symbol
+        self.interval = interval
+        self.path = os.path.join(root or OHLCV_STORE_DIR, f"{symbol}_{to_symbol}_{interval}")
+        self.read_only = read_only
+        self.lock = threading.RLock()
+        self.generation = 0   # bumped by every write, so in-place rewrites change version()
+        if not read_only:
+            os.makedirs(self.path, exist_ok=True)
+            self._repair()
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _column_length(self, name):
+        try:
+            return os.path.getsize(self._column_path(name)) // _COLUMN_DTYPES[name].itemsize
+        except FileNotFoundError:
+            return 0
+
+    def _repair(self):
+        """Truncates every column to the shortest one, undoing a half-finished append."""
+        with self.lock:
+            n = min(self._column_length(name) for name in _COLUMN_DTYPES)
+            for name, dtype in _COLUMN_DTYPES.items():
+                path = self._column_path(name)
+                if not os.path.exists(path):
+                    open(path, "wb").close()
+                elif self._column_length(name) != n:
+                    os.truncate(path, n * dtype.itemsize)
+
+    def __len__(self):
+        return self._column_length(TIMESTAMP_COLUMN)
+
+    def _map(self, name, n):
+        if n == 0:
+            return np.empty(0, dtype=_COLUMN_DTYPES[name])
+        if self.read_only:
+            # Shorter than n if the writer truncated the file meanwhile; read() then raises.
+            return np.fromfile(self._column_path(name), dtype=_COLUMN_DTYPES[name], count=n)
+        return np.memmap(self._column_path(name), dtype=_COLUMN_DTYPES[name], mode="r", shape=(n,))
+
+    def last_timestamp(self):
+        """Returns the newest stored timestamp as int64 nanoseconds, or None if the store is empty."""
+        with self.lock:
+            n = len(self)
+            return int(self._map(TIMESTAMP_COLUMN, n)[-1]) if n else None
+
+    def version(self):
+        """Returns a cheap token that changes whenever this process writes to the store."""
+        with self.lock:
+            return (self.generation, len(self), self.last_timestamp())
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"OHLCV store {self.path} is open read-only.")
+
+    def append(self, timestamps, columns):
+        """
+        Appends rows newer than the last stored timestamp.
+        Args:
+            timestamps (np.ndarray): Sorted int64 nanosecond timestamps.
+            columns (dict): Column name -> array aligned with `timestamps`.
+        Returns:
+            int: Number of rows written.
+        """
+        self._check_writable()
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        with self.lock:
+            last = self.last_timestamp()
+            start = 0 if last is None else int(np.searchsorted(timestamps, last, side="right"))
+            if start >= len(timestamps):
+                return 0
+            # Timestamps go last: a crash mid-append leaves price columns longer, which _repair trims.
+            for name in PRICE_COLUMNS:
+                values = np.asarray(columns[name], dtype=_COLUMN_DTYPES[name])[start:]
+                with open(self._column_path(name), "ab") as f:
+                    f.write(values.tobytes())
+            with open(self._column_path(TIMESTAMP_COLUMN), "ab") as f:
+                f.write(timestamps[start:].tobytes())
+            self.generation += 1
+            return len(timestamps) - start
+
+    def truncate_from(self, timestamp):
+        """Drops every row at or after `timestamp` (int64 nanoseconds)."""
+        self._check_writable()
+        with self.lock:
+            n = len(self)
+            keep = int(np.searchsorted(self._map(TIMESTAMP_COLUMN, n), timestamp, side="left"))
+            if keep == n:
+                return
+            for name, dtype in _COLUMN_DTYPES.items():
+                os.truncate(self._column_path(name), keep * dtype.itemsize)
+            self.generation += 1
+
+    def read(self, start=None, end=None):
+        """
+        Returns copies of the rows with start <= Datetime <= end.
+        Mapped views are never handed out: truncate_from shrinks the files, and
+        touching a mapping past the new end of file would crash the reader (SIGBUS).
+        Args:
+            start, end: Anything pd.Timestamp accepts, or None for an open bound.
+        Returns:
+            dict: 'Datetime' (datetime64[ns]) plus one float64 array per price column.
+        """
+        with self.lock:
+            n = len(self)
+            timestamps = self._map(TIMESTAMP_COLUMN, n)
+            lo = 0 if start is None else int(np.searchsorted(timestamps, pd.Timestamp(start).value, side="left"))
+            hi = n if end is None else int(np.searchsorted(timestamps, pd.Timestamp(end).value, side="right"))
+            view = {TIMESTAMP_COLUMN: np.array(timestamps[lo:hi]).view("datetime64[ns]")}
+            for name in PRICE_COLUMNS:
+                view[name] = np.array(self._map(name, n)[lo:hi])
+                if len(view[name]) != hi - lo:
+                    raise ValueError(f"OHLCV store {self.path} changed while it was read; retry.")
+            return view
+
+    def to_frame(self, start=None, end=None):
+        """Returns the rows in [start, end] as a DataFrame shaped like get_alpha_vantage_candlestick_data's."""
+        view = self.read(start, end)
+        index = pd.DatetimeIndex(view.pop(TIMESTAMP_COLUMN), name=TIMESTAMP_COLUMN)
+        return pd.DataFrame(view, index=index, columns=list(PRICE_COLUMNS))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(symbol, to_symbol, interval, read_only=False):
+    """Returns the process-wide OHLCVStore for a pair and interval (see OHLCVStore for read_only)."""
+    key = (symbol, to_symbol, interval, read_only)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = OHLCVStore(symbol, to_symbol, interval, read_only=read_only)
+        return _stores[key]
@@ -0,0 +1,264 @@
+# paper_trader.py
+
+import threading
+import time
+
+import numpy as np
+
+from data_fetcher import BASE_INTERVAL, INTERVAL_SECONDS
+from latency import LatencyHistogram
+from portfolio_ledger import INITIAL_INR_BALANCE
+
+# --- Paper-Trading Configuration ---
+# Every strategy is an SMA crossover (short, long) on one candle interval and
+# trades its own virtual portfolio: each BUY crossover buys ORDER_USD worth of
+# USD, each SELL crossover sells everything held. All strategies sharing an
+# interval are evaluated together with one vectorized step per closed candle,
+# so the cost per bar grows with the number of intervals, not of strategies.
+ORDER_USD = 1000.0
+PAPER_SOURCE = "PAPER"
+BASE_STEP_NS = INTERVAL_SECONDS[BASE_INTERVAL] * 1_000_000_000
+
+
+def strategy_grid(short_windows, long_windows, intervals):
+    """Returns every (interval, short, long) config with short < long."""
+    return [
+        (interval, int(short), int(long))
+        for interval in intervals
+        for short in short_windows
+        for long in long_windows
+        if short < long
+    ]
+
+
+def portfolio_id_for(config):
+    interval, short, long = config
+    return f"paper_{interval}_sma{short}_{long}"
+
+
+class _IntervalGroup:
+    """
+    The strategies of one interval. Builds that interval's candles from closed
+    1-minute bars and steps every strategy's SMAs and crossovers at once.
+    """
+
+    def __init__(self, interval, rows, short_windows, long_windows):
+        self.step_ns = INTERVAL_SECONDS[interval] * 1_000_000_000
+        self.rows = np.asarray(rows)                 # positions in the bank's portfolio arrays
+        self.short_windows = np.asarray(short_windows, dtype=np.int64)
+        self.long_windows = np.asarray(long_windows, dtype=np.int64)
+        self.history = int(self.long_windows.max())
+        self.closes = np.zeros(self.history)           # ring of the latest closes
+        self.count = 0
+        self._newest_first = np.arange(self.history)
+        n = len(self.rows)
+        self.side = np.zeros(n, dtype=np.int8)         # last non-zero side of short vs long
+        self.was_valid = np.zeros(n, dtype=bool)
+        self.bucket = None
+        self.bucket_close = None
+
+    def on_base_bar(self, ts, close):
+        """
+        Feeds one closed 1-minute bar.
+        Returns:
+            list: (bucket close, signal array) for each candle of this interval that closed.
+        """
+        closed = []
+        bucket = ts // self.step_ns
+        if self.bucket is not None and bucket != self.bucket:
+            # The bucket's last minute never arrived (a gap); it closed anyway.
+            closed.append((self.bucket_close, self._step(self.bucket_close)))
+        self.bucket, self.bucket_close = bucket, close
+        if (ts + BASE_STEP_NS) % self.step_ns == 0:
+            closed.append((close, self._step(close)))
+            self.bucket = None
+        return closed
+
+    def _step(self, close):
+        """Adds one candle close and returns each strategy's signal: 1 buy, -1 sell, 0 none."""
+        self.closes[self.count % self.history] = close
+        self.count += 1
+        # Running sums over the newest closes give every window's SMA from one cumsum.
+        recent = np.cumsum(self.closes[(self.count - 1 - self._newest_first) % self.history])
+        valid = self.count >= self.long_windows
+        short = recent[np.minimum(self.short_windows, self.count) - 1] / self.short_windows
+        long = recent[np.minimum(self.long_windows, self.count) - 1] / self.long_windows
+        side = np.where(valid, np.sign(short - long), 0).astype(np.int8)
+        # Same rule as trading_logic.crossover_signals: the first valid candle is not a crossover.
+        signal = np.where(self.was_valid & (side != 0) & (self.side == -side), side, 0).astype(np.int8)
+        self.side = np.where(side != 0, side, self.side)
+        self.was_valid |= valid
+        return signal
+
+
+class StrategyBank:
+    """
+    Many SMA crossover strategies with vectorized virtual portfolios. Balances use
+    the ledger's average-cost accounting; fills can also be written to a
+    PortfolioLedger so they show up like any other portfolio.
+    Args:
+        configs (list): (interval, short, long) tuples, e.g. from strategy_grid.
+        order_usd (float): USD bought on each BUY crossover.
+        ledger (PortfolioLedger): Optional ledger that every fill is recorded in. The
+            strategies' ledger portfolios are reset first so they match the in-memory books.
+    """
+
+    def __init__(self, configs, order_usd=ORDER_USD, ledger=None):
+        if not configs:
+            raise ValueError("At least one strategy config is required.")
+        self.configs = list(configs)
+        self.order_usd = order_usd
+        self.ledger = ledger
+        n = len(self.configs)
+        self.inr_balance = np.full(n, INITIAL_INR_BALANCE)
+        self.usd_held = np.zeros(n)
+        self.cost_basis_inr = np.zeros(n)
+        self.realized_pnl_inr = np.zeros(n)
+        self.trade_count = np.zeros(n, dtype=np.int64)
+        self.last_price = None
+        self.last_bar_time = None
+        self.bars = 0
+        # step: one on_bar call; bar-to-signal: bar published -> signals computed;
+        # signal-to-fill: signals computed -> fills applied and recorded.
+        self.step_latency = LatencyHistogram("per-bar step")
+        self.bar_to_signal = LatencyHistogram("bar-to-signal")
+        self.signal_to_fill = LatencyHistogram("signal-to-fill")
+        self.lock = threading.Lock()
+        if ledger is not None:
+            for config in self.configs:
+                ledger.reset(portfolio_id_for(config))
+
+        by_interval = {}
+        for row, (interval, short, long) in enumerate(self.configs):
+            by_interval.setdefault(interval, []).append((row, short, long))
+        self.groups = [
+            _IntervalGroup(interval, *zip(*members)) for interval, members in by_interval.items()
+        ]
+
+    def warm_up(self, timestamps, closes):
+        """Feeds history to fill the SMA windows without placing any orders."""
+        for ts, close in zip(np.asarray(timestamps, dtype=np.int64), np.asarray(closes, dtype=float)):
+            for group in self.groups:
+                group.on_base_bar(int(ts), float(close))
+        if len(closes):
+            self.last_price = float(closes[-1])
+
+    def on_bar(self, ts, close, received_at=None):
+        """
+        Feeds one closed 1-minute bar to every strategy and fills the resulting orders.
+        Args:
+            ts (int): Bar open time in int64 nanoseconds.
+            close (float): Bar close.
+            received_at (float): time.perf_counter() when the bar was published, if known;
+                bar-to-signal latency is measured from it (else from this call).
+        Returns:
+            list: Fills as (config, side, amount_usd, price) tuples.
+        """
+        start = time.perf_counter()
+        fills = []
+        with self.lock:
+            signals = [
+                (group.rows, signal, price)
+                for group in self.groups
+                for price, signal in group.on_base_bar(ts, close)
+            ]
+            signalled = time.perf_counter()
+            for rows, signal, price in signals:
+                fills.extend(self._fill(rows, signal, price))
+            self.last_price = close
+            self.last_bar_time = ts
+            self.bars += 1
+        if self.ledger is not None:
+            for config, side, amount_usd, price in fills:
+                trade = self.ledger.buy if side == "BUY" else self.ledger.sell
+                trade(portfolio_id_for(config), amount_usd, price, source=PAPER_SOURCE)
+        done = time.perf_counter()
+        self.step_latency.record(done - start)
+        self.bar_to_signal.record(signalled - (received_at if received_at is not None else start))
+        if fills:
+            self.signal_to_fill.record(done - signalled)
+        return fills
+
+    def _fill(self, rows, signal, price):
+        """Applies one interval's signals to its portfolios, all strategies at once."""
+        cost = self.order_usd * price
+        buys = rows[(signal == 1) & (self.inr_balance[rows] >= cost)]
+        sells = rows[(signal == -1) & (self.usd_held[rows] > 0)]
+        if len(buys) == 0 and len(sells) == 0:
+            return []
+
+        self.inr_balance[buys] -= cost
+        self.usd_held[buys] += self.order_usd
+        self.cost_basis_inr[buys] += cost
+
+        sold = self.usd_held[sells]
+        self.realized_pnl_inr[sells] += sold * price - self.cost_basis_inr[sells]
+        self.inr_balance[sells] += sold * price
+        self.usd_held[sells] = 0.0
+        self.cost_basis_inr[sells] = 0.0
+        self.trade_count[buys] += 1
+        self.trade_count[sells] += 1
+
+        return ([(self.configs[i], "BUY", self.order_usd, price) for i in buys]
+                + [(self.configs[i], "SELL", float(amount), price) for i, amount in zip(sells, sold)])
+
+    def latency_stats(self):
+        """Returns the bar count with per-bar step latency percentiles in milliseconds."""
+        stats = self.step_latency.snapshot()
+        return {"bars": self.bars, "p50_ms": stats["p50_ms"], "p99_ms": stats["p99_ms"], "max_ms": stats["max_ms"]}
+
+    def latency_histograms(self):
+        return [self.step_latency, self.bar_to_signal, self.signal_to_fill]
+
+    def leaderboard(self, top=10):
+        """Returns the `top` strategies by total value at the last price, best first."""
+        with self.lock:
+            price = self.last_price or 0.0
+            total = self.inr_balance + self.usd_held * price
+            order = np.argsort(-total)[:top]
+            return [
+                {
+                    "interval": self.configs[i][0],
+                    "short": self.configs[i][1],
+                    "long": self.configs[i][2],
+                    "total_value_inr": float(total[i]),
+                    "realized_pnl_inr": float(self.realized_pnl_inr[i]),
+                    "usd_held": float(self.usd_held[i]),
+                    "trades": int(self.trade_count[i]),
+                }
+                for i in order
+            ]
+
+
+# --- Bar Feeding ---
+
+class LiveBarFeeder:
+    """
+    Streamer subscriber that passes each 1-minute bar to a StrategyBank once it
+    has closed, i.e. once a later bar arrived (as LiveSignalSubscriber does).
+    Works with the live MarketDataStreamer and with replay_feed.ReplayFeed.
+    """
+
+    def __init__(self, streamer, bank, on_fills=None):
+        self.streamer = streamer
+        self.bank = bank
+        self.on_fills = on_fills
+        timestamps, values = streamer.buffer.snapshot()
+        closed = slice(0, max(len(timestamps) - 1, 0))
+        bank.warm_up(timestamps[closed].view(np.int64), values[closed, 3])
+        self.last_fed = int(timestamps[closed][-1].astype(np.int64)) if len(timestamps) > 1 else None
+        # Strategies trade 1-minute bars, so the streamer keeps that interval current while subscribed.
+        self.unsubscribe = streamer.subscribe(self, interval=BASE_INTERVAL)
+
+    def __call__(self, event, payload):
+        if event != "bars":
+            return
+        timestamps, values = payload
+        received_at = self.streamer.published_at
+        for ts, close in zip(timestamps.view(np.int64)[:-1].tolist(), values[:-1, 3].tolist()):
+            if self.last_fed is not None and ts <= self.last_fed:
+                continue
+            self.last_fed = ts
+            fills = self.bank.on_bar(ts, close, received_at)
+            if fills and self.on_fills is not None:
+                self.on_fills(ts, fills)
@@ -0,0 +1,214 @@
+# portfolio_ledger.py
+
+import os
+import sqlite3
+import threading
+import time
+
+# --- Ledger Configuration ---
+# Trades are appended to a SQLite database in WAL mode, so readers never block
+# the writer and every Streamlit session (and restart) sees the same history.
+# Each portfolio row carries running balances, cost basis and realized PnL, so
+# valuing a portfolio never replays its trades.
+LEDGER_PATH = os.getenv(
+    "PORTFOLIO_LEDGER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "portfolio_ledger.sqlite3"),
+)
+INITIAL_INR_BALANCE = 100000.0
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    portfolio_id TEXT PRIMARY KEY,
+    inr_balance REAL NOT NULL,
+    usd_held REAL NOT NULL,
+    cost_basis_inr REAL NOT NULL,
+    realized_pnl_inr REAL NOT NULL,
+    trade_count INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    side TEXT NOT NULL,
+    source TEXT NOT NULL,
+    amount_usd REAL NOT NULL,
+    price REAL NOT NULL,
+    inr_amount REAL NOT NULL,
+    realized_pnl_inr REAL NOT NULL,
+    inr_balance REAL NOT NULL,
+    usd_held REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_by_portfolio ON trades (portfolio_id, trade_id);
+"""
+
+_PORTFOLIO_FIELDS = ("portfolio_id", "inr_balance", "usd_held", "cost_basis_inr",
+                     "realized_pnl_inr", "trade_count", "updated_at")
+TRADE_FIELDS = ("trade_id", "ts", "side", "source", "amount_usd", "price", "inr_amount",
+                "realized_pnl_inr", "inr_balance", "usd_held")
+
+
+class InsufficientBalanceError(ValueError):
+    """Raised when a trade would overdraw the INR balance or sell more USD than held."""
+
+
+class PortfolioLedger:
+    """Append-only trade ledger with precomputed per-portfolio balances."""
+
+    def __init__(self, path=LEDGER_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        # sqlite3 connections may not be shared across threads; Streamlit runs each session in its own.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, conn, portfolio_id):
+        row = conn.execute(
+            f"SELECT {', '.join(_PORTFOLIO_FIELDS)} FROM portfolios WHERE portfolio_id = ?", (portfolio_id,)
+        ).fetchone()
+        if row is None:
+            row = (portfolio_id, INITIAL_INR_BALANCE, 0.0, 0.0, 0.0, 0, time.time())
+            conn.execute(f"INSERT INTO portfolios VALUES ({', '.join('?' * len(_PORTFOLIO_FIELDS))})", row)
+        return dict(zip(_PORTFOLIO_FIELDS, row))
+
+    def get_portfolio(self, portfolio_id):
+        """Returns the portfolio's running balances, creating it with the initial balance if new."""
+        conn = self._connection()
+        row = conn.execute(
+            f"SELECT {', '.join(_PORTFOLIO_FIELDS)} FROM portfolios WHERE portfolio_id = ?", (portfolio_id,)
+        ).fetchone()
+        if row is not None:
+            return dict(zip(_PORTFOLIO_FIELDS, row))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            portfolio = self._load(conn, portfolio_id)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return portfolio
+
+    def _trade(self, portfolio_id, side, amount_usd, price, source):
+        if amount_usd <= 0 or price <= 0:
+            raise ValueError("Trade amount and price must be positive.")
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so the balance check and
+        # the update cannot interleave with another session's trade.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            p = self._load(conn, portfolio_id)
+            inr_amount = amount_usd * price
+            realized = 0.0
+            if side == "BUY":
+                if p["inr_balance"] < inr_amount:
+                    raise InsufficientBalanceError("Insufficient INR balance to buy USD.")
+                p["inr_balance"] -= inr_amount
+                p["usd_held"] += amount_usd
+                p["cost_basis_inr"] += inr_amount
+            else:
+                if p["usd_held"] < amount_usd:
+                    raise InsufficientBalanceError("Insufficient USD held to sell.")
+                # Average-cost accounting: the sold share of the basis leaves with the USD.
+                basis_sold = p["cost_basis_inr"] * amount_usd / p["usd_held"]
+                realized = inr_amount - basis_sold
+                p["inr_balance"] += inr_amount
+                p["usd_held"] -= amount_usd
+                p["cost_basis_inr"] -= basis_sold
+                p["realized_pnl_inr"] += realized
+            p["trade_count"] += 1
+            p["updated_at"] = time.time()
+            conn.execute(
+                "UPDATE portfolios SET inr_balance = ?, usd_held = ?, cost_basis_inr = ?, "
+                "realized_pnl_inr = ?, trade_count = ?, updated_at = ? WHERE portfolio_id = ?",
+                (p["inr_balance"], p["usd_held"], p["cost_basis_inr"], p["realized_pnl_inr"],
+                 p["trade_count"], p["updated_at"], portfolio_id),
+            )
+            conn.execute(
+                "INSERT INTO trades (portfolio_id, ts, side, source, amount_usd, price, inr_amount, "
+                "realized_pnl_inr, inr_balance, usd_held) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (portfolio_id, p["updated_at"], side, source, amount_usd, price, inr_amount,
+                 realized, p["inr_balance"], p["usd_held"]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return p
+
+    def buy(self, portfolio_id, amount_usd, price, source="MANUAL"):
+        """Atomically buys `amount_usd` at `price` INR/USD. Returns the updated portfolio."""
+        return self._trade(portfolio_id, "BUY", amount_usd, price, source)
+
+    def sell(self, portfolio_id, amount_usd, price, source="MANUAL"):
+        """Atomically sells `amount_usd` at `price` INR/USD. Returns the updated portfolio."""
+        return self._trade(portfolio_id, "SELL", amount_usd, price, source)
+
+    def reset(self, portfolio_id):
+        """Restores the initial balances, recording the reset as a ledger entry."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            p = self._load(conn, portfolio_id)
+            now = time.time()
+            conn.execute(
+                "UPDATE portfolios SET inr_balance = ?, usd_held = 0, cost_basis_inr = 0, "
+                "realized_pnl_inr = 0, trade_count = ?, updated_at = ? WHERE portfolio_id = ?",
+                (INITIAL_INR_BALANCE, p["trade_count"] + 1, now, portfolio_id),
+            )
+            conn.execute(
+                "INSERT INTO trades (portfolio_id, ts, side, source, amount_usd, price, inr_amount, "
+                "realized_pnl_inr, inr_balance, usd_held) VALUES (?, ?, 'RESET', 'MANUAL', 0, 0, 0, 0, ?, 0)",
+                (portfolio_id, now, INITIAL_INR_BALANCE),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def valuation(self, portfolio_id, rate):
+        """
+        Values a portfolio at `rate` INR/USD in O(1) from its running balances.
+        Returns:
+            dict: The portfolio fields plus 'total_value_inr' and 'unrealized_pnl_inr'
+            (both None when `rate` is None).
+        """
+        p = self.get_portfolio(portfolio_id)
+        if rate is None:
+            p["total_value_inr"] = p["unrealized_pnl_inr"] = None
+        else:
+            p["total_value_inr"] = p["inr_balance"] + p["usd_held"] * rate
+            p["unrealized_pnl_inr"] = p["usd_held"] * rate - p["cost_basis_inr"]
+        return p
+
+    def get_trades(self, portfolio_id, limit=20, offset=0):
+        """Returns one page of ledger entries, newest first, as a list of dicts (see TRADE_FIELDS)."""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(TRADE_FIELDS)} FROM trades WHERE portfolio_id = ? "
+            "ORDER BY trade_id DESC LIMIT ? OFFSET ?",
+            (portfolio_id, limit, offset),
+        ).fetchall()
+        return [dict(zip(TRADE_FIELDS, row)) for row in rows]
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """Returns the process-wide ledger."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = PortfolioLedger()
+        return _ledger
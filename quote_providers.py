@@ -0,0 +1,337 @@
+# quote_providers.py
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+import requests
+
+import data_fetcher
+from data_fetcher import RateLimitError, REQUEST_TIMEOUT_SECONDS, StaleDataError
+
+# --- Provider Configuration ---
+# Quotes can come from Alpha Vantage, exchangerate-api or Yahoo Finance. The
+# router asks them in QUOTE_PROVIDERS order and hedges: if the current provider
+# has not answered within HEDGE_AFTER_SECONDS, the next one is asked as well and
+# the first good answer wins. A provider that is throttled
+# CIRCUIT_THROTTLE_THRESHOLD times in a row is skipped for CIRCUIT_OPEN_SECONDS.
+QUOTE_PROVIDERS = os.getenv("QUOTE_PROVIDERS", "alpha_vantage,exchangerate_api,yfinance").split(",")
+EXCHANGE_RATE_API_KEY = os.getenv("EXCHANGE_RATE_API_KEY")
+EXCHANGE_RATE_API_BASE_URL = os.getenv("EXCHANGE_RATE_API_BASE_URL", "https://v6.exchangerate-api.com/v6")
+HEDGE_AFTER_SECONDS = 1.5
+QUOTE_TIMEOUT_SECONDS = 20
+CIRCUIT_THROTTLE_THRESHOLD = 3
+CIRCUIT_OPEN_SECONDS = 120
+LATENCY_EWMA_ALPHA = 0.2
+
+YF_INTERVALS = {"1min": "1m", "5min": "5m", "15min": "15m", "30min": "30m", "60min": "60m"}
+YF_COMPACT_POINTS = 100  # matches Alpha Vantage's compact output
+
+
+class ProviderHealth:
+    """Success/failure counters, EWMA latency and the throttling circuit breaker of one provider."""
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.throttles = 0
+        self.consecutive_throttles = 0
+        self.latency_ewma = None   # seconds, successful calls only
+        self.open_until = 0.0      # time.time() before which the circuit is open
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def record_success(self, seconds):
+        with self.lock:
+            self.successes += 1
+            self.consecutive_throttles = 0
+            if self.latency_ewma is None:
+                self.latency_ewma = seconds
+            else:
+                self.latency_ewma += LATENCY_EWMA_ALPHA * (seconds - self.latency_ewma)
+
+    def record_failure(self, error):
+        with self.lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if isinstance(error, RateLimitError):
+                self.throttles += 1
+                self.consecutive_throttles += 1
+                if self.consecutive_throttles >= CIRCUIT_THROTTLE_THRESHOLD:
+                    # After the cool-off one trial call is let through; another throttle reopens it.
+                    self.open_until = time.time() + CIRCUIT_OPEN_SECONDS
+
+    def is_open(self):
+        return time.time() < self.open_until
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "successes": self.successes,
+                "failures": self.failures,
+                "throttles": self.throttles,
+                "latency_ms": None if self.latency_ewma is None else 1000 * self.latency_ewma,
+                "circuit_open": self.is_open(),
+                "last_error": self.last_error,
+            }
+
+
+class QuoteProvider:
+    """
+    Common interface of every rate source.
+    get_quote returns the latest rate as a float; get_candles returns a DataFrame
+    shaped like data_fetcher.get_alpha_vantage_candlestick_data's result.
+    Throttling is reported as RateLimitError, other failures as ConnectionError or ValueError.
+    """
+
+    name = "provider"
+    supports_candles = False
+
+    def __init__(self):
+        self.health = ProviderHealth()
+
+    @property
+    def configured(self):
+        """False when the provider lacks credentials and would fail every call."""
+        return True
+
+    def get_quote(self, symbol="USD", to_symbol="INR"):
+        raise NotImplementedError
+
+    def get_candles(self, symbol="USD", to_symbol="INR", interval="60min", outputsize="compact"):
+        raise NotImplementedError(f"{self.name} does not provide candles.")
+
+
+class AlphaVantageProvider(QuoteProvider):
+    """
+    Alpha Vantage through data_fetcher's shared, rate-limited and cached fetch layer.
+    An expired cache entry served because of throttling is raised as StaleDataError,
+    so the router counts the throttle and asks the other providers first.
+    """
+
+    name = "alpha_vantage"
+    supports_candles = True
+
+    @property
+    def configured(self):
+        return bool(data_fetcher.ALPHA_VANTAGE_API_KEY)
+
+    def get_quote(self, symbol="USD", to_symbol="INR"):
+        return data_fetcher.get_fx_rate(symbol, to_symbol, allow_stale=False)
+
+    def get_candles(self, symbol="USD", to_symbol="INR", interval="60min", outputsize="compact"):
+        return data_fetcher.get_alpha_vantage_candlestick_data(symbol, to_symbol, interval, outputsize,
+                                                               allow_stale=False)
+
+
+class ExchangeRateApiProvider(QuoteProvider):
+    """exchangerate-api.com pair endpoint. Quotes only."""
+
+    name = "exchangerate_api"
+
+    def __init__(self, api_key=EXCHANGE_RATE_API_KEY, base_url=EXCHANGE_RATE_API_BASE_URL):
+        super().__init__()
+        self.api_key = api_key
+        self.base_url = base_url
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    def get_quote(self, symbol="USD", to_symbol="INR"):
+        if not self.api_key:
+            raise ValueError("EXCHANGE_RATE_API_KEY is not set.")
+        try:
+            response = data_fetcher.get_http_session().get(f"{self.base_url}/{self.api_key}/pair/{symbol}/{to_symbol}",
+                                                           timeout=REQUEST_TIMEOUT_SECONDS)
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"Could not connect to exchangerate-api: {e}")
+        if data.get("result") == "error":
+            error_type = data.get("error-type", "unknown")
+            if error_type == "quota-reached" or response.status_code == 429:
+                raise RateLimitError(f"exchangerate-api quota reached: {error_type}")
+            raise ValueError(f"exchangerate-api error: {error_type}")
+        if not data.get("conversion_rate"):
+            raise ValueError(f"Unexpected response from exchangerate-api: {data}")
+        return float(data["conversion_rate"])
+
+
+class YFinanceProvider(QuoteProvider):
+    """
+    Yahoo Finance through the yfinance package, imported on first use.
+    Args:
+        client: The yfinance module or a stand-in exposing the same Ticker(...).history API.
+    """
+
+    name = "yfinance"
+    supports_candles = True
+
+    def __init__(self, client=None):
+        super().__init__()
+        self.client = client
+
+    def _ticker(self, symbol, to_symbol):
+        if self.client is None:
+            import yfinance
+            self.client = yfinance
+        return self.client.Ticker(f"{symbol}{to_symbol}=X")
+
+    def _history(self, symbol, to_symbol, period, interval):
+        try:
+            df = self._ticker(symbol, to_symbol).history(period=period, interval=interval)
+        except Exception as e:
+            if "RateLimit" in type(e).__name__ or "Too Many Requests" in str(e):
+                raise RateLimitError(f"Yahoo Finance rate limit: {e}")
+            raise ConnectionError(f"Could not fetch {symbol}/{to_symbol} from Yahoo Finance: {e}")
+        if df is None or df.empty:
+            raise ValueError(f"Yahoo Finance returned no data for {symbol}/{to_symbol}.")
+        return df
+
+    def get_quote(self, symbol="USD", to_symbol="INR"):
+        return float(self._history(symbol, to_symbol, "1d", "1m")["Close"].iloc[-1])
+
+    def get_candles(self, symbol="USD", to_symbol="INR", interval="60min", outputsize="compact"):
+        # Yahoo keeps 1-minute bars for 7 days and other intraday bars for 60.
+        period = "7d" if interval == "1min" else "60d"
+        df = self._history(symbol, to_symbol, period, YF_INTERVALS[interval])
+        if df.index.tz is not None:
+            df.index = df.index.tz_convert("UTC").tz_localize(None)
+        df.index = pd.DatetimeIndex(df.index, name="Datetime").as_unit("ns")
+        df = df.reindex(columns=["Open", "High", "Low", "Close", "Volume"]).astype(float)
+        df["Volume"] = df["Volume"].fillna(0.0)
+        return df.tail(YF_COMPACT_POINTS) if outputsize == "compact" else df
+
+
+PROVIDER_CLASSES = {
+    AlphaVantageProvider.name: AlphaVantageProvider,
+    ExchangeRateApiProvider.name: ExchangeRateApiProvider,
+    YFinanceProvider.name: YFinanceProvider,
+}
+
+
+class QuoteRouter:
+    """
+    Hedged, health-aware access to a prioritized list of providers.
+    Args:
+        providers (list): QuoteProvider instances, primary first.
+        hedge_after_seconds (float): Latency budget before the next provider is also asked.
+        timeout_seconds (float): Overall limit for one get_quote call.
+    """
+
+    def __init__(self, providers, hedge_after_seconds=HEDGE_AFTER_SECONDS, timeout_seconds=QUOTE_TIMEOUT_SECONDS):
+        self.providers = list(providers)
+        self.hedge_after_seconds = hedge_after_seconds
+        self.timeout_seconds = timeout_seconds
+        # Hedged losers keep running in the background so their health is still recorded.
+        self._executor = ThreadPoolExecutor(max_workers=2 * max(len(self.providers), 1),
+                                            thread_name_prefix="quote-provider")
+
+    def available(self, candles=False):
+        """Configured providers whose circuit is closed, in priority order."""
+        return [
+            p for p in self.providers
+            if p.configured and not p.health.is_open() and (p.supports_candles or not candles)
+        ]
+
+    @staticmethod
+    def _timed(provider, method, *args):
+        start = time.perf_counter()
+        try:
+            result = getattr(provider, method)(*args)
+        except Exception as e:
+            provider.health.record_failure(e)
+            raise
+        provider.health.record_success(time.perf_counter() - start)
+        return result
+
+    def get_quote(self, symbol="USD", to_symbol="INR"):
+        """
+        Returns the first good quote from the hedged providers. A stale quote (see
+        StaleDataError) counts as a throttle and is only returned when no provider
+        has a fresh one, named "<provider> (stale)".
+        Returns:
+            tuple: (rate, name of the provider that answered).
+        """
+        candidates = self.available()
+        if not candidates:
+            raise ConnectionError("No quote provider is available (unconfigured or circuit breaker open).")
+        pending = {}
+        errors = []
+        stale = None
+        deadline = time.monotonic() + self.timeout_seconds
+        next_launch = 0.0
+        while True:
+            now = time.monotonic()
+            if candidates and (not pending or now >= next_launch):
+                provider = candidates.pop(0)
+                pending[self._executor.submit(self._timed, provider, "get_quote", symbol, to_symbol)] = provider
+                next_launch = now + self.hedge_after_seconds
+            if not pending:
+                if stale is not None:
+                    return stale
+                raise ConnectionError(f"All quote providers failed: {'; '.join(errors)}")
+            if now >= deadline:
+                if stale is not None:
+                    return stale
+                raise ConnectionError(f"No quote within {self.timeout_seconds}s: {'; '.join(errors) or 'timed out'}")
+            timeout = deadline - now
+            if candidates:
+                timeout = min(timeout, max(next_launch - now, 0.0))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    return future.result(), provider.name
+                except StaleDataError as e:
+                    stale = stale or (e.stale_value, f"{provider.name} (stale)")
+                    errors.append(f"{provider.name}: {e}")
+                    next_launch = 0.0
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}")
+                    next_launch = 0.0  # a failure hands over to the next provider at once
+
+    def get_candles(self, symbol="USD", to_symbol="INR", interval="60min", outputsize="compact"):
+        """
+        Returns candles from the first candle-capable provider that succeeds.
+        Candle requests fail over one at a time rather than being hedged, since
+        a duplicate full-history request would waste scarce API quota.
+        Returns:
+            tuple: (pd.DataFrame, name of the provider that answered).
+        """
+        errors = []
+        stale = None
+        for provider in self.available(candles=True):
+            try:
+                return self._timed(provider, "get_candles", symbol, to_symbol, interval, outputsize), provider.name
+            except StaleDataError as e:
+                stale = stale or (e.stale_value.copy(), f"{provider.name} (stale)")
+                errors.append(f"{provider.name}: {e}")
+            except (ConnectionError, ValueError) as e:
+                errors.append(f"{provider.name}: {e}")
+        if stale is not None:
+            return stale
+        raise ConnectionError(f"All candle providers failed: {'; '.join(errors) or 'none available'}")
+
+    def health(self):
+        """Returns each provider's health snapshot keyed by name, in priority order."""
+        return {p.name: p.health.snapshot() for p in self.providers}
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_quote_router():
+    """Returns the process-wide router over the providers named in QUOTE_PROVIDERS."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            names = [name.strip() for name in QUOTE_PROVIDERS if name.strip()]
+            unknown = [name for name in names if name not in PROVIDER_CLASSES]
+            if unknown:
+                print(f"WARNING: Ignoring unknown quote providers: {', '.join(unknown)}")
+            _router = QuoteRouter([PROVIDER_CLASSES[name]() for name in names if name in PROVIDER_CLASSES])
+        return _router
@@ -0,0 +1,115 @@
+# replay_feed.py
+
+import time
+import numpy as np
+
+import av_parser
+from data_fetcher import BASE_INTERVAL, INTERVAL_SECONDS, resample_ohlcv
+from market_stream import MarketDataStreamer, RING_CAPACITY
+from ohlcv_store import get_store, PRICE_COLUMNS
+
+# --- Historical Replay ---
+# Streams stored 1-minute bars from the local OHLCV store as if they were
+# arriving live, at `speed` times real time (None or 0 replays as fast as
+# possible). ReplayFeed is a drop-in MarketDataStreamer: subscribers receive the
+# same "bars"/"rate" events and snapshots, and when installed with
+# data_fetcher.set_data_source it also answers quote and candle requests from
+# the bars replayed so far. Nothing touches the network.
+COMPACT_POINTS = 100
+REPLAY_PROVIDER = "replay"
+
+
+class ReplayFeed(MarketDataStreamer):
+    """
+    Replays stored bars through the MarketDataStreamer interface.
+    Args:
+        speed (float): Replay speed as a multiple of real time; None or 0 for as fast as possible.
+        start, end: Optional bounds of the replayed range (anything pd.Timestamp accepts).
+        warmup_bars (int): Bars preloaded into the ring buffer before the replay starts,
+            so subscribers can warm their indicators.
+    """
+
+    def __init__(self, symbol="USD", to_symbol="INR", speed=1.0, start=None, end=None, warmup_bars=0,
+                 capacity=RING_CAPACITY):
+        self.speed = speed or None
+        self.start_time, self.end_time = start, end
+        self.warmup_bars = warmup_bars
+        self.position = 0        # bars published so far (including warm-up)
+        super().__init__(symbol, to_symbol, capacity)
+        self.rate_provider = REPLAY_PROVIDER
+
+    def _preload(self):
+        view = get_store(self.symbol, self.to_symbol, BASE_INTERVAL).read(self.start_time, self.end_time)
+        # read() returns copies, so the replay is unaffected by the store being appended to or truncated meanwhile.
+        self.timestamps = view["Datetime"].view(np.int64)
+        self.values = np.column_stack([view[name] for name in PRICE_COLUMNS]) \
+            if len(self.timestamps) else np.empty((0, len(PRICE_COLUMNS)))
+        warm = min(self.warmup_bars, len(self.timestamps))
+        if warm:
+            self.buffer.push(self.timestamps[:warm], self.values[:warm])
+            self.rate = float(self.values[warm - 1, 3])
+            self.position = warm
+
+    @property
+    def finished(self):
+        return self.position >= len(self.timestamps)
+
+    def poll_once(self):
+        """Publishes the next bar. Returns False once every bar has been replayed."""
+        if self.finished:
+            return False
+        i = self.position
+        self.buffer.push(self.timestamps[i:i + 1], self.values[i:i + 1])
+        self.position = i + 1
+        self.rate_time = time.time()
+        rate = float(self.values[i, 3])
+        # Like the live poller, each event repeats the previous bar, which has now closed.
+        window = slice(max(i - 1, 0), i + 1)
+        self.published_at = time.perf_counter()
+        self._notify("bars", (self.timestamps[window].view("datetime64[ns]"), self.values[window]))
+        if rate != self.rate:
+            self.rate = rate
+            self._notify("rate", rate)
+        return True
+
+    def run(self):
+        """Replays the remaining bars in the calling thread, paced by `speed`."""
+        if self.finished:
+            return
+        wall_start = time.perf_counter()
+        first_ts = self.timestamps[self.position]
+        while not self._stop.is_set() and not self.finished:
+            if self.speed:
+                due = wall_start + (self.timestamps[self.position] - first_ts) / 1e9 / self.speed
+                wait = due - time.perf_counter()
+                if wait > 0 and self._stop.wait(wait):
+                    break
+            self.poll_once()
+
+    def _run(self):
+        self.run()
+
+    # --- data_fetcher data-source interface ---
+
+    def _check_pair(self, symbol, to_symbol):
+        if (symbol, to_symbol) != (self.symbol, self.to_symbol):
+            raise ValueError(f"The replay only has {self.symbol}/{self.to_symbol} data.")
+
+    def get_quote(self, symbol="USD", to_symbol="INR"):
+        """The close of the latest replayed bar."""
+        self._check_pair(symbol, to_symbol)
+        if self.rate is None:
+            raise ValueError("The replay has not published any bars yet.")
+        return self.rate
+
+    def get_candles(self, symbol="USD", to_symbol="INR", interval="60min", outputsize="full", start=None, end=None):
+        """Candles built from the bars replayed so far, shaped like data_fetcher's."""
+        self._check_pair(symbol, to_symbol)
+        timestamps = self.timestamps[:self.position]
+        columns = {name: self.values[:self.position, j] for j, name in enumerate(PRICE_COLUMNS)}
+        if interval != BASE_INTERVAL:
+            timestamps, columns = resample_ohlcv(timestamps, columns, INTERVAL_SECONDS[interval])
+        df = av_parser.to_frame(timestamps, columns)
+        if start is not None or end is not None:
+            df = df.loc[start:end]
+        return df.tail(COMPACT_POINTS) if outputsize == "compact" else df
@@ -3,48 +3,57 @@
 import streamlit as st
 import os
 import pandas as pd
-import plotly.graph_objects as go
 import numpy as np
 import datetime # For timestamps
+import time
+import threading
 import json # For JSON serialization/deserialization
+import pickle # For measuring session state in the debug panel
 import uuid # For generating a unique ID for the session (no persistence)
+from types import MappingProxyType
 
 # Removed Firebase imports:
 # import firebase_admin
 # from firebase_admin import credentials, firestore, auth
 
+# Imported first so its clock also covers the app's own imports (first_render_seconds)
+from instrumentation import timed, record_time, record_cache, record_first_render, metrics_snapshot, start_metrics_server
 # Ensure data_fetcher.py is in the same directory
-from data_fetcher import get_usd_inr_rate, get_alpha_vantage_candlestick_data
-
-# Import LangChain components for HuggingFaceHub
-from langchain_community.llms import HuggingFaceHub # CORRECTED: Changed 'llls' to 'llms'
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
-
-# --- IMPORTANT: Portfolio Data is NOT Persistent without Firebase ---
-# The portfolio and trade history will reset every time the app restarts
-# or a new user session begins. This is because we are no longer saving
-# to an external database.
-
-# --- Initialize Virtual Portfolio in Session State ---
-# Default values if not already in session_state
-if 'inr_balance' not in st.session_state:
-    st.session_state.inr_balance = 100000.0
-if 'usd_held' not in st.session_state:
-    st.session_state.usd_held = 0.0
-if 'trade_history' not in st.session_state:
-    st.session_state.trade_history = []
+from data_fetcher import get_candles, get_fetch_stats, set_data_source
+from trading_logic import prefix_sums, compute_sma_signals
+from chart_builder import build_candlestick_figure, cached_figure
+from market_stream import get_streamer, LiveSignalSubscriber, RING_CAPACITY, LAST_KNOWN_PROVIDER
+from quote_providers import get_quote_router
+from agent import route_query, record_route, get_route_stats, LLM_ROUTE
+from portfolio_ledger import get_ledger, InsufficientBalanceError, TRADE_FIELDS
+from chat_archive import get_chat_archive
+from langchain_agent import get_llm, TokenBudgetMemory, stream_response, LLM_REPO_ID
+# LangChain itself (inside get_llm) and the backtester (sweep button) load only
+# where first needed, so a new process paints its first page without them.
+
+# --- Instrumentation ---
+# Every rerun and each page section is timed into process-wide histograms (see
+# instrumentation.py); the sidebar debug panel shows them and, with METRICS_PORT
+# set, they are also served in Prometheus text format.
+rerun_started = time.perf_counter()
+metrics_url = start_metrics_server()
+
+# --- Virtual Portfolio Ledger ---
+# Balances and trades live in the shared SQLite ledger (portfolio_ledger.py), so
+# they survive restarts. The session only keeps its portfolio ID, which is also
+# carried in the URL (?portfolio=...) so reloading the page reopens the same portfolio.
+ledger = get_ledger()
 
 # Generate a unique session ID (not a persistent user ID)
 if 'session_id' not in st.session_state:
     st.session_state.session_id = "session_" + str(uuid.uuid4())
+if 'portfolio_id' not in st.session_state:
+    st.session_state.portfolio_id = st.query_params.get("portfolio") or "portfolio_" + str(uuid.uuid4())
+st.query_params["portfolio"] = st.session_state.portfolio_id
 
 def reset_portfolio_callback():
     """Callback to reset the virtual portfolio."""
-    st.session_state.inr_balance = 100000.0
-    st.session_state.usd_held = 0.0
-    st.session_state.trade_history = []
+    ledger.reset(st.session_state.portfolio_id)
     st.success("Portfolio reset successfully! Refreshing app...")
     st.rerun() # Rerun to reflect changes
 
@@ -57,40 +66,33 @@ if not hf_token_value:
     st.stop()
 HF_TOKEN = hf_token_value
 
-llm = None
-try:
-    llm = HuggingFaceHub(
-        repo_id="HuggingFaceTB/SmolLM3-3B",
-        huggingfacehub_api_token=HF_TOKEN,
-        model_kwargs={"temperature": 0.7, "max_new_tokens": 256}
-    )
-except Exception as e:
-    st.error(f"Error initializing HuggingFaceHub LLM: {e}")
-    st.info("Please check your HF_TOKEN and ensure the model 'HuggingFaceTB/SmolLM3-3B' is accessible.")
-    st.stop()
-
-# Setup LangChain conversational chain with memory
-template = """You are a helpful AI assistant specialized in USD to INR exchange rates and general forex trends.
-You can analyze the provided chart data (candlesticks and SMAs) to give insights.
-If the user asks for the current USD to INR price, you should provide it.
-Keep your responses concise and to the point.
-
-Current conversation:
-{history}
-Human: {input}
-AI:"""
-prompt = PromptTemplate(input_variables=["history", "input"], template=template)
-
-if "conversation" not in st.session_state:
-    st.session_state.conversation = ConversationChain(
-        llm=llm,
-        memory=ConversationBufferMemory(ai_prefix="AI"),
-        prompt=prompt,
-        verbose=False
-    )
+# The client is a process-wide cached resource, created on the first question
+# that needs the LLM; only the small token-budgeted memory lives in each session.
+@st.cache_resource(show_spinner=False)
+def load_llm(hf_token):
+    return get_llm(hf_token)
+
+# --- Per-Session Memory Budget ---
+# Session state holds only IDs, the token-budgeted chat memory and the newest
+# CHAT_MESSAGES_IN_SESSION chat messages. Older messages are spilled to the chat
+# archive on disk and trades live in the ledger; candles, figures and sweeps are
+# process-wide cached resources shared read-only by every session.
+CHAT_MESSAGES_IN_SESSION = 20
+CHAT_ARCHIVE_PAGE_SIZE = 20
+chat_archive = get_chat_archive()
+
+if "chat_memory" not in st.session_state:
+    st.session_state.chat_memory = TokenBudgetMemory()
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
+def spill_chat_history():
+    """Moves all but the newest CHAT_MESSAGES_IN_SESSION chat messages to the on-disk archive."""
+    overflow = len(st.session_state.chat_history) - CHAT_MESSAGES_IN_SESSION
+    if overflow > 0:
+        chat_archive.append(st.session_state.session_id, st.session_state.chat_history[:overflow])
+        del st.session_state.chat_history[:overflow]
+
 
 # --- Streamlit App Interface ---
 st.set_page_config(
@@ -103,40 +105,130 @@ st.set_page_config(
 st.title("💹 USD/INR Trading Bot with Virtual Portfolio")
 st.markdown("Ask me anything about USD to INR exchange rates or forex trends.")
 
-# Display current USD to INR rate prominently
-st.markdown("---")
-live_rate = None
-try:
-    live_rate = get_usd_inr_rate()
-    st.metric(label="Current USD to INR Rate", value=f"₹{live_rate:.2f} INR")
-    st.markdown(
-        """
-        <div style='text-align: center; color: gray; font-size: small;'>
-        (Live rate updates on app refresh or when asked)
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-except Exception as e:
-    st.error(f"⚠️ Error fetching live rate: {e}")
-    st.info("Ensure your `data_fetcher.py` is correctly set up to retrieve the rate and `ALPHA_VANTAGE_API_KEY` is set.")
-st.markdown("---")
-
-
-# --- Virtual Portfolio Display ---
-st.header("💰 Virtual Portfolio Status (Non-Persistent)")
-if live_rate is not None:
-    current_portfolio_value_inr = st.session_state.inr_balance + (st.session_state.usd_held * live_rate)
-else:
-    current_portfolio_value_inr = st.session_state.inr_balance # Cannot calculate USD value without live rate
-
-col_bal1, col_bal2, col_bal3 = st.columns(3)
-with col_bal1:
-    st.metric(label="INR Balance", value=f"₹{st.session_state.inr_balance:,.2f}")
-with col_bal2:
-    st.metric(label="USD Held", value=f"${st.session_state.usd_held:,.2f}")
-with col_bal3:
-    st.metric(label="Total Portfolio Value (INR)", value=f"₹{current_portfolio_value_inr:,.2f}")
+# --- Cached Chart Data ---
+# Defined before the market streamer starts, because its subscriber clears this cache.
+# Raw candles and their prefix sums are cached per interval only, so moving the
+# SMA sliders reuses them instead of refetching. The fetch layer itself is shared
+# across sessions and refreshes once per candle. They are cached as a shared
+# resource rather than as data, so sessions read one copy instead of each
+# unpickling its own on every rerun. The prefix sums are returned read-only and
+# each rerun works on its own copy of the frame (lazy under pandas' copy-on-write),
+# so no session can change what the others see.
+# The body only runs on a cache miss, in the calling thread; it flags that so the
+# caller can count hits and misses.
+_chart_data_loaded = threading.local()
+
+
+@st.cache_resource(ttl=60)
+def load_chart_data(symbol, to_symbol, interval):
+    """
+    Loads stored candles for the chart with the prefix sums of their closes and a data version token.
+    """
+    _chart_data_loaded.flag = True
+    # The market streamer keeps the stored bars current in the background (and clears
+    # this cache when new ones arrive), so the page never waits on Alpha Vantage here.
+    candlestick_df = get_candles(symbol=symbol, to_symbol=to_symbol, interval=interval, sync=False)
+    data_version = None
+    if not candlestick_df.empty:
+        # Changes whenever a bar is added or the still-forming last bar is updated.
+        data_version = (len(candlestick_df), str(candlestick_df.index[-1]), float(candlestick_df['Close'].iloc[-1]))
+    close_csum = prefix_sums(candlestick_df['Close'].to_numpy())
+    close_csum.setflags(write=False)
+    return candlestick_df, close_csum, data_version
+
+# --- Background Market Data ---
+# One streamer per process polls new bars and the quote in the background; the
+# page only reads its latest snapshot, so rendering never waits on the network.
+# With REPLAY_SPEED set (e.g. 60, or 0 for as fast as possible) stored bars are
+# replayed instead, fully offline.
+LIVE_REFRESH_SECONDS = 15
+REPLAY_SPEED = os.getenv("REPLAY_SPEED")
+
+@st.cache_resource
+def start_market_stream():
+    """Starts the shared streamer with its signal engine and chart-cache subscribers."""
+    if REPLAY_SPEED is not None:
+        from replay_feed import ReplayFeed
+        set_data_source(ReplayFeed("USD", "INR", speed=float(REPLAY_SPEED), warmup_bars=RING_CAPACITY // 2))
+    streamer = get_streamer("USD", "INR")
+    live_signals = LiveSignalSubscriber(streamer)
+    streamer.subscribe(lambda event, payload: load_chart_data.clear() if event == "bars" else None)
+    return streamer, live_signals
+
+streamer, live_signals = start_market_stream()
+
+# --- Market Data API ---
+# With API_PORT set, this process also serves the read-only HTTP API
+# (market_api.py) from a daemon thread, so its clients share the streamer, the
+# fetch cache and the daily Alpha Vantage quota instead of spending their own.
+api_url = None
+if os.getenv("API_PORT"):
+    from market_api import start_api_server
+    api_url = start_api_server()
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_rate_and_portfolio():
+    """Rate, latest signal and portfolio value, refreshed without rerunning the whole page."""
+    section_started = time.perf_counter()
+    # Renewed on every refresh, so the poller keeps this viewer's chart interval current.
+    streamer.request_interval(st.session_state.get("chart_interval", "5min"))
+    snapshot = streamer.snapshot()
+    live_rate = snapshot["rate"]
+
+    # Display current USD to INR rate prominently
+    st.markdown("---")
+    if live_rate is not None:
+        st.metric(label="Current USD to INR Rate", value=f"₹{live_rate:.2f} INR")
+        if snapshot["rate_provider"] == LAST_KNOWN_PROVIDER:
+            # Warm start: the previous process's last rate, shown until the first poll completes
+            as_of = datetime.datetime.fromtimestamp(snapshot["rate_time"]).strftime("%Y-%m-%d %H:%M")
+            source = f"last known rate from {as_of}, refreshing…"
+        else:
+            source = f"source: {snapshot['rate_provider']}"
+        st.markdown(
+            f"""
+            <div style='text-align: center; color: gray; font-size: small;'>
+            (Live rate updates automatically every {LIVE_REFRESH_SECONDS} seconds · {source})
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    elif snapshot["last_error"]:
+        st.error(f"⚠️ Error fetching live rate: {snapshot['last_error']}")
+        st.info("Ensure your `data_fetcher.py` is correctly set up to retrieve the rate and `ALPHA_VANTAGE_API_KEY` is set.")
+    else:
+        st.info("⏳ Fetching the live rate...")
+    if live_signals.last_signal:
+        st.caption(f"Latest 1-minute SMA 20/50 signal: **{live_signals.last_signal}** at {live_signals.last_signal_time}")
+    st.markdown("---")
+
+    # --- Virtual Portfolio Display ---
+    st.header("💰 Virtual Portfolio Status")
+    portfolio = ledger.valuation(st.session_state.portfolio_id, live_rate)
+    if portfolio["total_value_inr"] is not None:
+        current_portfolio_value_inr = portfolio["total_value_inr"]
+    else:
+        current_portfolio_value_inr = portfolio["inr_balance"] # Cannot calculate USD value without live rate
+
+    col_bal1, col_bal2, col_bal3 = st.columns(3)
+    with col_bal1:
+        st.metric(label="INR Balance", value=f"₹{portfolio['inr_balance']:,.2f}")
+    with col_bal2:
+        st.metric(label="USD Held", value=f"${portfolio['usd_held']:,.2f}")
+    with col_bal3:
+        st.metric(label="Total Portfolio Value (INR)", value=f"₹{current_portfolio_value_inr:,.2f}")
+
+    col_pnl1, col_pnl2 = st.columns(2)
+    with col_pnl1:
+        st.metric(label="Realized PnL (INR)", value=f"₹{portfolio['realized_pnl_inr']:,.2f}")
+    with col_pnl2:
+        unrealized = portfolio["unrealized_pnl_inr"]
+        st.metric(label="Unrealized PnL (INR)", value="—" if unrealized is None else f"₹{unrealized:,.2f}")
+    record_time("section_seconds", time.perf_counter() - section_started, section="rate_and_portfolio")
+
+live_rate_and_portfolio()
+live_rate = streamer.rate
 
 st.button("Reset Portfolio", on_click=reset_portfolio_callback)
 st.markdown("---")
@@ -144,7 +236,7 @@ st.markdown("---")
 
 # --- Live Candlestick Chart Section (USD/INR) ---
 st.header("📊 Live USD/INR Candlestick Chart (Alpha Vantage)")
-st.warning("Note: Alpha Vantage free tier has rate limits (e.g., 5 requests/minute). Chart data refreshes every 5 minutes to avoid hitting limits.")
+st.warning("Note: Alpha Vantage free tier has rate limits (5 requests/minute, 500/day). Data is shared across sessions and refreshes once per candle of the finest interval being viewed, but no more often than the daily quota allows.")
 
 # Selectbox for interval for Alpha Vantage
 interval_options = {
@@ -160,6 +252,9 @@ selected_interval_label = st.selectbox(
     index=1 # Default to 5 Minutes
 )
 selected_interval_av = interval_options[selected_interval_label]
+st.session_state.chart_interval = selected_interval_av
+streamer.request_interval(selected_interval_av)
+st.caption("All intervals are built locally from a single 1-minute feed, so switching costs no API calls.")
 
 # Sliders for SMA periods
 col_sma1, col_sma2 = st.columns(2)
@@ -171,96 +266,65 @@ with col_sma2:
 if short_sma_period >= long_sma_period:
     st.warning("Short SMA period should be less than Long SMA period for meaningful analysis.")
 
+# Only the visible range is sent to the browser, downsampled to a fixed budget
+# of candles and line points, so long histories stay fast to draw.
+visible_range_options = {
+    "Last 6 Hours": pd.Timedelta(hours=6),
+    "Last Day": pd.Timedelta(days=1),
+    "Last Week": pd.Timedelta(weeks=1),
+    "Last Month": pd.Timedelta(days=30),
+    "All History": None,
+}
+visible_range_label = st.selectbox("Visible Range:", list(visible_range_options.keys()), index=2)
+
 
-# Cache the data for 5 minutes (300 seconds) to respect Alpha Vantage free tier limits
-@st.cache_data(ttl=300)
-def plot_candlestick_chart(symbol, to_symbol, interval, short_sma, long_sma):
+def plot_candlestick_chart(symbol, to_symbol, interval, short_sma, long_sma, visible_range=None):
     """
-    Fetches Alpha Vantage candlestick data, calculates SMAs, generates signals,
-    and creates a Plotly chart.
+    Draws cached candlestick data with the SMAs and crossover signals computed
+    by trading_logic. The figure is cached per data version and
+    parameters, so reruns that change nothing on the chart skip building it.
+    Args:
+        visible_range (pd.Timedelta): How far back from the newest candle to show; None shows everything.
+    Returns:
+        dict: Latest SMA values and crossover for the chat router, or None if unavailable.
     """
     try:
-        candlestick_df = get_alpha_vantage_candlestick_data(
-            symbol=symbol, to_symbol=to_symbol, interval=interval, outputsize="compact"
-        )
+        _chart_data_loaded.flag = False
+        candlestick_df, close_csum, data_version = load_chart_data(symbol, to_symbol, interval)
+        candlestick_df = candlestick_df.copy()
+        record_cache("chart_data", not _chart_data_loaded.flag)
 
         if not candlestick_df.empty:
-            # Calculate SMAs
-            candlestick_df['SMA_Short'] = candlestick_df['Close'].rolling(window=short_sma).mean()
-            candlestick_df['SMA_Long'] = candlestick_df['Close'].rolling(window=long_sma).mean()
-
-            # Generate Signals
-            candlestick_df['Signal'] = 0
-            candlestick_df.loc[candlestick_df['SMA_Short'] > candlestick_df['SMA_Long'], 'Signal'] = 1
-            candlestick_df.loc[candlestick_df['SMA_Short'] < candlestick_df['SMA_Long'], 'Signal'] = -1
-            candlestick_df['Position'] = candlestick_df['Signal'].diff()
-
-            # --- Trading Simulation (for chart display, not actual portfolio updates) ---
-            # This simulation is for visualizing signals on the chart, not for the persistent portfolio
-            buy_markers_x = []
-            buy_markers_y = []
-            sell_markers_x = []
-            sell_markers_y = []
-
-            # Find points where position changes
-            for i in range(1, len(candlestick_df)):
-                if candlestick_df['Position'].iloc[i] == 1: # Buy signal
-                    buy_markers_x.append(candlestick_df.index[i])
-                    buy_markers_y.append(candlestick_df['Close'].iloc[i])
-                elif candlestick_df['Position'].iloc[i] == -1: # Sell signal
-                    sell_markers_x.append(candlestick_df.index[i])
-                    sell_markers_y.append(candlestick_df['Close'].iloc[i])
+            # --- Signals (for chart display, not actual portfolio updates) ---
+            close = candlestick_df['Close'].to_numpy()
+            signals = compute_sma_signals(close, short_sma, long_sma, csum=close_csum)
+            buy_idx, sell_idx = signals['buy_idx'], signals['sell_idx']
 
             # --- Plotting ---
-            fig = go.Figure(data=[go.Candlestick(
-                x=candlestick_df.index,
-                open=candlestick_df['Open'],
-                high=candlestick_df['High'],
-                low=candlestick_df['Low'],
-                close=candlestick_df['Close'],
-                name='Candlesticks'
-            )])
-
-            fig.add_trace(go.Scatter(
-                x=candlestick_df.index,
-                y=candlestick_df['SMA_Short'],
-                mode='lines',
-                name=f'SMA {short_sma}',
-                line=dict(color='blue', width=1)
-            ))
-
-            fig.add_trace(go.Scatter(
-                x=candlestick_df.index,
-                y=candlestick_df['SMA_Long'],
-                mode='lines',
-                name=f'SMA {long_sma}',
-                line=dict(color='orange', width=1)
-            ))
-
-            fig.add_trace(go.Scatter(
-                x=buy_markers_x,
-                y=buy_markers_y,
-                mode='markers',
-                marker=dict(symbol='triangle-up', size=10, color='green'),
-                name='Buy Signal'
-            ))
-
-            fig.add_trace(go.Scatter(
-                x=sell_markers_x,
-                y=sell_markers_y,
-                mode='markers',
-                marker=dict(symbol='triangle-down', size=10, color='red'),
-                name='Sell Signal'
-            ))
-
-            fig.update_layout(
-                title=f'{symbol}/{to_symbol} Candlestick Chart with SMAs & Signals ({selected_interval_label})',
-                xaxis_title='Time',
-                yaxis_title='Price (INR)',
-                xaxis_rangeslider_visible=False,
-                hovermode="x unified"
+            start = candlestick_df.index[-1] - visible_range if visible_range is not None else None
+            figure = cached_figure(
+                (symbol, to_symbol, interval, data_version, short_sma, long_sma, visible_range),
+                lambda: build_candlestick_figure(
+                    candlestick_df, signals, short_sma, long_sma,
+                    title=f'{symbol}/{to_symbol} Candlestick Chart with SMAs & Signals ({selected_interval_label})',
+                    start=start,
+                )
             )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(figure, width="stretch")
+
+            if np.isnan(signals['sma_short'][-1]) or np.isnan(signals['sma_long'][-1]):
+                return None
+            crossovers = [(i, 'BUY') for i in buy_idx[-1:]] + [(i, 'SELL') for i in sell_idx[-1:]]
+            last_idx, last_signal = max(crossovers) if crossovers else (None, None)
+            return {
+                'interval': selected_interval_label,
+                'short_window': short_sma,
+                'long_window': long_sma,
+                'short': float(signals['sma_short'][-1]),
+                'long': float(signals['sma_long'][-1]),
+                'last_signal': last_signal,
+                'last_signal_time': candlestick_df.index[last_idx] if last_idx is not None else None,
+            }
 
         else:
             st.info("No candlestick data available to display for the selected period/interval. Check API key or limits.")
@@ -268,20 +332,97 @@ def plot_candlestick_chart(symbol, to_symbol, interval, short_sma, long_sma):
         st.error(f"Error displaying USD/INR candlestick chart: {e}")
 
 # Call the function to display the chart for USD/INR with signals
-plot_candlestick_chart( # Renamed function call
-    symbol="USD",
-    to_symbol="INR",
-    interval=selected_interval_av,
-    short_sma=short_sma_period,
-    long_sma=long_sma_period
+with timed("section_seconds", section="chart"):
+    chart_summary = plot_candlestick_chart( # Renamed function call
+        symbol="USD",
+        to_symbol="INR",
+        interval=selected_interval_av,
+        short_sma=short_sma_period,
+        long_sma=long_sma_period,
+        visible_range=visible_range_options[visible_range_label]
+    )
+
+fetch_stats = get_fetch_stats()
+st.caption(
+    f"Data cache: {fetch_stats['hits']} hits, {fetch_stats['misses']} misses, "
+    f"{fetch_stats['coalesced']} coalesced, {fetch_stats['throttled']} throttled · "
+    f"{fetch_stats['quota_remaining_today']} API calls left today"
 )
 
+def describe_provider(name, health):
+    if health["circuit_open"]:
+        return f"{name} paused (throttled)"
+    if health["latency_ms"] is None:
+        return f"{name} idle"
+    return f"{name} {health['latency_ms']:.0f} ms avg, {health['failures']} failures"
+
+st.caption("Quote providers: " + " · ".join(
+    describe_provider(name, health) for name, health in get_quote_router().health().items()
+))
+
+st.markdown("---")
+
+
+# --- SMA Parameter Sweep (Backtest) ---
+st.header("🧪 SMA Parameter Sweep")
+st.markdown("Backtest every Short/Long SMA combination over the full stored history for the selected interval.")
+
+@st.cache_resource(ttl=300)
+def run_sma_sweep(symbol, to_symbol, interval, cost_bps):
+    """Runs the full (short, long) grid matching the slider ranges. Shared by every session, so read-only."""
+    from backtester import run_sweep
+    sweep = run_sweep(symbol=symbol, to_symbol=to_symbol, interval=interval,
+                      short_windows=range(5, 51), long_windows=range(20, 201, 5), cost_bps=cost_bps)
+    for values in sweep.values():
+        values.setflags(write=False)
+    return MappingProxyType(sweep)
+
+sweep_metric_labels = {
+    "PnL (%)": "pnl",
+    "Sharpe Ratio": "sharpe",
+    "Max Drawdown (%)": "max_drawdown",
+    "Trade Count": "trades",
+}
+col_sweep1, col_sweep2 = st.columns(2)
+with col_sweep1:
+    sweep_metric_label = st.selectbox("Heatmap Metric:", list(sweep_metric_labels.keys()))
+with col_sweep2:
+    sweep_cost_bps = st.number_input("Cost per Trade (bps)", min_value=0.0, value=0.0, step=0.5)
+
+if st.button("Run Backtest Sweep"):
+    try:
+        with st.spinner("Backtesting all SMA combinations..."), timed("section_seconds", section="sweep"):
+            sweep = run_sma_sweep("USD", "INR", selected_interval_av, sweep_cost_bps)
+        metric = sweep_metric_labels[sweep_metric_label]
+        values = sweep[metric] * (100 if metric in ("pnl", "max_drawdown") else 1)
+        import plotly.graph_objects as go
+        from backtester import sweep_to_frame
+        heatmap = go.Figure(data=go.Heatmap(
+            z=values,
+            x=sweep["long_windows"],
+            y=sweep["short_windows"],
+            colorscale="RdYlGn_r" if metric == "max_drawdown" else "RdYlGn",
+            colorbar=dict(title=sweep_metric_label)
+        ))
+        heatmap.update_layout(
+            title=f'{sweep_metric_label} by SMA Pair ({selected_interval_label})',
+            xaxis_title='Long SMA Period',
+            yaxis_title='Short SMA Period'
+        )
+        st.plotly_chart(heatmap, width="stretch")
+
+        best = sweep_to_frame(sweep).sort_values("sharpe", ascending=False).head(5)
+        st.markdown("**Top 5 pairs by Sharpe ratio**")
+        st.dataframe(best, hide_index=True)
+    except Exception as e:
+        st.error(f"Error running backtest sweep: {e}")
+
 st.markdown("---")
 
 
-# --- Manual Trade Execution (Updates Non-Persistent Portfolio) ---
+# --- Manual Trade Execution (Atomic Ledger Writes) ---
 st.header("🛒 Manual Trade Execution")
-st.markdown("Execute trades directly to update your virtual portfolio. (Data is NOT persistent across sessions)")
+st.markdown("Execute trades directly to update your virtual portfolio. Trades are saved to the portfolio ledger.")
 
 col_trade_amount, col_trade_buttons = st.columns([0.7, 0.3])
 with col_trade_amount:
@@ -294,58 +435,76 @@ with col_trade_buttons:
         if live_rate is None:
             st.error("Cannot execute trade: Live rate not available.")
         else:
-            cost_inr = trade_amount_usd * live_rate
-            if st.session_state.inr_balance >= cost_inr:
-                st.session_state.inr_balance -= cost_inr
-                st.session_state.usd_held += trade_amount_usd
-                st.session_state.trade_history.append({
-                    'Date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'Type': 'MANUAL BUY',
-                    'Amount (USD)': f"{trade_amount_usd:.2f}",
-                    'Cost (INR)': f"₹{cost_inr:,.2f}",
-                    'Price': f"₹{live_rate:.2f}",
-                    'INR Balance': f"₹{st.session_state.inr_balance:,.2f}",
-                    'USD Held': f"${st.session_state.usd_held:,.2f}"
-                })
+            try:
+                ledger.buy(st.session_state.portfolio_id, trade_amount_usd, live_rate)
                 st.success(f"Successfully bought ${trade_amount_usd:.2f} USD!")
                 st.rerun()
-            else:
-                st.error("Insufficient INR balance to buy USD.")
+            except InsufficientBalanceError as e:
+                st.error(str(e))
 
     if st.button("Sell USD"):
         if live_rate is None:
             st.error("Cannot execute trade: Live rate not available.")
         else:
-            if st.session_state.usd_held >= trade_amount_usd:
-                revenue_inr = trade_amount_usd * live_rate
-                st.session_state.inr_balance += revenue_inr
-                st.session_state.usd_held -= trade_amount_usd
-                st.session_state.trade_history.append({
-                    'Date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'Type': 'MANUAL SELL',
-                    'Amount (USD)': f"{trade_amount_usd:.2f}",
-                    'Revenue (INR)': f"₹{revenue_inr:,.2f}",
-                    'Price': f"₹{live_rate:.2f}",
-                    'INR Balance': f"₹{st.session_state.inr_balance:,.2f}",
-                    'USD Held': f"${st.session_state.usd_held:,.2f}"
-                })
+            try:
+                ledger.sell(st.session_state.portfolio_id, trade_amount_usd, live_rate)
                 st.success(f"Successfully sold ${trade_amount_usd:.2f} USD!")
                 st.rerun()
-            else:
-                st.error("Insufficient USD held to sell.")
-
-st.subheader("Trade History (Non-Persistent)")
-if st.session_state.trade_history:
-    trade_df = pd.DataFrame(st.session_state.trade_history)
-    st.dataframe(trade_df)
+            except InsufficientBalanceError as e:
+                st.error(str(e))
+
+st.subheader("Trade History")
+TRADE_PAGE_SIZE = 20
+trade_total = ledger.get_portfolio(st.session_state.portfolio_id)["trade_count"]
+if trade_total:
+    page_count = (trade_total - 1) // TRADE_PAGE_SIZE + 1
+    page = 1
+    if page_count > 1:
+        page = st.number_input("History Page (newest first)", min_value=1, max_value=page_count, value=1, step=1)
+    with timed("section_seconds", section="trade_history"):
+        trades = ledger.get_trades(st.session_state.portfolio_id, limit=TRADE_PAGE_SIZE,
+                                   offset=(page - 1) * TRADE_PAGE_SIZE)
+        trade_df = pd.DataFrame(trades, columns=TRADE_FIELDS)
+        trade_df['ts'] = pd.to_datetime(trade_df['ts'], unit='s')
+    st.dataframe(
+        trade_df,
+        hide_index=True,
+        column_config={
+            "trade_id": "ID",
+            "ts": st.column_config.DatetimeColumn("Date", format="YYYY-MM-DD HH:mm:ss"),
+            "side": "Type",
+            "source": "Source",
+            "amount_usd": st.column_config.NumberColumn("Amount (USD)", format="$%.2f"),
+            "price": st.column_config.NumberColumn("Price", format="₹%.2f"),
+            "inr_amount": st.column_config.NumberColumn("Cost/Revenue (INR)", format="₹%.2f"),
+            "realized_pnl_inr": st.column_config.NumberColumn("Realized PnL (INR)", format="₹%.2f"),
+            "inr_balance": st.column_config.NumberColumn("INR Balance", format="₹%.2f"),
+            "usd_held": st.column_config.NumberColumn("USD Held", format="$%.2f"),
+        }
+    )
+    st.caption(f"Page {page} of {page_count} · {trade_total} ledger entries")
 else:
-    st.info("No trade history yet for this session.")
+    st.info("No trade history yet for this portfolio.")
 st.markdown("---")
 
 
 # --- Chat Section ---
 st.header("💬 Chat with the Bot")
 
+# Older messages were spilled to the archive; page them back in only on request.
+# The count comes from the archive itself, which prunes old messages.
+chat_archived = chat_archive.count(st.session_state.session_id)
+if chat_archived:
+    with st.expander(f"Earlier messages ({chat_archived} archived)"):
+        archive_pages = (chat_archived - 1) // CHAT_ARCHIVE_PAGE_SIZE + 1
+        archive_page = st.number_input("Archive Page (newest first)", min_value=1, max_value=archive_pages,
+                                       value=1, step=1)
+        archived = chat_archive.get_messages(st.session_state.session_id, limit=CHAT_ARCHIVE_PAGE_SIZE,
+                                             offset=(archive_page - 1) * CHAT_ARCHIVE_PAGE_SIZE)
+        for message in reversed(archived):
+            prefix = "**🧠 Your Question:**" if message["role"] == "user" else "**🤖 Response:**"
+            st.markdown(f"{prefix} {message['content']}")
+
 # Display chat history
 for message in st.session_state.chat_history:
     if message["role"] == "user":
@@ -364,17 +523,90 @@ with st.form(key='chat_form', clear_on_submit=True):
             st.session_state.chat_history.append({"role": "bot", "content": "Goodbye! The bot session has ended."})
         else:
             st.session_state.chat_history.append({"role": "user", "content": user_input})
-            with st.spinner("🤖 Thinking..."):
-                llm_response = ""
+            # Rate, SMA, signal and portfolio questions are answered from data we already have
+            route, routed_response = route_query(user_input, {
+                "rate": live_rate,
+                "sma": chart_summary,
+                "portfolio": ledger.valuation(st.session_state.portfolio_id, live_rate),
+            })
+            if route != LLM_ROUTE:
+                st.session_state.chat_history.append({"role": "bot", "content": routed_response})
+            else:
                 # Enhance LLM prompt with current chart context if available
                 chart_context = ""
                 if live_rate is not None:
                     chart_context = f"The current USD to INR rate is ₹{live_rate:.2f}. "
-                # Further context like SMA values could be added here if needed
-                # (e.g., by passing them from the chart function or re-calculating on cached data)
-
-                llm_input_with_context = f"{chart_context}Human: {user_input}"
-                llm_response = st.session_state.conversation.predict(input=llm_input_with_context)
-
-                st.session_state.chat_history.append({"role": "bot", "content": llm_response})
-
+                if chart_summary:
+                    chart_context += (
+                        f"On the {chart_summary['interval']} chart, SMA {chart_summary['short_window']} is "
+                        f"₹{chart_summary['short']:.4f} and SMA {chart_summary['long_window']} is "
+                        f"₹{chart_summary['long']:.4f}. "
+                    )
+
+                try:
+                    llm = load_llm(HF_TOKEN)
+                except Exception as e:
+                    st.error(f"Error initializing Hugging Face LLM: {e}")
+                    st.info(f"Please check your HF_TOKEN and ensure the model '{LLM_REPO_ID}' is accessible.")
+                    st.session_state.chat_history.append(
+                        {"role": "bot", "content": "⚠️ The chat model is unavailable right now. Please try again later."})
+                else:
+                    # Stream the answer as it is generated instead of waiting for the full response
+                    st.markdown(f"**🧠 Your Question:** {user_input}")
+                    st.markdown("**🤖 Response:**")
+                    llm_started = time.perf_counter()
+                    llm_response = st.write_stream(
+                        stream_response(llm, st.session_state.chat_memory, user_input, context=chart_context)
+                    )
+                    record_route(LLM_ROUTE, time.perf_counter() - llm_started)
+
+                    st.session_state.chat_history.append({"role": "bot", "content": llm_response})
+        spill_chat_history()
+
+route_stats = get_route_stats()
+if route_stats:
+    st.caption("Chat routes: " + " · ".join(
+        f"{route} {stats['count']}× (avg {stats['mean_ms']:.2f} ms)" for route, stats in sorted(route_stats.items())
+    ))
+
+
+# --- Debug Panel ---
+record_time("rerun_seconds", time.perf_counter() - rerun_started)
+record_first_render()
+
+if st.sidebar.checkbox("Show debug metrics"):
+    metrics = metrics_snapshot()
+    st.sidebar.subheader("⏱️ Timings (ms)")
+    if metrics["timers"]:
+        st.sidebar.dataframe(
+            pd.DataFrame(metrics["timers"])[["name", "labels", "count", "p50_ms", "p99_ms", "max_ms"]],
+            hide_index=True
+        )
+    st.sidebar.subheader("🗃️ Cache hit ratios")
+    for cache, ratio in metrics["cache_hit_ratios"].items():
+        st.sidebar.caption(f"{cache}: {ratio:.0%}")
+    st.sidebar.subheader("📦 Payload sizes")
+    for summary in metrics["summaries"]:
+        st.sidebar.caption(
+            f"{summary['name']} {summary['labels']}: {summary['count']}× avg {summary['mean'] / 1024:,.1f} KiB, "
+            f"max {summary['max'] / 1024:,.1f} KiB"
+        )
+    st.sidebar.subheader("🧠 Session state")
+    session_bytes = {}
+    for key, value in st.session_state.items():
+        try:
+            session_bytes[key] = len(pickle.dumps(value))
+        except Exception:
+            session_bytes[key] = None
+    st.sidebar.caption(
+        f"{sum(n for n in session_bytes.values() if n) / 1024:,.1f} KiB in {len(session_bytes)} keys · "
+        f"{len(st.session_state.chat_history)} chat messages in memory, {chat_archive.count(st.session_state.session_id)} archived"
+    )
+    st.sidebar.subheader("🔢 Counters")
+    st.sidebar.json(metrics["counters"], expanded=False)
+    if metrics_url:
+        st.sidebar.caption(f"Prometheus metrics: {metrics_url}")
+    else:
+        st.sidebar.caption("Set METRICS_PORT to serve these metrics in Prometheus format.")
+    if api_url:
+        st.sidebar.caption(f"Market data API: {api_url}")
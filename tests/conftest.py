@@ -0,0 +1,48 @@
+# tests/conftest.py
+#
+# The modules live at the repository root; make them importable however pytest is run.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from benchmarks.fake_alpha_vantage import FakeAlphaVantageServer
+
+
+@pytest.fixture
+def fake_av(tmp_path, monkeypatch):
+    """
+    Points the fetch layer at a local FakeAlphaVantageServer with throwaway stores
+    and a fresh cache, token bucket and poller registry. Yields the server.
+    """
+    import data_fetcher
+    import ohlcv_store
+
+    server = FakeAlphaVantageServer(payload_dir=str(tmp_path / "payloads")).start()
+    monkeypatch.setattr(data_fetcher, "ALPHA_VANTAGE_BASE_URL", server.url)
+    monkeypatch.setattr(data_fetcher, "ALPHA_VANTAGE_API_KEY", "test")
+    monkeypatch.setattr(data_fetcher, "_rate_limiter", data_fetcher._TokenBucket(1000, 100_000))
+    for name in ("_cache", "_inflight", "_next_store_sync", "_resampled_versions", "_polling_claims"):
+        monkeypatch.setattr(data_fetcher, name, {})
+    monkeypatch.setattr(data_fetcher, "_kept_current", set())
+    monkeypatch.setattr(data_fetcher, "_stats", dict.fromkeys(data_fetcher._stats, 0))
+    monkeypatch.setattr(data_fetcher, "_data_source", None)
+    monkeypatch.setattr(ohlcv_store, "OHLCV_STORE_DIR", str(tmp_path / "ohlcv"))
+    monkeypatch.setattr(ohlcv_store, "_stores", {})
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def next_candle(fake_av):
+    """Returns a function that moves the fake server on by `minutes` and lets every cache and store sync expire."""
+    import data_fetcher
+
+    def advance(minutes):
+        fake_av.advance(minutes)
+        data_fetcher.clear_fetch_cache()
+        data_fetcher._next_store_sync.clear()
+    return advance
@@ -0,0 +1,50 @@
+# tests/test_agent_routing.py
+
+import pytest
+
+from agent import LLM_ROUTE, classify_intent, route_query
+
+
+@pytest.mark.parametrize("question, route", [
+    ("What is the USD to INR price?", "price"),
+    ("usd/inr rate now", "price"),
+    ("How many rupees to the dollar today?", "price"),
+    ("What's the current exchange rate?", "price"),
+    ("How is my portfolio doing?", "portfolio"),
+    ("What is my P&L?", "portfolio"),
+    ("Show my balance", "portfolio"),
+    ("How much USD do I have?", "portfolio"),
+    ("Should I buy now?", "signal"),
+    ("Any crossover signal?", "signal"),
+    ("What are the SMA values?", "sma"),
+])
+def test_routes_questions_about_local_data(question, route):
+    assert classify_intent(question) == route
+
+
+@pytest.mark.parametrize("question", [
+    "what is a stop loss?",
+    "profit-taking strategy",
+    "RBI repo rate",
+    "interest rate outlook",
+    "What is an SMA?",
+    "Why has the rupee been weak this month?",
+    "Explain what the SMA crossover means for next week.",
+    "Tell me about inflation in India and what it means for my savings over the next five years please",
+])
+def test_general_questions_go_to_the_llm(question):
+    assert classify_intent(question) == LLM_ROUTE
+
+
+SMA = {"interval": "5 Minutes", "short_window": 20, "long_window": 50, "short": 83.1, "long": 83.0}
+
+
+def test_signal_answer_follows_the_sma_order():
+    assert "BUY bias" in route_query("Should I buy?", {"sma": SMA})[1]
+    assert "SELL bias" in route_query("Should I buy?", {"sma": {**SMA, "short": 82.9}})[1]
+
+
+def test_signal_answer_reports_no_bias_on_a_tie():
+    answer = route_query("Should I buy?", {"sma": {**SMA, "short": 83.0}})[1]
+    assert "no bias" in answer
+    assert "bearish" not in answer and "bullish" not in answer
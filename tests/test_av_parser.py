@@ -0,0 +1,87 @@
+# tests/test_av_parser.py
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import av_parser
+from data_fetcher import RateLimitError, _parse_intraday_candles
+
+SERIES_KEY = "Time Series FX (5min)"
+
+
+def bar(open_, high, low, close):
+    return {"1. open": str(open_), "2. high": str(high), "3. low": str(low), "4. close": str(close)}
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode()
+
+
+def test_parses_newest_first_series_oldest_first_without_volume():
+    data = {SERIES_KEY: {
+        "2024-06-28 16:05:00": bar(2, 3, 1, 2.5),
+        "2024-06-28 16:00:00": bar(1, 2, 0.5, 1.5),
+    }}
+    timestamps, columns = av_parser.parse_series(data, SERIES_KEY)
+    assert list(timestamps) == [pd.Timestamp("2024-06-28 16:00").value, pd.Timestamp("2024-06-28 16:05").value]
+    assert list(columns["Close"]) == [1.5, 2.5]
+    assert list(columns["Volume"]) == [0.0, 0.0]
+
+
+def test_fields_are_mapped_by_name_when_keys_are_reordered():
+    reordered = dict(reversed(list(bar(1, 2, 0.5, 1.5).items())))
+    data = {SERIES_KEY: {"2024-06-28 16:05:00": bar(2, 3, 1, 2.5), "2024-06-28 16:00:00": reordered}}
+    _, columns = av_parser.parse_series(data, SERIES_KEY)
+    assert list(columns["Open"]) == [1.0, 2.0]
+    assert list(columns["Close"]) == [1.5, 2.5]
+
+
+def test_bars_with_different_fields_leave_gaps():
+    partial = {"1. open": "1", "4. close": "1.5", "5. volume": "10"}
+    data = {SERIES_KEY: {"2024-06-28 16:05:00": bar(2, 3, 1, 2.5), "2024-06-28 16:00:00": partial}}
+    _, columns = av_parser.parse_series(data, SERIES_KEY)
+    assert np.isnan(columns["High"][0]) and columns["High"][1] == 3.0
+    assert list(columns["Volume"]) == [10.0, 0.0]
+
+
+def test_escaped_strings_elsewhere_in_the_body_do_not_confuse_the_parser():
+    payload = {
+        "Meta Data": {"1. Information": "FX Intraday (5min) \"quoted\" {not a bar}: \"2024-01-01 00:00:00\": {"},
+        SERIES_KEY: {"2024-06-28 16:00:00": bar(1, 2, 0.5, 1.5)},
+    }
+    df = _parse_intraday_candles(FakeResponse(payload), "5min")
+    assert len(df) == 1 and df["Close"].iloc[0] == 1.5
+
+
+def test_empty_series_gives_an_empty_frame():
+    df = _parse_intraday_candles(FakeResponse({"Meta Data": {}, SERIES_KEY: {}}), "5min")
+    assert df.empty and list(df.columns) == list(av_parser.OHLCV_COLUMNS)
+
+
+@pytest.mark.parametrize("payload", [
+    {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute."},
+    {"Information": "Our standard API rate limit is 25 requests per day."},
+])
+def test_rate_limit_notices_raise_rate_limit_error(payload):
+    with pytest.raises(RateLimitError):
+        _parse_intraday_candles(FakeResponse(payload), "5min")
+
+
+@pytest.mark.parametrize("payload", [
+    {"Information": "Thank you for using Alpha Vantage! This is a premium endpoint."},
+    {"Error Message": "Invalid API call."},
+    {"Meta Data": {}},
+])
+def test_other_notices_and_missing_series_raise_value_error(payload):
+    with pytest.raises(ValueError) as error:
+        _parse_intraday_candles(FakeResponse(payload), "5min")
+    assert not isinstance(error.value, RateLimitError)
+
+
+def test_latest_close_ignores_key_order():
+    data = {"Time Series FX (Daily)": {"2024-06-27": bar(1, 1, 1, 1.1), "2024-06-28": bar(2, 2, 2, 2.2)}}
+    assert av_parser.latest_close(data, "Time Series FX (Daily)") == 2.2
@@ -0,0 +1,87 @@
+# tests/test_chart_downsampling.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_builder
+from chart_builder import (
+    MAX_CANDLES, MAX_LINE_POINTS, bucket_ohlc, build_candlestick_figure, cached_figure, minmax_indices,
+)
+from trading_logic import compute_sma_signals
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(5)
+    n = 50_000
+    close = 83 + np.cumsum(rng.normal(0, 0.01, n))
+    index = pd.date_range("2024-01-01", periods=n, freq="1min", name="Datetime")
+    return pd.DataFrame({"Open": np.r_[close[0], close[:-1]], "High": close + 0.02, "Low": close - 0.02,
+                         "Close": close, "Volume": 0.0}, index=index)
+
+
+def test_bucket_ohlc_keeps_every_extreme(candles):
+    ts = candles.index.values
+    o, h, l, c = (candles[name].to_numpy() for name in ("Open", "High", "Low", "Close"))
+    bucket_ts, bo, bh, bl, bc = bucket_ohlc(ts, o, h, l, c, max_buckets=1000)
+    assert len(bucket_ts) <= 1000
+    assert (bucket_ts[0], bo[0], bc[-1]) == (ts[0], o[0], c[-1])
+    assert bh.max() == h.max() and bl.min() == l.min()
+    assert np.all(np.diff(bucket_ts) > np.timedelta64(0))
+
+
+def test_bucket_ohlc_leaves_short_series_alone():
+    ts = np.arange(10).astype("datetime64[m]")
+    values = np.arange(10.0)
+    assert all(np.array_equal(a, values) for a in bucket_ohlc(ts, values, values, values, values, 10)[1:])
+
+
+@pytest.mark.parametrize("n, threshold", [(50_000, 2000), (2001, 2000), (9999, 100), (37, 10)])
+def test_minmax_indices_keeps_the_shape_within_the_budget(n, threshold):
+    y = np.sin(np.linspace(0, 40, n)) + np.linspace(0, 1, n)
+    keep = minmax_indices(y, threshold)
+    assert len(keep) <= threshold
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+    assert y.argmax() in keep and y.argmin() in keep
+
+
+def test_minmax_indices_drops_nan_warm_up():
+    y = np.r_[np.full(500, np.nan), np.arange(5000.0)]
+    keep = minmax_indices(y, 100)
+    assert keep[0] == 500 and not np.isnan(y[keep]).any()
+    assert minmax_indices(np.full(10, np.nan), 100).size == 0
+
+
+def test_figure_payload_is_bounded(candles):
+    signals = compute_sma_signals(candles["Close"].to_numpy(), 20, 50)
+    fig = build_candlestick_figure(candles, signals, 20, 50, "USD/INR")
+    candlestick, sma_short, sma_long, buys, sells = fig.data
+    assert len(candlestick.x) <= MAX_CANDLES
+    assert len(sma_short.x) <= MAX_LINE_POINTS and len(sma_long.x) <= MAX_LINE_POINTS
+    assert len(buys.x) <= chart_builder.MAX_MARKERS and len(sells.x) <= chart_builder.MAX_MARKERS
+    assert sma_short.type == "scattergl"
+    assert "buckets" in fig.layout.title.text
+
+
+def test_visible_range_limits_the_candles(candles):
+    signals = compute_sma_signals(candles["Close"].to_numpy(), 20, 50)
+    start = candles.index[-360]
+    fig = build_candlestick_figure(candles, signals, 20, 50, "USD/INR", start=start)
+    assert len(fig.data[0].x) == 360
+    assert pd.Timestamp(fig.data[1].x[0]) >= start
+
+
+def test_cached_figure_builds_once_per_key(monkeypatch):
+    monkeypatch.setattr(chart_builder, "_figure_cache", type(chart_builder._figure_cache)())
+    builds = []
+
+    def build():
+        builds.append(1)
+        return object()
+
+    first = cached_figure(("v1",), build)
+    assert cached_figure(("v1",), build) is first
+    cached_figure(("v2",), build)
+    assert len(builds) == 2
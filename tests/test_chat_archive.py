@@ -0,0 +1,33 @@
+# tests/test_chat_archive.py
+
+from chat_archive import ChatArchive
+
+
+def messages(n):
+    return [{"role": "user", "content": str(i)} for i in range(n)]
+
+
+def test_count_follows_size_pruning(tmp_path):
+    archive = ChatArchive(str(tmp_path / "chat.sqlite3"), max_messages=5)
+    archive.append("a", messages(4))
+    archive.append("b", messages(4))
+    assert archive.count("a") == 4
+    assert archive.prune() == 3
+    assert archive.count("a") == 1
+    assert archive.count("b") == 4
+    assert [m["content"] for m in archive.get_messages("a")] == ["3"]
+
+
+def test_count_follows_age_pruning(tmp_path):
+    archive = ChatArchive(str(tmp_path / "chat.sqlite3"), ttl_seconds=60)
+    archive.append("a", messages(3))
+    archive._connection().execute("UPDATE messages SET ts = ts - 3600 WHERE content = '0'")
+    assert archive.count("a") == 3
+    archive.prune()
+    assert archive.count("a") == 2
+
+
+def test_reopening_prunes_expired_messages(tmp_path):
+    path = str(tmp_path / "chat.sqlite3")
+    ChatArchive(path).append("a", messages(3))
+    assert ChatArchive(path, max_messages=2).count("a") == 2
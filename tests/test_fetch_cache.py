@@ -0,0 +1,96 @@
+# tests/test_fetch_cache.py
+
+import threading
+
+import pytest
+
+import data_fetcher
+from instrumentation import metrics_snapshot, reset_metrics
+
+
+def _alpha_vantage_counters():
+    counters = metrics_snapshot()["counters"]
+    return {name: value for name, value in counters.items() if "cache=alpha_vantage" in name}
+
+
+def _expire_cache():
+    for key, (_, value) in list(data_fetcher._cache.items()):
+        data_fetcher._cache[key] = (0, value)
+
+
+def test_token_bucket_refuses_calls_past_its_capacity():
+    bucket = data_fetcher._TokenBucket(per_minute=2, per_day=100)
+    bucket.acquire(0)
+    bucket.acquire(0)
+    with pytest.raises(data_fetcher.RateLimitError, match="rate limit"):
+        bucket.acquire(0)
+    assert bucket.remaining_today() == 98
+
+
+def test_token_bucket_enforces_the_daily_quota():
+    bucket = data_fetcher._TokenBucket(per_minute=60, per_day=1)
+    bucket.acquire(0)
+    with pytest.raises(data_fetcher.RateLimitError, match="Daily"):
+        bucket.acquire(5)
+    assert bucket.remaining_today() == 0
+
+
+def test_fresh_entries_are_served_from_cache(fake_av):
+    rate = data_fetcher.get_fx_rate("USD", "INR")
+    assert data_fetcher.get_fx_rate("USD", "INR") == rate
+    assert fake_av.request_count == 1
+    assert data_fetcher.get_fetch_stats()["hits"] == 1
+
+
+def test_expired_entry_is_served_while_throttled(fake_av):
+    rate = data_fetcher.get_fx_rate("USD", "INR")
+    _expire_cache()
+    fake_av.rate_limit_per_minute = 0
+    assert data_fetcher.get_fx_rate("USD", "INR") == rate
+    stats = data_fetcher.get_fetch_stats()
+    assert (stats["throttled"], stats["stale_served"]) == (1, 1)
+
+
+def test_stale_entry_raises_when_the_caller_refuses_it(fake_av):
+    rate = data_fetcher.get_fx_rate("USD", "INR")
+    _expire_cache()
+    data_fetcher._rate_limiter = data_fetcher._TokenBucket(per_minute=1, per_day=0)
+    with pytest.raises(data_fetcher.StaleDataError) as excinfo:
+        data_fetcher.get_fx_rate("USD", "INR", allow_stale=False)
+    assert excinfo.value.stale_value == rate
+
+
+def test_throttled_with_nothing_cached_raises(fake_av):
+    fake_av.rate_limit_per_minute = 0
+    with pytest.raises(data_fetcher.RateLimitError):
+        data_fetcher.get_fx_rate("USD", "INR")
+    assert data_fetcher.get_fetch_stats()["stale_served"] == 0
+
+
+def test_coalesced_waiters_are_not_counted_as_hits(fake_av):
+    fake_av.latency_seconds = 0.3
+    reset_metrics()
+    start = threading.Barrier(4)
+    rates = []
+
+    def fetch():
+        start.wait()
+        rates.append(data_fetcher.get_fx_rate("USD", "INR"))
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    data_fetcher.get_fx_rate("USD", "INR")   # a real hit
+
+    assert len(set(rates)) == 1
+    stats = data_fetcher.get_fetch_stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"], stats["upstream_calls"]) == (1, 3, 1, 1)
+    assert stats["hit_ratio"] == 1 / 5
+    assert _alpha_vantage_counters() == {
+        "cache_requests_total{cache=alpha_vantage,result=miss}": 1,
+        "cache_requests_total{cache=alpha_vantage,result=hit}": 1,
+        "cache_coalesced_total{cache=alpha_vantage}": 3,
+    }
+    assert metrics_snapshot()["cache_hit_ratios"]["alpha_vantage"] == 1 / 2
@@ -0,0 +1,65 @@
+# tests/test_indicators.py
+
+import numpy as np
+import pytest
+
+from trading_logic import (
+    IndicatorEngine, RollingBollinger, bollinger_bands, compute_sma_signals, crossover_signals, ema, macd, rsi, sma,
+)
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(11)
+    return 83.0 + np.cumsum(rng.normal(0, 0.02, 2_000))
+
+
+def _stream(closes, **kwargs):
+    engine = IndicatorEngine(**kwargs)
+    rows = [engine.update(float(close)) for close in closes]
+    return {key: np.array([row[key] for row in rows]) for key in rows[0] if key != "signal"}, \
+        [row["signal"] for row in rows]
+
+
+def test_rolling_indicators_match_the_vectorized_ones(closes):
+    streamed, _ = _stream(closes, short_window=10, long_window=30, rsi_period=14, bollinger_window=20)
+    np.testing.assert_allclose(streamed["sma_short"], sma(closes, 10), equal_nan=True)
+    np.testing.assert_allclose(streamed["sma_long"], sma(closes, 30), equal_nan=True)
+    np.testing.assert_allclose(streamed["ema_short"], ema(closes, 10))
+    np.testing.assert_allclose(streamed["rsi"], rsi(closes, 14), equal_nan=True)
+    line, signal_line, hist = macd(closes)
+    np.testing.assert_allclose(streamed["macd"], line, atol=1e-12)
+    np.testing.assert_allclose(streamed["macd_signal"], signal_line, atol=1e-12)
+    np.testing.assert_allclose(streamed["macd_hist"], hist, atol=1e-12)
+    middle, upper, lower = bollinger_bands(closes, 20)
+    np.testing.assert_allclose(streamed["bb_middle"], middle, equal_nan=True)
+    np.testing.assert_allclose(streamed["bb_upper"], upper, equal_nan=True)
+    np.testing.assert_allclose(streamed["bb_lower"], lower, equal_nan=True)
+
+
+def test_streamed_signals_match_the_vectorized_crossovers(closes):
+    _, signals = _stream(closes, short_window=10, long_window=30)
+    expected = compute_sma_signals(closes, 10, 30)
+    assert np.flatnonzero(np.array(signals) == "BUY").tolist() == expected["buy_idx"].tolist()
+    assert np.flatnonzero(np.array(signals) == "SELL").tolist() == expected["sell_idx"].tolist()
+    assert len(expected["buy_idx"]) > 0 and len(expected["sell_idx"]) > 0
+
+
+def test_bollinger_stays_stable_on_a_long_flat_history():
+    closes = np.full(100_000, 83.123456789)
+    closes[-20:] += np.arange(20) * 1e-6
+    bands = RollingBollinger(20)
+    for close in closes:
+        middle, upper, lower = bands.update(close)
+    _, expected_upper, _ = bollinger_bands(closes, 20)
+    assert upper >= middle >= lower
+    assert upper == pytest.approx(expected_upper[-1], abs=1e-9)
+
+
+def test_crossovers_are_marked_on_direct_crosses_only():
+    short = np.array([np.nan, 1.0, 3.0, 2.0, 2.0, 1.0, 3.0])
+    long = np.array([np.nan, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0])
+    signal, buy_idx, sell_idx = crossover_signals(short, long)
+    assert signal.tolist() == [0, -1, 1, 0, 0, -1, 1]
+    assert buy_idx.tolist() == [2, 6]
+    assert sell_idx.tolist() == [5]
@@ -0,0 +1,35 @@
+# tests/test_langchain_memory.py
+
+from langchain_agent import PROMPT_TEMPLATE, TokenBudgetMemory, estimate_tokens
+
+
+def _history_tokens(memory):
+    return sum(estimate_tokens(human) + estimate_tokens(ai) for human, ai in memory.turns)
+
+
+def test_old_turns_fold_into_the_summary():
+    memory = TokenBudgetMemory(history_budget=100, summary_budget=64)
+    for i in range(10):
+        memory.add_turn(f"Question {i}?", f"Answer {i}. " + "More detail. " * 10)
+    assert _history_tokens(memory) <= 100
+    assert memory.turns[-1][0] == "Question 9?"
+    assert "Question 7? (you said: Answer 7.)" in memory.summary()
+    assert estimate_tokens(memory.summary()) <= 64
+
+
+def test_single_oversized_turn_is_truncated_to_the_budget():
+    memory = TokenBudgetMemory(history_budget=50, summary_budget=32)
+    memory.add_turn("Why? " * 200, "Because the rupee weakened. " * 400)
+    assert len(memory.turns) == 1
+    assert sum(memory.turn_tokens) <= 50
+    assert _history_tokens(memory) <= 50
+    human, ai = memory.turns[0]
+    assert human.startswith("Why?") and ai.startswith("Because the rupee weakened.")
+
+
+def test_prompt_stays_bounded_after_an_oversized_turn():
+    memory = TokenBudgetMemory(history_budget=50, summary_budget=32)
+    memory.add_turn("short question", "x" * 10_000)
+    memory.add_turn("y" * 10_000, "short answer")
+    bound = estimate_tokens(PROMPT_TEMPLATE) + 50 + 32 + estimate_tokens("next?") + 10
+    assert estimate_tokens(memory.build_prompt("next?")) <= bound
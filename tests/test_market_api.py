@@ -0,0 +1,83 @@
+# tests/test_market_api.py
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import market_stream
+from data_fetcher import get_candles
+from market_api import create_app
+
+
+@pytest.fixture
+def last_rate_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "last_rate.json")
+    monkeypatch.setattr(market_stream, "LAST_RATE_PATH", path)
+    return path
+
+
+@pytest.fixture
+def client(fake_av, last_rate_path):
+    get_candles("USD", "INR", "1min")   # fill the store the API reads
+    return TestClient(create_app())
+
+
+def test_matching_etag_gets_an_empty_304(client):
+    first = client.get("/candles", params={"interval": "5min"})
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    etag = first.headers["etag"]
+    again = client.get("/candles", params={"interval": "5min"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    weak = client.get("/candles", params={"interval": "5min"}, headers={"If-None-Match": f'"other", W/{etag}'})
+    assert weak.status_code == 304
+
+
+def test_etag_changes_when_new_bars_arrive(client, next_candle):
+    etag = client.get("/candles", params={"interval": "1min"}).headers["etag"]
+    next_candle(3)
+    get_candles("USD", "INR", "1min")
+    response = client.get("/candles", params={"interval": "1min"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_since_returns_bars_from_that_time_inclusive(client):
+    full = client.get("/candles", params={"interval": "1min"}).json()
+    since = full["time"][-5]
+    for value in (str(since), pd.Timestamp(since, unit="ms").isoformat()):
+        tail = client.get("/candles", params={"interval": "1min", "since": value}).json()
+        assert tail["time"] == full["time"][-5:]
+        assert tail["close"] == full["close"][-5:]
+    assert len(client.get("/candles", params={"interval": "1min", "limit": 3}).json()["time"]) == 3
+
+
+def test_since_limits_the_signal_crossovers(client):
+    full = client.get("/signals", params={"interval": "1min", "short": 5, "long": 20}).json()
+    assert full["crossovers"] and full["bias"] in ("BUY", "SELL")
+    since = full["crossovers"][-1]["time"]
+    recent = client.get("/signals", params={"interval": "1min", "short": 5, "long": 20, "since": str(since)}).json()
+    assert recent["crossovers"] == full["crossovers"][-1:]
+
+
+def test_bad_parameters_are_rejected(client):
+    assert client.get("/candles", params={"interval": "2min"}).status_code == 400
+    assert client.get("/candles", params={"since": "not a time"}).status_code == 400
+    assert client.get("/signals", params={"short": 50, "long": 20}).status_code == 400
+
+
+def test_rate_serves_the_saved_quote(client):
+    assert client.get("/rate").status_code == 503
+    market_stream.save_last_rate("USD", "INR", 83.5, "2024-01-01T00:00:00", "alpha_vantage")
+    response = client.get("/rate")
+    assert response.json()["rate"] == 83.5
+    assert client.get("/rate", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+def test_read_only_app_serves_the_stores_without_fetching(fake_av, last_rate_path):
+    stored = get_candles("USD", "INR", "15min")
+    requests_before = fake_av.request_count
+    client = TestClient(create_app(read_only=True))
+    body = client.get("/candles", params={"interval": "15min"}).json()
+    assert body["close"] == stored["Close"].tolist()
+    assert fake_av.request_count == requests_before
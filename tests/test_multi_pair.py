@@ -0,0 +1,37 @@
+# tests/test_multi_pair.py
+
+import numpy as np
+import pandas as pd
+
+from data_fetcher import TRACKED_PAIRS, get_multi_pair_candles, keep_store_current, plan_pair_legs
+
+
+def test_legs_are_fetched_in_market_convention_and_inverted_locally():
+    legs, recipes = plan_pair_legs(["INR/EUR", "USD/EUR", "EUR/GBP"])
+    assert legs == [("EUR", "USD"), ("GBP", "USD"), ("USD", "INR")]
+    assert recipes["INR/EUR"] == [(("USD", "INR"), -1), (("EUR", "USD"), -1)]
+    assert recipes["USD/EUR"] == [(("EUR", "USD"), -1)]
+    assert recipes["EUR/GBP"] == [(("EUR", "USD"), 1), (("GBP", "USD"), -1)]
+
+
+def test_crosses_multiply_out(fake_av):
+    prices = get_multi_pair_candles(["EUR/INR", "INR/EUR"], interval="5min")
+    np.testing.assert_allclose(prices["EUR/INR"] * prices["INR/EUR"], 1.0)
+
+
+def test_default_call_keeps_every_leg_current(fake_av, next_candle):
+    first = get_multi_pair_candles(interval="5min")
+    next_candle(30)
+    second = get_multi_pair_candles(interval="5min")
+    assert list(second.columns) == list(TRACKED_PAIRS)
+    assert second.index[-1] - first.index[-1] == pd.Timedelta(minutes=30)
+
+
+def test_kept_current_legs_are_not_synced(fake_av, next_candle):
+    get_multi_pair_candles(interval="5min")
+    keep_store_current("USD", "INR")
+    next_candle(30)
+    requests_before = fake_av.request_count
+    get_multi_pair_candles(interval="5min")
+    # EUR/USD, GBP/USD and USD/JPY, one compact delta each; USD/INR is left to its poller.
+    assert fake_av.request_count - requests_before == 3
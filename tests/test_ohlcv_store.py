@@ -0,0 +1,88 @@
+# tests/test_ohlcv_store.py
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ohlcv_store import PRICE_COLUMNS, TIMESTAMP_COLUMN, OHLCVStore
+
+START = pd.Timestamp("2024-01-01 00:00").value
+MINUTE = 60 * 10**9
+
+
+def _bars(first, count):
+    timestamps = START + MINUTE * np.arange(first, first + count, dtype=np.int64)
+    close = 83.0 + 0.01 * np.arange(first, first + count)
+    columns = {"Open": close - 0.005, "High": close + 0.01, "Low": close - 0.01, "Close": close,
+               "Volume": np.zeros(count)}
+    return timestamps, columns
+
+
+def test_append_skips_rows_already_stored(tmp_path):
+    store = OHLCVStore("USD", "INR", "1min", root=str(tmp_path))
+    assert store.append(*_bars(0, 10)) == 10
+    assert store.append(*_bars(5, 10)) == 5   # bars 5-9 overlap
+    assert store.append(*_bars(0, 15)) == 0
+    view = store.read()
+    assert len(view[TIMESTAMP_COLUMN]) == 15
+    assert np.all(np.diff(view[TIMESTAMP_COLUMN].view(np.int64)) == MINUTE)
+    np.testing.assert_allclose(view["Close"], 83.0 + 0.01 * np.arange(15))
+
+
+def test_read_returns_the_requested_range_as_copies(tmp_path):
+    store = OHLCVStore("USD", "INR", "1min", root=str(tmp_path))
+    store.append(*_bars(0, 10))
+    view = store.read(start=pd.Timestamp(START + 2 * MINUTE), end=pd.Timestamp(START + 4 * MINUTE))
+    assert len(view["Close"]) == 3
+    for name in (TIMESTAMP_COLUMN, *PRICE_COLUMNS):
+        assert not isinstance(view[name], np.memmap) and not isinstance(view[name].base, np.memmap)
+    view["Close"][:] = 0.0
+    assert store.read()["Close"][2] != 0.0
+
+
+def test_truncate_from_rewrites_the_newest_bars(tmp_path):
+    store = OHLCVStore("USD", "INR", "1min", root=str(tmp_path))
+    store.append(*_bars(0, 10))
+    before = store.version()
+    timestamps, columns = _bars(8, 2)
+    columns["Close"] = columns["Close"] + 1.0
+    store.truncate_from(timestamps[0])
+    assert len(store) == 8
+    store.append(timestamps, columns)
+    assert len(store) == 10
+    assert store.read()["Close"][-1] == pytest.approx(83.09 + 1.0)
+    # Same length and last timestamp as before, but the version still changes.
+    assert store.version() != before
+    assert store.version()[1:] == before[1:]
+
+
+def test_reopening_repairs_a_half_finished_append(tmp_path):
+    store = OHLCVStore("USD", "INR", "1min", root=str(tmp_path))
+    store.append(*_bars(0, 5))
+    with open(os.path.join(store.path, "Close.bin"), "ab") as f:
+        f.write(np.float64(1.0).tobytes())
+    reopened = OHLCVStore("USD", "INR", "1min", root=str(tmp_path))
+    assert len(reopened) == 5
+    assert len(reopened.read()["Close"]) == 5
+
+
+def test_read_only_store_reads_but_never_writes(tmp_path):
+    writer = OHLCVStore("USD", "INR", "1min", root=str(tmp_path))
+    writer.append(*_bars(0, 5))
+    reader = OHLCVStore("USD", "INR", "1min", root=str(tmp_path), read_only=True)
+    assert len(reader.read()["Close"]) == 5
+    with pytest.raises(PermissionError):
+        reader.append(*_bars(5, 1))
+    with pytest.raises(PermissionError):
+        reader.truncate_from(START)
+    writer.append(*_bars(5, 3))
+    assert reader.to_frame().index[-1] == pd.Timestamp(START + 7 * MINUTE)
+
+
+def test_read_only_store_does_not_create_missing_stores(tmp_path):
+    reader = OHLCVStore("EUR", "INR", "1min", root=str(tmp_path), read_only=True)
+    assert len(reader) == 0
+    assert reader.to_frame().empty
+    assert not os.path.exists(reader.path)
@@ -0,0 +1,105 @@
+# tests/test_quote_router.py
+
+import time
+
+import pytest
+
+import data_fetcher
+import quote_providers
+from benchmarks.fake_quote_providers import FAKE_RATE, FakeExchangeRateApiServer, FakeYFinanceClient
+from data_fetcher import RateLimitError
+from quote_providers import (
+    AlphaVantageProvider, ExchangeRateApiProvider, QuoteProvider, QuoteRouter, YFinanceProvider,
+)
+
+
+class _FixedProvider(QuoteProvider):
+    def __init__(self, name, rate=None, error=None):
+        super().__init__()
+        self.name = name
+        self.rate = rate
+        self.error = error
+        self.calls = 0
+
+    def get_quote(self, symbol="USD", to_symbol="INR"):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.rate
+
+
+def test_failure_hands_over_to_the_next_provider():
+    broken = _FixedProvider("broken", error=ConnectionError("down"))
+    backup = _FixedProvider("backup", rate=83.1)
+    router = QuoteRouter([broken, backup], hedge_after_seconds=10)
+    assert router.get_quote() == (83.1, "backup")
+    assert router.health()["broken"]["failures"] == 1
+    assert router.health()["backup"]["successes"] == 1
+
+
+def test_all_providers_failing_raises():
+    router = QuoteRouter([_FixedProvider("a", error=ValueError("bad")), _FixedProvider("b", error=ConnectionError("down"))])
+    with pytest.raises(ConnectionError, match="All quote providers failed"):
+        router.get_quote()
+
+
+def test_slow_provider_is_hedged():
+    with FakeExchangeRateApiServer(latency_seconds=2.0) as server:
+        slow = ExchangeRateApiProvider("test", server.base_url)
+        router = QuoteRouter([slow, YFinanceProvider(FakeYFinanceClient())], hedge_after_seconds=0.1)
+        started = time.monotonic()
+        rate, name = router.get_quote()
+        assert name == "yfinance" and rate > 0
+        assert time.monotonic() - started < 1.5
+
+
+def test_repeated_throttles_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(quote_providers, "CIRCUIT_THROTTLE_THRESHOLD", 2)
+    throttled = YFinanceProvider(FakeYFinanceClient(throttle=True))
+    backup = _FixedProvider("backup", rate=83.2)
+    router = QuoteRouter([throttled, backup], hedge_after_seconds=10)
+    for _ in range(2):
+        assert router.get_quote() == (83.2, "backup")
+    assert router.health()["yfinance"]["circuit_open"]
+    assert throttled not in router.available()
+    router.get_quote()
+    assert throttled.client.request_count == 2   # skipped while open
+
+    # After the cool-off one trial call goes through again.
+    throttled.health.open_until = 0.0
+    throttled.client.throttle = False
+    assert router.get_quote()[1] == "yfinance"
+    assert not router.health()["yfinance"]["circuit_open"]
+
+
+def test_exchangerate_api_quota_counts_as_a_throttle():
+    with FakeExchangeRateApiServer(quota=0) as server:
+        provider = ExchangeRateApiProvider("test", server.base_url)
+        with pytest.raises(RateLimitError):
+            provider.get_quote()
+        router = QuoteRouter([provider, _FixedProvider("backup", rate=FAKE_RATE)])
+        assert router.get_quote() == (FAKE_RATE, "backup")
+        assert router.health()["exchangerate_api"]["throttles"] == 1
+
+
+def test_stale_alpha_vantage_quote_is_the_last_resort(fake_av):
+    rate = data_fetcher.get_fx_rate("USD", "INR")
+    for key, (_, value) in list(data_fetcher._cache.items()):
+        data_fetcher._cache[key] = (0, value)
+    fake_av.rate_limit_per_minute = 0
+    alpha_vantage = AlphaVantageProvider()
+
+    backup = _FixedProvider("backup", rate=83.4)
+    assert QuoteRouter([alpha_vantage, backup]).get_quote() == (83.4, "backup")
+    assert alpha_vantage.health.throttles == 1
+
+    broken = _FixedProvider("broken", error=ConnectionError("down"))
+    assert QuoteRouter([alpha_vantage, broken]).get_quote() == (rate, "alpha_vantage (stale)")
+
+
+def test_yfinance_candles_are_shaped_like_alpha_vantage_candles():
+    frame = YFinanceProvider(FakeYFinanceClient()).get_candles("USD", "INR", "5min")
+    assert list(frame.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert frame.index.tz is None and frame.index.name == "Datetime"
+    assert len(frame) == quote_providers.YF_COMPACT_POINTS
+    assert frame.index.is_monotonic_increasing
@@ -0,0 +1,55 @@
+# tests/test_resampling.py
+
+import numpy as np
+import pandas as pd
+
+import data_fetcher
+from data_fetcher import get_candles, read_stored_candles, resample_ohlcv
+
+
+def _pandas_resample(frame, rule):
+    return frame.resample(rule, label="left", closed="left").agg(
+        {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    ).dropna(subset=["Open"])
+
+
+def test_resample_matches_pandas():
+    rng = np.random.default_rng(3)
+    # Irregular 1-minute bars with gaps, as a live feed delivers them.
+    minutes = np.sort(rng.choice(np.arange(600), size=400, replace=False))
+    index = pd.DatetimeIndex(pd.Timestamp("2024-01-01 09:03") + pd.to_timedelta(minutes, "min"),
+                             name="Datetime").as_unit("ns")
+    close = 83 + np.cumsum(rng.normal(0, 0.01, len(index)))
+    frame = pd.DataFrame({"Open": close + 0.002, "High": close + 0.01, "Low": close - 0.01,
+                          "Close": close, "Volume": rng.integers(0, 5, len(index)).astype(float)}, index=index)
+    bucket_ts, columns = resample_ohlcv(index.asi8, {name: frame[name].to_numpy() for name in frame}, 15 * 60)
+    ours = pd.DataFrame(columns, index=pd.DatetimeIndex(bucket_ts.view("datetime64[ns]"), name="Datetime"))
+    pd.testing.assert_frame_equal(ours, _pandas_resample(frame, "15min"), check_freq=False)
+
+
+def test_every_interval_comes_from_one_base_fetch(fake_av):
+    base = get_candles("USD", "INR", "1min")
+    upstream = fake_av.request_count
+    for interval in ("5min", "15min", "30min", "60min"):
+        frame = get_candles("USD", "INR", interval)
+        expected = _pandas_resample(base, interval)
+        pd.testing.assert_frame_equal(frame, expected, check_freq=False)
+    assert fake_av.request_count == upstream
+
+
+def test_resampled_store_follows_new_and_rewritten_base_bars(fake_av, next_candle):
+    first = get_candles("USD", "INR", "15min")
+    next_candle(7)
+    base = get_candles("USD", "INR", "1min")
+    frame = get_candles("USD", "INR", "15min")
+    assert frame.index[-1] >= first.index[-1]
+    pd.testing.assert_frame_equal(frame, _pandas_resample(base, "15min"), check_freq=False)
+    assert data_fetcher.get_store("USD", "INR", "resampled_15min").version()[0] > 1
+
+
+def test_read_only_resampling_matches_the_stored_intervals(fake_av):
+    stored = get_candles("USD", "INR", "30min")
+    start = stored.index[3] + pd.Timedelta(minutes=10)
+    pd.testing.assert_frame_equal(read_stored_candles("USD", "INR", "30min"), stored, check_freq=False)
+    pd.testing.assert_frame_equal(read_stored_candles("USD", "INR", "30min", start=start),
+                                  stored[stored.index >= stored.index[3]], check_freq=False)
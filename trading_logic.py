@@ -0,0 +1,272 @@
+# trading_logic.py
+
+import numpy as np
+import pandas as pd
+
+# --- Vectorized Indicators (whole series) ---
+# These work on plain NumPy arrays of close prices. SMAs are computed from prefix
+# sums, so several windows over the same series (e.g. while moving the SMA
+# sliders) reuse one cumulative sum instead of re-rolling the data.
+
+
+def prefix_sums(values):
+    """Returns the cumulative sum of `values` with a leading zero (length n + 1)."""
+    return np.concatenate(([0.0], np.cumsum(np.asarray(values, dtype=float))))
+
+
+def sma(values, window, csum=None):
+    """
+    Simple moving average; the first `window - 1` entries are NaN.
+    Args:
+        values (array-like): Close prices.
+        window (int): Number of candles.
+        csum (np.ndarray): Optional precomputed prefix_sums(values).
+    """
+    values = np.asarray(values, dtype=float)
+    csum = prefix_sums(values) if csum is None else csum
+    out = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def ema(values, span):
+    """Exponential moving average seeded with the first value (same recurrence as RollingEMA)."""
+    return pd.Series(values, dtype=float).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def rsi(values, period=14):
+    """Wilder's Relative Strength Index; the first entry is NaN."""
+    deltas = np.diff(np.asarray(values, dtype=float))
+    gains = pd.Series(np.clip(deltas, 0, None)).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    losses = pd.Series(np.clip(-deltas, 0, None)).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(losses == 0, 100.0, 100.0 - 100.0 / (1.0 + gains / losses))
+    return np.concatenate(([np.nan], out))
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """Returns (MACD line, signal line, histogram)."""
+    line = ema(values, fast) - ema(values, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger_bands(values, window=20, num_std=2.0, csum=None):
+    """Returns (middle, upper, lower) bands using the population standard deviation."""
+    values = np.asarray(values, dtype=float)
+    middle = sma(values, window, csum)
+    # Not E[x^2] - E[x]^2 from prefix sums: at USD/INR magnitudes that difference of two
+    # near-equal numbers loses most of its digits on long histories and can go negative.
+    # pandas' rolling variance works on deviations from the window mean.
+    std = np.sqrt(np.clip(pd.Series(values).rolling(window).var(ddof=0).to_numpy(), 0, None))
+    return middle, middle + num_std * std, middle - num_std * std
+
+
+def crossover_signals(short_line, long_line):
+    """
+    Detects SMA crossovers without a Python loop.
+    Returns:
+        tuple: (signal, buy_idx, sell_idx) where `signal` is 1 while the short line
+        is above the long one, -1 while below and 0 otherwise (including warm-up),
+        and the index arrays mark bars where the short line crosses up / down.
+    Unlike the original chart code, which marked `signal.diff() == ±1` (leaving or
+    entering a tie, or the end of the warm-up) and so missed a direct cross from -1
+    to 1, markers are placed on actual crossings only.
+    """
+    diff = np.asarray(short_line, dtype=float) - np.asarray(long_line, dtype=float)
+    valid = ~np.isnan(diff)
+    signal = np.where(valid, np.sign(np.nan_to_num(diff)), 0).astype(np.int8)
+    # Skip the first valid bar: entering the warm-up-free region is not a crossover.
+    # Crossings that pass through equality are reported on the bar that lands on the other side.
+    last_side = pd.Series(np.where(signal != 0, signal, np.nan)).ffill().shift(1).to_numpy()
+    was_valid = np.r_[False, valid[:-1]]
+    buy_idx = np.flatnonzero(was_valid & (signal == 1) & (last_side == -1))
+    sell_idx = np.flatnonzero(was_valid & (signal == -1) & (last_side == 1))
+    return signal, buy_idx, sell_idx
+
+
+def compute_sma_signals(close, short_window, long_window, csum=None):
+    """
+    Computes both SMAs and their crossover signals for a close-price series.
+    Args:
+        close (array-like): Close prices.
+        short_window, long_window (int): SMA periods.
+        csum (np.ndarray): Optional precomputed prefix_sums(close), shared across windows.
+    Returns:
+        dict: 'sma_short', 'sma_long', 'signal', 'buy_idx' and 'sell_idx' arrays.
+    """
+    close = np.asarray(close, dtype=float)
+    csum = prefix_sums(close) if csum is None else csum
+    sma_short = sma(close, short_window, csum)
+    sma_long = sma(close, long_window, csum)
+    signal, buy_idx, sell_idx = crossover_signals(sma_short, sma_long)
+    return {
+        "sma_short": sma_short,
+        "sma_long": sma_long,
+        "signal": signal,
+        "buy_idx": buy_idx,
+        "sell_idx": sell_idx,
+    }
+
+
+# --- Incremental Indicators (one candle at a time) ---
+# Each update is O(1): windowed indicators keep a fixed-size ring of the last
+# `window` values plus running sums, recursive ones keep only their last value.
+
+
+class RollingSMA:
+    def __init__(self, window):
+        self.window = window
+        self.ring = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.value = np.nan
+
+    def update(self, x):
+        slot = self.count % self.window
+        self.total += x - self.ring[slot]
+        self.ring[slot] = x
+        self.count += 1
+        self.value = self.total / self.window if self.count >= self.window else np.nan
+        return self.value
+
+
+class RollingEMA:
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = np.nan
+
+    def update(self, x):
+        self.value = x if np.isnan(self.value) else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class RollingRSI:
+    def __init__(self, period=14):
+        self.alpha = 1.0 / period
+        self.prev = None
+        self.avg_gain = np.nan
+        self.avg_loss = np.nan
+        self.value = np.nan
+
+    def update(self, x):
+        if self.prev is not None:
+            delta = x - self.prev
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if np.isnan(self.avg_gain):
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                self.avg_gain += self.alpha * (gain - self.avg_gain)
+                self.avg_loss += self.alpha * (loss - self.avg_loss)
+            self.value = 100.0 if self.avg_loss == 0 else 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        self.prev = x
+        return self.value
+
+
+class RollingMACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = RollingEMA(fast)
+        self.slow = RollingEMA(slow)
+        self.signal = RollingEMA(signal)
+        self.value = (np.nan, np.nan, np.nan)
+
+    def update(self, x):
+        line = self.fast.update(x) - self.slow.update(x)
+        signal_line = self.signal.update(line)
+        self.value = (line, signal_line, line - signal_line)
+        return self.value
+
+
+class RollingBollinger:
+    """
+    Windowed Welford update: keeps the window mean and the sum of squared deviations
+    (m2) instead of a running sum of squares, which cancels catastrophically.
+    """
+
+    def __init__(self, window=20, num_std=2.0):
+        self.window = window
+        self.num_std = num_std
+        self.ring = np.zeros(window)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.value = (np.nan, np.nan, np.nan)
+
+    def update(self, x):
+        slot = self.count % self.window
+        old_mean = self.mean
+        if self.count < self.window:
+            self.mean += (x - old_mean) / (self.count + 1)
+            self.m2 += (x - old_mean) * (x - self.mean)
+        else:
+            old = self.ring[slot]
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        self.ring[slot] = x
+        self.count += 1
+        if self.count < self.window:
+            return self.value
+        std = np.sqrt(max(self.m2 / self.window, 0.0))
+        self.value = (self.mean, self.mean + self.num_std * std, self.mean - self.num_std * std)
+        return self.value
+
+
+class IndicatorEngine:
+    """
+    Keeps rolling indicator state for one close-price stream and emits SMA
+    crossover signals as each new candle arrives.
+    """
+
+    def __init__(self, short_window=20, long_window=50, rsi_period=14, bollinger_window=20):
+        self.sma_short = RollingSMA(short_window)
+        self.sma_long = RollingSMA(long_window)
+        self.ema_short = RollingEMA(short_window)
+        self.ema_long = RollingEMA(long_window)
+        self.rsi = RollingRSI(rsi_period)
+        self.macd = RollingMACD()
+        self.bollinger = RollingBollinger(bollinger_window)
+        self.side = 0       # last non-zero crossover side
+        self.was_valid = False
+
+    def update(self, close):
+        """
+        Feeds one close price.
+        Returns:
+            dict: Latest indicator values and 'signal' ("BUY", "SELL" or None).
+        """
+        short = self.sma_short.update(close)
+        long = self.sma_long.update(close)
+        signal = None
+        if not (np.isnan(short) or np.isnan(long)):
+            side = int(np.sign(short - long))
+            if side != 0:
+                if self.was_valid and self.side == -side:
+                    signal = "BUY" if side == 1 else "SELL"
+                self.side = side
+            self.was_valid = True
+        macd_line, macd_signal, macd_hist = self.macd.update(close)
+        bb_middle, bb_upper, bb_lower = self.bollinger.update(close)
+        return {
+            "close": close,
+            "sma_short": short,
+            "sma_long": long,
+            "ema_short": self.ema_short.update(close),
+            "ema_long": self.ema_long.update(close),
+            "rsi": self.rsi.update(close),
+            "macd": macd_line,
+            "macd_signal": macd_signal,
+            "macd_hist": macd_hist,
+            "bb_middle": bb_middle,
+            "bb_upper": bb_upper,
+            "bb_lower": bb_lower,
+            "signal": signal,
+        }
+
+    @classmethod
+    def from_history(cls, closes, **kwargs):
+        """Builds an engine and warms it up on historical closes."""
+        engine = cls(**kwargs)
+        for close in np.asarray(closes, dtype=float):
+            engine.update(float(close))
+        return engine